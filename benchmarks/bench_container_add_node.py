@@ -0,0 +1,109 @@
+# coding: utf-8
+"""
+Benchmark of the conversion of a model producing a graph
+with many nodes. The time spent per node should remain
+constant when the number of nodes grows.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from sklearn.base import BaseEstimator, TransformerMixin
+from skl2onnx import convert_sklearn, update_registered_converter
+from skl2onnx.common.data_types import FloatTensorType
+
+
+##############################
+# Model producing many nodes.
+##############################
+
+class ManyNodesTransformer(BaseEstimator, TransformerMixin):
+    "Transformer converted into a chain of *n_nodes* nodes."
+
+    def __init__(self, n_nodes=10):
+        BaseEstimator.__init__(self)
+        TransformerMixin.__init__(self)
+        self.n_nodes = n_nodes
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X
+
+
+def many_nodes_shape_calculator(operator):
+    operator.outputs[0].type = FloatTensorType(
+        operator.inputs[0].type.shape)
+
+
+def many_nodes_converter(scope, operator, container):
+    n_nodes = operator.raw_operator.n_nodes
+    last = operator.inputs[0].full_name
+    for i in range(n_nodes):
+        output = ('sin%d' % i if i < n_nodes - 1
+                  else operator.outputs[0].full_name)
+        # half of the nodes have a duplicated name
+        name = 'Sin' if i % 2 == 0 else 'Sin%d' % i
+        container.add_node('Sin', [last], [output], name=name)
+        last = output
+
+
+update_registered_converter(
+    ManyNodesTransformer, "ManyNodesTransformer",
+    many_nodes_shape_calculator, many_nodes_converter)
+
+
+##############################
+# Benchmarks
+##############################
+
+def bench(sizes, repeat=3, verbose=False):
+    res = []
+    X = np.zeros((1, 4), dtype=np.float32)
+    for n in sizes:
+        model = ManyNodesTransformer(n).fit(X)
+        times = []
+        for r in range(repeat):
+            st = time()
+            onx = convert_sklearn(
+                model, initial_types=[('X', FloatTensorType([None, 4]))])
+            times.append(time() - st)
+        assert len(onx.graph.node) == n
+        assert len(set(node.name for node in onx.graph.node)) == n
+        obs = dict(n_nodes=n, time=min(times),
+                   time_per_node=min(times) / n)
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(repeat=3, verbose=False):
+    sizes = [1000, 2000, 5000, 10000, 20000, 50000]
+
+    start = time()
+    results = bench(sizes, repeat=repeat, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_container_add_node.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_container_add_node.csv", index=False)
@@ -0,0 +1,118 @@
+# coding: utf-8
+"""
+Benchmark of the conversion of a model producing a graph
+with many nodes whose type is implemented in submodule
+*_apply_operation*. It compares the conversion time with
+and without the check on the callstack done by
+*ModelComponentContainer._check_operator*.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from sklearn.base import BaseEstimator, TransformerMixin
+from skl2onnx import convert_sklearn, update_registered_converter
+from skl2onnx.common import _container
+from skl2onnx.common.data_types import FloatTensorType
+
+
+##############################
+# Model producing many nodes.
+##############################
+
+class ManyAbsTransformer(BaseEstimator, TransformerMixin):
+    "Transformer converted into a chain of *n_nodes* nodes Abs."
+
+    def __init__(self, n_nodes=10):
+        BaseEstimator.__init__(self)
+        TransformerMixin.__init__(self)
+        self.n_nodes = n_nodes
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return np.abs(X)
+
+
+def many_abs_shape_calculator(operator):
+    operator.outputs[0].type = FloatTensorType(
+        operator.inputs[0].type.shape)
+
+
+def many_abs_converter(scope, operator, container):
+    n_nodes = operator.raw_operator.n_nodes
+    last = operator.inputs[0].full_name
+    for i in range(n_nodes):
+        output = ('abs%d' % i if i < n_nodes - 1
+                  else operator.outputs[0].full_name)
+        container.add_node('Abs', [last], [output], name='Abs%d' % i)
+        last = output
+
+
+update_registered_converter(
+    ManyAbsTransformer, "ManyAbsTransformer",
+    many_abs_shape_calculator, many_abs_converter)
+
+
+##############################
+# Benchmarks
+##############################
+
+def measure(model, repeat):
+    times = []
+    for r in range(repeat):
+        st = time()
+        convert_sklearn(
+            model, initial_types=[('X', FloatTensorType([None, 4]))])
+        times.append(time() - st)
+    return min(times)
+
+
+def bench(sizes, repeat=3, verbose=False):
+    res = []
+    X = np.zeros((1, 4), dtype=np.float32)
+    for n in sizes:
+        model = ManyAbsTransformer(n).fit(X)
+        obs = dict(n_nodes=n)
+        for check in [False, True]:
+            _container.CHECK_APPLY_OPERATION = check
+            try:
+                obs['time_check_%s' % check] = measure(model, repeat)
+            finally:
+                _container.CHECK_APPLY_OPERATION = False
+        obs['speedup'] = obs['time_check_True'] / obs['time_check_False']
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(repeat=3, verbose=False):
+    sizes = [1000, 5000, 10000]
+
+    start = time()
+    results = bench(sizes, repeat=repeat, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_container_check_operator.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_container_check_operator.csv", index=False)
@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+Benchmark of the creation of big initializers
+from numpy arrays, the time and the peak memory are
+measured for an array stored in field *raw_data*
+and for the same array given as a list.
+"""
+# License: MIT
+import tracemalloc
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from onnx import TensorProto
+from skl2onnx.common._container import ModelComponentContainer
+
+
+##############################
+# Benchmarks
+##############################
+
+def measure(fct):
+    tracemalloc.start()
+    st = time()
+    fct()
+    end = time()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return end - st, peak
+
+
+def bench(sizes, verbose=False):
+    res = []
+    for n in sizes:
+        values = np.random.rand(n).astype(np.float32)
+
+        def add_array():
+            container = ModelComponentContainer(12, dtype=np.float32)
+            container.add_initializer(
+                'A', TensorProto.FLOAT, [n], values)
+
+        def add_list():
+            container = ModelComponentContainer(12, dtype=np.float32)
+            container.add_initializer(
+                'A', TensorProto.FLOAT, [n], values.tolist())
+
+        time_array, peak_array = measure(add_array)
+        time_list, peak_list = measure(add_list)
+        obs = dict(n=n, time_array=time_array, time_list=time_list,
+                   peak_array=peak_array, peak_list=peak_list)
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(verbose=False):
+    sizes = [1000, 10000, 100000, 1000000]
+
+    start = time()
+    results = bench(sizes, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_container_initializers.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_container_initializers.csv", index=False)
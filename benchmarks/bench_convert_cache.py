@@ -0,0 +1,86 @@
+# coding: utf-8
+"""
+Benchmark of the conversion cache, it compares the time
+to convert a random forest, to compute the key of the model
+and to load the converted model from the cache.
+"""
+# License: MIT
+import tempfile
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from skl2onnx import to_onnx
+from skl2onnx.common._cache import ConversionCache
+from skl2onnx.algebra.type_helper import guess_initial_types
+
+
+##############################
+# Benchmarks
+##############################
+
+def bench(n_estimators, X, y, cache, verbose=False):
+    res = []
+    for n in n_estimators:
+        model = RandomForestClassifier(
+            n_estimators=n, random_state=0).fit(X, y)
+
+        st = time()
+        to_onnx(model, X[:1])
+        time_convert = time() - st
+
+        st = time()
+        key = cache.make_key(
+            model, initial_types=guess_initial_types(X[:1], None))
+        time_key = time() - st
+
+        onx = to_onnx(model, X[:1], cache=cache)
+        st = time()
+        to_onnx(model, X[:1], cache=cache)
+        time_hit = time() - st
+
+        obs = dict(n_estimators=n, size=onx.ByteSize(),
+                   time_convert=time_convert, time_key=time_key,
+                   time_hit=time_hit, key=key)
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(verbose=False):
+    n_estimators = [10, 50, 100, 200]
+    X, y = make_classification(10000, n_features=20, n_classes=3,
+                               n_informative=6, random_state=0)
+    X = X.astype(np.float32)
+
+    start = time()
+    with tempfile.TemporaryDirectory() as temp:
+        results = bench(n_estimators, X, y, ConversionCache(temp),
+                        verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import sklearn
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "scikit-learn", "version": sklearn.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_convert_cache.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_convert_cache.csv", index=False)
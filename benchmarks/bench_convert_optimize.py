@@ -0,0 +1,220 @@
+# coding: utf-8
+"""
+Benchmark of the graph optimization done by convert_sklearn
+with *optimize=True*. The models are collected by running the unit
+tests in folder *tests* while *convert_sklearn* records its
+parameters, every model with numerical inputs is converted again
+with and without optimization, the benchmark compares the number
+of nodes and the latency of onnxruntime on random inputs.
+"""
+# License: MIT
+import glob
+import os
+import sys
+import unittest
+import warnings
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from numpy.testing import assert_array_equal
+from onnxruntime import InferenceSession, set_default_logger_severity
+import skl2onnx
+import skl2onnx.convert
+from skl2onnx.common.data_types import (
+    DoubleTensorType, FloatTensorType, Int64TensorType)
+
+
+##############################
+# Collects the models
+##############################
+
+def collect_models(pattern="test_sklearn_*.py", verbose=False):
+    """
+    Runs the unit tests matching *pattern* and returns the
+    parameters of every call to *convert_sklearn*.
+    """
+    folder = os.path.join(os.path.dirname(__file__), '..', 'tests')
+    folder = os.path.abspath(folder)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    calls = []
+    original = skl2onnx.convert.convert_sklearn
+
+    def recorder(model, name=None, initial_types=None, *args, **kwargs):
+        if initial_types is not None and all(
+                isinstance(t[1], (FloatTensorType, DoubleTensorType,
+                                  Int64TensorType))
+                for t in initial_types):
+            keep = {k: v for k, v in kwargs.items()
+                    if k in ('target_opset', 'options', 'dtype')}
+            calls.append((model, initial_types, keep))
+        return original(model, name, initial_types, *args, **kwargs)
+
+    skl2onnx.convert_sklearn = recorder
+    skl2onnx.convert.convert_sklearn = recorder
+    try:
+        loader = unittest.TestLoader()
+        suite = unittest.TestSuite()
+        for name in sorted(glob.glob(os.path.join(folder, pattern))):
+            module = os.path.splitext(os.path.basename(name))[0]
+            try:
+                suite.addTests(loader.loadTestsFromName(module))
+            except Exception:  # noqa
+                continue
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            with open(os.devnull, 'w') as devnull:
+                unittest.TextTestRunner(stream=devnull).run(suite)
+    finally:
+        skl2onnx.convert_sklearn = original
+        skl2onnx.convert.convert_sklearn = original
+    if verbose:
+        print("collected %d models" % len(calls))
+    return calls
+
+
+def random_inputs(model, initial_types, n_rows=100):
+    """
+    Returns random inputs for a model, unknown dimensions
+    are the number of rows or the number of features the model
+    was trained on, it returns None if they cannot be guessed.
+    """
+    inputs = {}
+    rnd = np.random.RandomState(0)
+    n_features = getattr(model, 'n_features_in_', None)
+    for name, ty in initial_types:
+        shape = list(ty.shape)
+        if len(shape) != 2:
+            return None
+        if shape[0] is None:
+            shape[0] = n_rows
+        if shape[1] is None:
+            if n_features is None or len(initial_types) > 1:
+                return None
+            shape[1] = n_features
+        if isinstance(ty, Int64TensorType):
+            inputs[name] = rnd.randint(0, 3, size=shape).astype(np.int64)
+        elif isinstance(ty, DoubleTensorType):
+            inputs[name] = rnd.randn(*shape).astype(np.float64)
+        else:
+            inputs[name] = rnd.randn(*shape).astype(np.float32)
+    return inputs
+
+
+##############################
+# Benchmarks
+##############################
+
+def measure_latency(onx, inputs, repeat=20):
+    sess = InferenceSession(onx.SerializeToString())
+    outputs = sess.run(None, inputs)
+    st = time()
+    for _ in range(repeat):
+        sess.run(None, inputs)
+    return (time() - st) / repeat, outputs
+
+
+def _to_array(value):
+    if isinstance(value, list) and len(value) > 0 and isinstance(
+            value[0], dict):
+        # ZipMap
+        return np.array([[d[k] for k in sorted(d)] for d in value])
+    return np.array(value)
+
+
+def same_outputs(expected, got):
+    try:
+        for e, g in zip(expected, got):
+            # nan are equal
+            assert_array_equal(_to_array(e), _to_array(g))
+    except AssertionError:
+        return False
+    return True
+
+
+def bench(calls, repeat=20, n_rows=100, verbose=False):
+    res = []
+    for model, initial_types, kwargs in calls:
+        inputs = random_inputs(model, initial_types, n_rows=n_rows)
+        if inputs is None:
+            continue
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                onx = skl2onnx.convert_sklearn(
+                    model, initial_types=initial_types, **kwargs)
+            latency, expected = measure_latency(onx, inputs, repeat)
+        except Exception:  # noqa
+            # random inputs do not fit every model
+            continue
+        obs = dict(model=type(model).__name__, n_rows=n_rows,
+                   n_nodes=len(onx.graph.node), latency=latency)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                opt = skl2onnx.convert_sklearn(
+                    model, initial_types=initial_types, optimize=True,
+                    **kwargs)
+            latency_opt, got = measure_latency(opt, inputs, repeat)
+            obs.update(dict(n_nodes_opt=len(opt.graph.node),
+                            latency_opt=latency_opt,
+                            same=same_outputs(expected, got), error=''))
+        except Exception as e:
+            # the optimized model must work if the original one does
+            obs.update(dict(n_nodes_opt=np.nan, latency_opt=np.nan,
+                            same=False, error=str(e)))
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(pattern="test_sklearn_*.py", repeat=20, n_rows=(1, 100),
+              verbose=False):
+    # random inputs do not fit every model, errors are not displayed
+    set_default_logger_severity(4)
+    calls = collect_models(pattern, verbose=verbose)
+
+    start = time()
+    results = []
+    for n in n_rows:
+        results.extend(bench(calls, repeat=repeat, n_rows=n,
+                             verbose=verbose))
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    for n in n_rows:
+        if results_df.shape[0] == 0:
+            break
+        df = results_df[results_df.n_rows == n]
+        reduced = df[df.n_nodes_opt < df.n_nodes]
+        print("n_rows=%d: %d/%d models lost %d/%d nodes, "
+              "latency ratio %1.3f, %d errors, %d different outputs" % (
+                  n, reduced.shape[0], df.shape[0],
+                  (df.n_nodes - df.n_nodes_opt).sum(), df.n_nodes.sum(),
+                  reduced.latency_opt.sum() /
+                  max(reduced.latency.sum(), 1e-9),
+                  (df.error != '').sum(), (~df.same).sum()))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import onnxruntime
+    import sklearn
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "scikit-learn", "version": sklearn.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "onnxruntime", "version": onnxruntime.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_convert_optimize.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_convert_optimize.csv", index=False)
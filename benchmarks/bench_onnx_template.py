@@ -0,0 +1,135 @@
+# coding: utf-8
+"""
+Benchmark of a converter adding the same block of nodes
+many times with different constants. It compares
+the conversion time when every block is built with
+:class:`OnnxOperator <skl2onnx.algebra.onnx_operator.OnnxOperator>`
+and when the block is compiled once into a template.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from sklearn.base import BaseEstimator, TransformerMixin
+from skl2onnx import convert_sklearn, update_registered_converter
+from skl2onnx.algebra.onnx_ops import OnnxAdd, OnnxMul
+from skl2onnx.common.data_types import FloatTensorType
+
+
+##############################
+# Model producing many blocks.
+##############################
+
+class ManyBlocksTransformer(BaseEstimator, TransformerMixin):
+    "Transformer converted into *n_blocks* blocks ``X * W + B``."
+
+    def __init__(self, n_blocks=10, use_template=False):
+        BaseEstimator.__init__(self)
+        TransformerMixin.__init__(self)
+        self.n_blocks = n_blocks
+        self.use_template = use_template
+
+    def fit(self, X, y=None):
+        rnd = np.random.RandomState(0)
+        self.coef_ = rnd.randn(self.n_blocks, X.shape[1]).astype(
+            np.float32)
+        self.intercept_ = rnd.randn(self.n_blocks, X.shape[1]).astype(
+            np.float32)
+        return self
+
+    def transform(self, X):
+        return sum(X * w + b for w, b in zip(self.coef_, self.intercept_))
+
+
+def many_blocks_shape_calculator(operator):
+    operator.outputs[0].type = FloatTensorType(
+        operator.inputs[0].type.shape)
+
+
+def many_blocks_converter(scope, operator, container):
+    op = operator.raw_operator
+    opv = container.target_opset
+    X = operator.inputs[0]
+    outputs = []
+    if op.use_template:
+        block = OnnxAdd(OnnxMul('X', 'W', op_version=opv), 'B',
+                        op_version=opv, output_names=['Y'])
+        template = block.compile(
+            [('X', FloatTensorType()), ('W', FloatTensorType()),
+             ('B', FloatTensorType())],
+            outputs=[('Y', FloatTensorType())], target_opset=opv)
+        for w, b in zip(op.coef_, op.intercept_):
+            outputs.extend(template.add_to(scope, container, [X, w, b]))
+    else:
+        for w, b in zip(op.coef_, op.intercept_):
+            block = OnnxAdd(OnnxMul(X, w, op_version=opv), b,
+                            op_version=opv)
+            block.add_to(scope, container)
+            outputs.append(block.outputs[0])
+    container.add_node('Sum', outputs, operator.outputs[0].full_name,
+                       name=scope.get_unique_operator_name('Sum'))
+
+
+update_registered_converter(
+    ManyBlocksTransformer, "ManyBlocksTransformer",
+    many_blocks_shape_calculator, many_blocks_converter)
+
+
+##############################
+# Benchmarks
+##############################
+
+def measure(model, repeat):
+    times = []
+    for r in range(repeat):
+        st = time()
+        convert_sklearn(
+            model, initial_types=[('X', FloatTensorType([None, 4]))])
+        times.append(time() - st)
+    return min(times)
+
+
+def bench(sizes, repeat=3, verbose=False):
+    res = []
+    X = np.zeros((1, 4), dtype=np.float32)
+    for n in sizes:
+        obs = dict(n_blocks=n)
+        for use_template in [False, True]:
+            model = ManyBlocksTransformer(n, use_template).fit(X)
+            obs['time_template_%s' % use_template] = measure(model, repeat)
+        obs['speedup'] = (obs['time_template_False'] /
+                          obs['time_template_True'])
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(repeat=3, verbose=False):
+    sizes = [10, 100, 500]
+
+    start = time()
+    results = bench(sizes, repeat=repeat, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_onnx_template.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_onnx_template.csv", index=False)
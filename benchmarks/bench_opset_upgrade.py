@@ -0,0 +1,89 @@
+# coding: utf-8
+"""
+Benchmark of :func:`upgrade_opset_number
+<skl2onnx.helpers.onnx_rare_helper.upgrade_opset_number>`
+on models with many nodes. Half of the nodes are *TopK*
+which must be rewritten when the opset moves from 9 to 10,
+the other half are *Add* which are left unchanged.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from onnx import TensorProto
+from onnx.helper import (
+    make_graph, make_model, make_node, make_opsetid, make_tensor_value_info)
+from onnx.numpy_helper import from_array
+from skl2onnx.helpers.onnx_rare_helper import upgrade_opset_number
+
+
+##############################
+# Large models.
+##############################
+
+def create_model(n_nodes):
+    nodes = []
+    last = 'X'
+    for i in range(n_nodes // 2):
+        nodes.append(make_node('TopK', [last], ['V%d' % i, 'I%d' % i],
+                               k=1, name='topk%d' % i))
+        nodes.append(make_node('Add', ['V%d' % i, 'one'], ['A%d' % i],
+                               name='add%d' % i))
+        last = 'A%d' % i
+    graph = make_graph(
+        nodes, 'large',
+        [make_tensor_value_info('X', TensorProto.FLOAT, [None, 1])],
+        [make_tensor_value_info(last, TensorProto.FLOAT, [None, 1])],
+        [from_array(np.array([1], dtype=np.float32), name='one')])
+    return make_model(graph, opset_imports=[make_opsetid('', 9)])
+
+
+##############################
+# Benchmarks
+##############################
+
+def bench(sizes, verbose=False):
+    res = []
+    for n in sizes:
+        model = create_model(n)
+        obs = dict(n_nodes=n)
+        st = time()
+        model10 = upgrade_opset_number(model, 10)
+        obs['time_upgrade'] = time() - st
+        st = time()
+        upgrade_opset_number(model10, 9)
+        obs['time_downgrade'] = time() - st
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(verbose=False):
+    sizes = [1000, 10000, 100000, 200000]
+
+    start = time()
+    results = bench(sizes, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_opset_upgrade.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_opset_upgrade.csv", index=False)
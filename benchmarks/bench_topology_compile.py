@@ -0,0 +1,98 @@
+# coding: utf-8
+"""
+Benchmark of the steps of *Topology.compile* which simplify
+the graph, the removal of unreachable operators and the
+removal of identity operators. The time spent per operator
+should remain constant when the number of operators grows.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import pandas
+from skl2onnx.common._topology import Topology
+from skl2onnx.common.data_types import FloatTensorType
+
+
+##############################
+# Topology to simplify.
+##############################
+
+def build_topology(n_operators):
+    """
+    Builds a chain of *n_operators* operators, every other
+    operator is an identity, and a cycle of two operators
+    which cannot be reached from the input.
+    """
+    topology = Topology(None, registered_models={})
+    scope = topology.declare_scope('__root__')
+    X = scope.declare_local_variable('X', FloatTensorType())
+    last = X
+    for i in range(n_operators):
+        op = scope.declare_local_operator(
+            'identity' if i % 2 == 0 else 'Op')
+        op.inputs.append(last)
+        last = scope.declare_local_variable('V%d' % i, FloatTensorType())
+        op.outputs.append(last)
+    # unreachable operators, a cycle
+    U = scope.declare_local_variable('U', FloatTensorType())
+    W = scope.declare_local_variable('W', FloatTensorType())
+    for a, b in [(U, W), (W, U)]:
+        op = scope.declare_local_operator('Op')
+        op.inputs.append(a)
+        op.outputs.append(b)
+    return topology
+
+
+##############################
+# Benchmarks
+##############################
+
+def bench(sizes, verbose=False):
+    res = []
+    for n in sizes:
+        topology = build_topology(n)
+        st = time()
+        topology._prune()
+        time_prune = time() - st
+        st = time()
+        topology._resolve_duplicates()
+        time_resolve = time() - st
+        n_ops = len(list(topology.unordered_operator_iterator()))
+        obs = dict(n_operators=n, n_operators_after=n_ops,
+                   time_prune=time_prune,
+                   time_resolve_duplicates=time_resolve,
+                   time_per_operator=(time_prune + time_resolve) / n)
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(verbose=False):
+    sizes = [100, 200, 400, 800, 1600, 3200, 6400]
+
+    start = time()
+    results = bench(sizes, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import numpy
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": numpy.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_topology_compile.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_topology_compile.csv", index=False)
@@ -0,0 +1,92 @@
+# coding: utf-8
+"""
+Benchmark of the topological traversal of a topology
+when the number of operators grows. The time spent per
+operator should remain constant.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import pandas
+from skl2onnx.common._topology import Topology
+from skl2onnx.common.data_types import FloatTensorType
+
+
+##############################
+# Topology to traverse.
+##############################
+
+def build_topology(n_operators, n_branches=3):
+    """
+    Builds a topology with *n_operators* operators
+    spread over *n_branches* chains sharing the same input,
+    the operators of every chain are declared in reverse order
+    to mimic a pipeline parsed from the last step.
+    """
+    topology = Topology(None, registered_models={})
+    scope = topology.declare_scope('__root__')
+    X = scope.declare_local_variable('X', FloatTensorType())
+    per_branch = max(n_operators // n_branches, 1)
+    for b in range(n_branches):
+        variables = [X] + [
+            scope.declare_local_variable(
+                'V%d_%d' % (b, i), FloatTensorType())
+            for i in range(per_branch)]
+        for i in reversed(range(per_branch)):
+            op = scope.declare_local_operator('Op%d' % b)
+            op.inputs.append(variables[i])
+            op.outputs.append(variables[i + 1])
+    return topology
+
+
+##############################
+# Benchmarks
+##############################
+
+def bench(sizes, repeat=3, verbose=False):
+    res = []
+    for n in sizes:
+        topology = build_topology(n)
+        n_ops = len(list(topology.unordered_operator_iterator()))
+        times = []
+        for r in range(repeat):
+            st = time()
+            ops = list(topology.topological_operator_iterator())
+            times.append(time() - st)
+        assert len(ops) == n_ops
+        obs = dict(n_operators=n_ops, time=min(times),
+                   time_per_operator=min(times) / n_ops)
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(repeat=3, verbose=False):
+    sizes = [100, 200, 400, 800, 1600, 3200, 6400, 12800]
+
+    start = time()
+    results = bench(sizes, repeat=repeat, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import numpy
+    import onnx
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": numpy.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_topology_scaling.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_topology_scaling.csv", index=False)
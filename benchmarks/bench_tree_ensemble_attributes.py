@@ -0,0 +1,86 @@
+# coding: utf-8
+"""
+Benchmark of the conversion of big random forests,
+it measures the time spent to build the attributes
+of the tree ensemble and the whole conversion time
+with and without parallelism.
+"""
+# License: MIT
+from time import perf_counter as time
+
+import numpy as np
+import pandas
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from skl2onnx import to_onnx
+from skl2onnx.common.tree_ensemble import (
+    add_tree_to_attribute_pairs,
+    get_default_tree_classifier_attribute_pairs)
+
+
+##############################
+# Benchmarks
+##############################
+
+def build_attributes(model, dtype):
+    attrs = get_default_tree_classifier_attribute_pairs()
+    weight = 1. / len(model.estimators_)
+    for tree_id, est in enumerate(model.estimators_):
+        add_tree_to_attribute_pairs(attrs, True, est.tree_, tree_id,
+                                    weight, 0, True, True, dtype=dtype)
+    return attrs
+
+
+def bench(n_estimators, X, y, verbose=False):
+    res = []
+    for n in n_estimators:
+        model = RandomForestClassifier(
+            n_estimators=n, random_state=0).fit(X, y)
+        n_nodes = sum(est.tree_.node_count for est in model.estimators_)
+        obs = dict(n_estimators=n, n_nodes=n_nodes)
+        for dtype in [np.float32, np.float64]:
+            st = time()
+            build_attributes(model, dtype)
+            obs['attrs_%s' % dtype.__name__] = time() - st
+            for n_jobs in [None, -1]:
+                st = time()
+                to_onnx(model, X[:1].astype(dtype), n_jobs=n_jobs)
+                obs['to_onnx_%s_njobs%s' % (dtype.__name__, n_jobs)] = (
+                    time() - st)
+        res.append(obs)
+        if verbose:
+            print("bench", len(res), ":", obs)
+    return res
+
+
+def run_bench(verbose=False):
+    n_estimators = [10, 50, 100, 200]
+    X, y = make_classification(10000, n_features=20, n_classes=3,
+                               n_informative=6, random_state=0)
+
+    start = time()
+    results = bench(n_estimators, X, y, verbose=verbose)
+    end = time()
+
+    results_df = pandas.DataFrame(results)
+    print("Total time = %0.3f sec\n" % (end - start))
+    return results_df
+
+
+if __name__ == '__main__':
+    from datetime import datetime
+    import onnx
+    import sklearn
+    import skl2onnx
+    df = pandas.DataFrame([
+        {"name": "date", "version": str(datetime.now())},
+        {"name": "numpy", "version": np.__version__},
+        {"name": "scikit-learn", "version": sklearn.__version__},
+        {"name": "onnx", "version": onnx.__version__},
+        {"name": "skl2onnx", "version": skl2onnx.__version__},
+    ])
+    df.to_csv("bench_tree_ensemble_attributes.time.csv", index=False)
+    print(df)
+    df = run_bench(verbose=True)
+    print(df)
+    df.to_csv("bench_tree_ensemble_attributes.csv", index=False)
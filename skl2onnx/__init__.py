@@ -15,13 +15,35 @@ __domain__ = "ai.onnx"
 __model_version__ = 0
 
 
+import sys
 from .convert import convert_sklearn, to_onnx, wrap_as_onnx_mixin # noqa
-from ._supported_operators import ( # noqa
-    update_registered_converter, get_model_alias
-)
-from ._parse import update_registered_parser # noqa
 from .proto import get_latest_tested_opset_version # noqa
 
+# The following functions import every supported scikit-learn model,
+# the modules defining them are imported on first use.
+_lazy_functions = {
+    'update_registered_converter': '_supported_operators',
+    'get_model_alias': '_supported_operators',
+    'update_registered_parser': '_parse',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_functions:
+        from importlib import import_module
+        module = import_module('.' + _lazy_functions[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+
+if sys.version_info[:2] < (3, 7):
+    # Module attributes cannot be resolved on demand before Python 3.7.
+    from ._supported_operators import ( # noqa
+        update_registered_converter, get_model_alias
+    )
+    from ._parse import update_registered_parser # noqa
+
 
 def supported_converters(from_sklearn=False):
     """
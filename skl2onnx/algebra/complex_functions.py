@@ -12,6 +12,28 @@ from .onnx_ops import (
     OnnxSqrt, OnnxPow, OnnxAbs, OnnxReduceSum
 )
 
+# Scan bodies only depend on the metric, the float type, the opset
+# and the dimension of the inputs, they are compiled once
+# into OnnxTemplate. The least recently used ones are removed
+# when there are more than SCAN_BODIES_CACHE_SIZE of them.
+_scan_bodies = OrderedDict()
+
+# Maximum number of templates kept in _scan_bodies.
+SCAN_BODIES_CACHE_SIZE = 128
+
+
+def _get_scan_body(key):
+    template = _scan_bodies.get(key, None)
+    if template is not None:
+        _scan_bodies.move_to_end(key)
+    return template
+
+
+def _set_scan_body(key, template):
+    _scan_bodies[key] = template
+    while len(_scan_bodies) > SCAN_BODIES_CACHE_SIZE:
+        _scan_bodies.popitem(last=False)
+
 
 def onnx_squareform_pdist(X, metric='sqeuclidean', dtype=None,
                           op_version=None, **kwargs):
@@ -37,26 +59,31 @@ def _onnx_squareform_pdist_sqeuclidean(X, dtype=None, op_version=None,
     Returns the ONNX graph which computes
     ``squareform(pdist(X, metric='sqeuclidean'))``.
     """
-    diff = OnnxSub('next_in', 'next', output_names=['diff'],
-                   op_version=op_version)
-    id_next = OnnxIdentity('next_in', output_names=['next_out'],
-                           op_version=op_version)
-    norm = OnnxReduceSumSquare(diff, output_names=['norm'], axes=[1],
-                               op_version=op_version)
-    flat = OnnxSqueeze(norm, output_names=['scan_out'], axes=[1],
+    key = 'pdist', dtype, op_version
+    template = _get_scan_body(key)
+    if template is None:
+        diff = OnnxSub('next_in', 'next', output_names=['diff'],
                        op_version=op_version)
-    tensor_type = FloatTensorType if dtype == np.float32 else DoubleTensorType
-    id_next.set_onnx_name_prefix('pdistsqe')
-    scan_body = id_next.to_onnx(
-        OrderedDict([('next_in', tensor_type()),
-                     ('next', tensor_type())]),
-        outputs=[('next_out', tensor_type()),
-                 ('scan_out', tensor_type())],
-        other_outputs=[flat],
-        dtype=dtype, target_opset=op_version)
+        id_next = OnnxIdentity('next_in', output_names=['next_out'],
+                               op_version=op_version)
+        norm = OnnxReduceSumSquare(diff, output_names=['norm'], axes=[1],
+                                   op_version=op_version)
+        flat = OnnxSqueeze(norm, output_names=['scan_out'], axes=[1],
+                           op_version=op_version)
+        tensor_type = (FloatTensorType if dtype == np.float32
+                       else DoubleTensorType)
+        id_next.set_onnx_name_prefix('pdistsqe')
+        template = id_next.compile(
+            OrderedDict([('next_in', tensor_type()),
+                         ('next', tensor_type())]),
+            outputs=[('next_out', tensor_type()),
+                     ('scan_out', tensor_type())],
+            other_outputs=[flat],
+            dtype=dtype, target_opset=op_version)
+        _set_scan_body(key, template)
 
     node = OnnxScan(X, X, output_names=['u(scan0)', 'u(scan1)'],
-                    num_scan_inputs=1, body=scan_body.graph,
+                    num_scan_inputs=1, body=template.graph,
                     op_version=op_version, **kwargs)
     return node[1]
 
@@ -105,30 +132,57 @@ def onnx_cdist(XA, XB, metric='sqeuclidean', dtype=None,
             metric))
 
 
-def _onnx_cdist_begin(op_version):
+def _onnx_cdist_body(metric, dtype, op_version, dim_in=None, p=None):
+    """
+    Returns the body of the *Scan* operator computing
+    the distances between one row and every row of a matrix.
+    """
+    key = metric, dtype, op_version, dim_in, p
+    template = _get_scan_body(key)
+    if template is not None:
+        return template.graph
+
     diff = OnnxSub('next_in', 'next', output_names=[
                    'diff'], op_version=op_version)
     id_next = OnnxIdentity('next_in', output_names=[
                            'next_out'], op_version=op_version)
-    return diff, id_next
-
+    if metric == 'sqeuclidean':
+        norm = OnnxReduceSumSquare(
+            diff, output_names=['norm'], axes=[1],
+            keepdims=0, op_version=op_version)
+    elif metric == 'minkowski':
+        diff_pow = OnnxPow(OnnxAbs(diff, op_version=op_version),
+                           np.array([p], dtype=dtype), op_version=op_version)
+        norm = OnnxReduceSum(
+            diff_pow, axes=[1], output_names=['norm'],
+            keepdims=0, op_version=op_version)
+    elif metric == 'manhattan':
+        diff_pow = OnnxAbs(diff, op_version=op_version)
+        norm = OnnxReduceSum(diff_pow, axes=[1], output_names=[
+                             'norm'], keepdims=0, op_version=op_version)
+    else:
+        raise NotImplementedError("metric='{}' is not implemented.".format(
+            metric))
+    flat = OnnxIdentity(norm, output_names=['scan_out'], op_version=op_version)
 
-def _onnx_cdist_end(XA, XB, id_next, flat, dtype, op_version,
-                    dim_in=None, dim_out=None, **kwargs):
     tensor_type = FloatTensorType if dtype == np.float32 else DoubleTensorType
     id_next.set_onnx_name_prefix('cdistd')
     shape_in = (tensor_type() if dim_in is None
                 else tensor_type([None, dim_in]))
-    scan_body = id_next.to_onnx(
+    template = id_next.compile(
         OrderedDict([('next_in', shape_in),
                      ('next', tensor_type())]),
         outputs=[('next_out', tensor_type()),
                  ('scan_out', tensor_type())],
         other_outputs=[flat],
         dtype=dtype, target_opset=op_version)
+    _set_scan_body(key, template)
+    return template.graph
+
 
+def _onnx_cdist_end(XA, XB, scan_body, op_version, **kwargs):
     node = OnnxScan(XA, XB, output_names=['u(scan0)', 'u(scan1)'],
-                    num_scan_inputs=1, body=scan_body.graph,
+                    num_scan_inputs=1, body=scan_body,
                     op_version=op_version)
     return OnnxTranspose(node[1], perm=[1, 0], op_version=op_version,
                          **kwargs)
@@ -140,13 +194,9 @@ def _onnx_cdist_sqeuclidean(XA, XB, dtype=None, op_version=None,
     Returns the ONNX graph which computes
     ``cdist(X, metric='sqeuclidean')``.
     """
-    diff, id_next = _onnx_cdist_begin(op_version)
-    norm = OnnxReduceSumSquare(
-        diff, output_names=['norm'], axes=[1],
-        keepdims=0, op_version=op_version)
-    flat = OnnxIdentity(norm, output_names=['scan_out'], op_version=op_version)
-    return _onnx_cdist_end(XA, XB, id_next, flat, dtype, op_version,
-                           dim_in=dim_in, dim_out=dim_out, **kwargs)
+    scan_body = _onnx_cdist_body('sqeuclidean', dtype, op_version,
+                                 dim_in=dim_in)
+    return _onnx_cdist_end(XA, XB, scan_body, op_version, **kwargs)
 
 
 def _onnx_cdist_minkowski(XA, XB, dtype=None, op_version=None, p=2,
@@ -155,15 +205,9 @@ def _onnx_cdist_minkowski(XA, XB, dtype=None, op_version=None, p=2,
     Returns the ONNX graph which computes the Minkowski distance
     or ``minkowski(XA, XB, p)``.
     """
-    diff, id_next = _onnx_cdist_begin(op_version)
-    diff_pow = OnnxPow(OnnxAbs(diff, op_version=op_version),
-                       np.array([p], dtype=dtype), op_version=op_version)
-    norm = OnnxReduceSum(
-        diff_pow, axes=[1], output_names=['norm'],
-        keepdims=0, op_version=op_version)
-    flat = OnnxIdentity(norm, output_names=['scan_out'], op_version=op_version)
-    return _onnx_cdist_end(XA, XB, id_next, flat, dtype, op_version,
-                           dim_in=dim_in, dim_out=dim_out, **kwargs)
+    scan_body = _onnx_cdist_body('minkowski', dtype, op_version,
+                                 dim_in=dim_in, p=p)
+    return _onnx_cdist_end(XA, XB, scan_body, op_version, **kwargs)
 
 
 def _onnx_cdist_manhattan(XA, XB, dtype=None, op_version=None,
@@ -172,10 +216,6 @@ def _onnx_cdist_manhattan(XA, XB, dtype=None, op_version=None,
     Returns the ONNX graph which computes the Manhattan distance
     or ``Manhattan(X, Y)``.
     """
-    diff, id_next = _onnx_cdist_begin(op_version)
-    diff_pow = OnnxAbs(diff, op_version=op_version)
-    norm = OnnxReduceSum(diff_pow, axes=[1], output_names=[
-                         'norm'], keepdims=0, op_version=op_version)
-    flat = OnnxIdentity(norm, output_names=['scan_out'], op_version=op_version)
-    return _onnx_cdist_end(XA, XB, id_next, flat, dtype, op_version,
-                           dim_in=dim_in, dim_out=dim_out, **kwargs)
+    scan_body = _onnx_cdist_body('manhattan', dtype, op_version,
+                                 dim_in=dim_in)
+    return _onnx_cdist_end(XA, XB, scan_body, op_version, **kwargs)
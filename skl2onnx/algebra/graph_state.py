@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for
 # license information.
 # --------------------------------------------------------------------------
+import hashlib
 import numpy as np
 from scipy.sparse import coo_matrix
 from ..proto import onnx_proto, TensorProto
@@ -55,10 +56,12 @@ class GraphState:
         return self.computed_outputs
 
     def _get_var_name(self, var, unused, operator=None):
+        if isinstance(var, str):
+            return var
         if isinstance(var, Variable):
             return var.full_name
         if isinstance(var, (np.ndarray, np.bool, np.int64,
-                            np.float32, np.float64, np.bool)):
+                            np.float32, np.float64)):
             return self._add_constant(var)
         if hasattr(var, 'ConstantValue'):
             return self._add_constant(var.ConstantValue, var.ImplicitCast)
@@ -75,8 +78,6 @@ class GraphState:
             raise RuntimeError("Unexpected output type {}".format(outputs))
         if hasattr(var, 'name') and isinstance(var.name, str) and var.name:
             return var.name
-        if isinstance(var, str):
-            return var
         raise RuntimeError("Unexpected type for parameter 'var': {0}."
                            "".format(type(var)))
 
@@ -86,7 +87,7 @@ class GraphState:
             dtype = cst.dtype
             if dtype == np.float32:
                 ty = onnx_proto.TensorProto.FLOAT
-                astype = np.float64
+                astype = np.float32
             elif dtype == np.float64:
                 ty = onnx_proto.TensorProto.DOUBLE
                 astype = np.float64
@@ -114,16 +115,7 @@ class GraphState:
             return cst, ty, astype
 
         if isinstance(cst, np.ndarray):
-            shape = cst.shape
-            name = self.scope.get_unique_variable_name(
-                self.onnx_prefix + 'cst')
-            cst, ty, astype = _ty_astype(cst)
-            if astype is not None:
-                cst = cst.astype(astype)
-            self.container.add_initializer(
-                name, ty, shape, cst.flatten(),
-                can_cast=can_cast)
-            return name
+            return self._add_array_constant(cst, _ty_astype, can_cast)
         if isinstance(cst, coo_matrix):
             shape = cst.shape
             name = self.scope.get_unique_variable_name(
@@ -167,6 +159,56 @@ class GraphState:
             "You may raise an issue at https://github.com/onnx/"
             "sklearn-onnx/issues.".format(type(cst)))
 
+    def _add_array_constant(self, cst, ty_astype, can_cast):
+        """
+        Adds a numpy array as an initializer. If the container
+        deduplicates initializers, the array is looked up in its
+        constant pool, first by identity then by content,
+        and an existing initializer is reused without casting
+        or registering the array again.
+        """
+        container = self.container
+        pool = (container.constant_pool
+                if container.deduplicate_initializers else None)
+        key_id = id(cst), can_cast
+        if pool is not None:
+            found = pool.get(key_id, None)
+            if found is not None and found[0] is cst:
+                return found[1]
+
+        original = cst
+        shape = cst.shape
+        cst, ty, astype = ty_astype(cst)
+        if astype is not None:
+            if (can_cast and ty in (TensorProto.FLOAT, TensorProto.DOUBLE)
+                    and ty != container.proto_dtype):
+                # the container would cast it anyway
+                ty = container.proto_dtype
+                astype = container.dtype
+            cst = cst.astype(astype, copy=False)
+
+        key = None
+        if pool is not None and cst.dtype != np.object_:
+            cst = np.ascontiguousarray(cst)
+            key = ty, shape, hashlib.md5(cst).hexdigest()
+            found = pool.get(key, None)
+            if (found is not None and found[0].dtype == cst.dtype and
+                    np.array_equal(found[0], cst)):
+                pool[key_id] = original, found[1]
+                return found[1]
+
+        name = self.scope.get_unique_variable_name(
+            self.onnx_prefix + 'cst')
+        container.add_initializer(
+            name, ty, shape, cst.ravel(), can_cast=can_cast)
+        if pool is not None:
+            # The original array is kept to make sure its id
+            # is not reused by another array.
+            pool[key_id] = original, name
+            if key is not None:
+                pool[key] = cst, name
+        return name
+
     def _get_output_name(self, output):
         if isinstance(output, Variable):
             return output.full_name
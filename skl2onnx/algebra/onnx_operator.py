@@ -11,12 +11,14 @@ from ..common._topology import (
     Variable, Scope, _update_domain_version,
     _get_main_opset_version, OPSET_TO_IR_VERSION)
 from ..common._container import ModelComponentContainer
+from ..common._opset_index import get_opset_index
 from ..common import utils
 from .._supported_operators import sklearn_operator_name_map
 from ..proto import get_latest_tested_opset_version, onnx_proto
 from ..proto.onnx_helper_modified import make_graph, make_model
 from ..helpers.onnx_helper import infer_outputs
 from .graph_state import GraphState
+from .onnx_template import OnnxTemplate
 from .type_helper import _guess_type
 
 
@@ -202,12 +204,17 @@ class OnnxOperator:
         if not hasattr(self.__class__, 'past_version'):
             raise RuntimeError("Missing attribute 'past_version', there is "
                                "no other available schema.")
-        found = None
-        for v in self.past_version.values():
-            if v.since_version > op_version:
-                continue
-            if found is None or v.since_version > found.since_version:
-                found = v
+        cl = self.__class__
+        op = get_opset_index().resolve(
+            getattr(cl, 'domain', None) or '',
+            getattr(cl, 'operator_name', None), op_version)
+        found = self.past_version.get('{}_{}'.format(cl.__name__, op), None)
+        if found is None:
+            for v in self.past_version.values():
+                if v.since_version > op_version:
+                    continue
+                if found is None or v.since_version > found.since_version:
+                    found = v
         if found is None:
             raise RuntimeError(
                 "Operator '{}': requested version {} < "
@@ -632,6 +639,19 @@ class OnnxOperator:
         onnx_model.model_version = utils.get_model_version()
         return onnx_model
 
+    def compile(self, inputs, outputs=None, other_outputs=None,
+                dtype=np.float32, target_opset=None):
+        """
+        Converts this operator into an ONNX graph once and returns
+        a template which can be added many times to a container
+        (see :class:`OnnxTemplate
+        <skl2onnx.algebra.onnx_template.OnnxTemplate>`).
+        The parameters are the same as method :meth:`to_onnx`.
+        """
+        return OnnxTemplate(self, inputs, outputs=outputs,
+                            other_outputs=other_outputs, dtype=dtype,
+                            target_opset=target_opset)
+
     def enumerate_nodes(self):
         """
         Iterates on all nodes of the graph.
@@ -2,7 +2,9 @@
 Place holder for all ONNX operators.
 """
 import sys
+import threading
 import onnx
+from ..common._opset_index import get_opset_index
 from .automation import get_rst_doc
 
 
@@ -55,12 +57,18 @@ def ClassFactory(class_name, op_name, inputs, outputs,
         if op_version is not None:
             # attr_names refers to the most recent version of
             # this operator. We may need an older one.
-            for op in range(op_version, 0, -1):
-                name = '{}_{}'.format(self.__class__.__name__, op)
-                if name in self.past_version:
-                    found = (name, op)
-                    attr_names = self.past_version[name].attr_names
-                    break
+            op = get_opset_index().resolve(domain, op_name, op_version)
+            name = '{}_{}'.format(self.__class__.__name__, op)
+            if name in self.past_version:
+                found = (name, op)
+            else:
+                for op in range(op_version, 0, -1):
+                    name = '{}_{}'.format(self.__class__.__name__, op)
+                    if name in self.past_version:
+                        found = (name, op)
+                        break
+            if found is not None:
+                attr_names = self.past_version[found[0]].attr_names
         if (op_version_class is not None and found is not None and
                 found[-1] != op_version_class):
             raise RuntimeError(
@@ -92,53 +100,74 @@ def ClassFactory(class_name, op_name, inputs, outputs,
     return newclass
 
 
-def dynamic_class_creation():
+class _LazyDoc:
     """
-    Automatically generates classes for each of the operators
-    module *onnx* defines and described at
-    `Operators
-    <https://github.com/onnx/onnx/blob/master/docs/Operators.md>`_
-    and `Operators
-    <https://github.com/onnx/onnx/blob/master/docs/
-    Operators-ml.md>`_.
+    Renders the documentation of an operator
+    the first time attribute ``__doc__`` is read.
     """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.doc = None
+
+    def __get__(self, obj, cls=None):
+        if self.doc is None:
+            doc = get_rst_doc(self.schema)
+            self.doc = "**Version**" + doc.split('**Version**')[-1]
+        return self.doc
+
+
+def _get_schemas():
+    """
+    Returns a dictionary ``{ operator name: { class name suffix: schema } }``,
+    the suffix is the operator name for the most recent version
+    and ``<name>_<since_version>`` for every version.
+    Experimental operators are skipped.
+    """
+    global _all_schemas
+    if _all_schemas is not None:
+        return _all_schemas
     res = {}
     for schema in onnx.defs.get_all_schemas_with_history():
         if schema.support_level == schema.SupportType.EXPERIMENTAL:
             # Skips experimental operators.
             continue
+        versions = res.setdefault(schema.name, {})
         # Multiple version can coexist. The last one is kept.
-        if schema.name in res:
-            if schema.since_version > res[schema.name].since_version:
-                # We keep the most recent one.
-                res[schema.name] = schema
-        else:
-            res[schema.name] = schema
-        res[schema.name + '_' + str(schema.since_version)] = schema
-    cls = {}
+        if (schema.name not in versions or
+                schema.since_version > versions[schema.name].since_version):
+            versions[schema.name] = schema
+        versions[schema.name + '_' + str(schema.since_version)] = schema
+    _all_schemas = res
+    return res
 
+
+_all_schemas = None
+_lock = threading.Lock()
+
+
+def _create_classes(versions):
+    """
+    Creates the classes for every version of one operator,
+    *versions* is one value of the dictionary returned
+    by :func:`_get_schemas`.
+    """
     def _c(obj, label, i):
         name = '%s%d' % (obj.name or label, i)
         tys = obj.typeStr or ''
         return (name, tys)
 
-    for name in sorted(res):
-        schema = res[name]
-        doc = get_rst_doc(schema)
+    cls = {}
+    for name in sorted(versions):
+        schema = versions[name]
         inputs = [_c(o, 'I', i) for i, o in enumerate(schema.inputs)]
         outputs = [_c(o, 'O', i) for i, o in enumerate(schema.outputs)]
         args = [p for p in schema.attributes]
-
-        if '_' in name:
-            class_name = "Onnx" + name
-        else:
-            class_name = "Onnx" + schema.name
-
+        class_name = "Onnx" + name
         cl = ClassFactory(class_name, schema.name, inputs, outputs,
                           [schema.min_input, schema.max_input],
                           [schema.min_output, schema.max_output],
-                          schema.domain, args,
-                          "**Version**" + doc.split('**Version**')[-1],
+                          schema.domain, args, _LazyDoc(schema),
                           getattr(schema, 'deprecated', False),
                           schema.since_version, {})
         cls[class_name] = cl
@@ -154,6 +183,22 @@ def dynamic_class_creation():
     return cls
 
 
+def dynamic_class_creation():
+    """
+    Automatically generates classes for each of the operators
+    module *onnx* defines and described at
+    `Operators
+    <https://github.com/onnx/onnx/blob/master/docs/Operators.md>`_
+    and `Operators
+    <https://github.com/onnx/onnx/blob/master/docs/
+    Operators-ml.md>`_.
+    """
+    cls = {}
+    for versions in _get_schemas().values():
+        cls.update(_create_classes(versions))
+    return cls
+
+
 def _update_module():
     """
     Dynamically updates the module with operators defined
@@ -165,4 +210,30 @@ def _update_module():
         setattr(this, k, v)
 
 
-_update_module()
+def __getattr__(name):
+    """
+    Creates the classes of an operator the first time
+    one of them is requested (:pep:`562`), every version
+    is created at the same time to fill attribute *past_version*.
+    """
+    if name.startswith('Onnx'):
+        versions = _get_schemas().get(name[4:].split('_')[0], None)
+        if versions is not None and name[4:] in versions:
+            with _lock:
+                if name not in globals():
+                    globals().update(_create_classes(versions))
+            return globals()[name]
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    names = set(globals())
+    for versions in _get_schemas().values():
+        names.update("Onnx" + name for name in versions)
+    return sorted(names)
+
+
+if sys.version_info[:2] < (3, 7):
+    # Module attributes cannot be resolved on demand before Python 3.7.
+    _update_module()
@@ -0,0 +1,132 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+import numpy as np
+from onnx.helper import get_attribute_value
+from onnx.numpy_helper import to_array
+from ..common._topology import Variable
+from ..common.data_types import _NP_TYPE_TO_TENSOR_TYPE
+
+
+class OnnxTemplate:
+    """
+    Graph compiled once from an :class:`OnnxOperator
+    <skl2onnx.algebra.onnx_operator.OnnxOperator>` expression.
+    Method :meth:`add_to` copies the nodes into a container
+    every time the same pattern is needed, it only renames
+    the variables and replaces the constants, it skips the schema
+    checks and the shape inference :meth:`OnnxOperator.to_onnx
+    <skl2onnx.algebra.onnx_operator.OnnxOperator.to_onnx>` does.
+    Subgraphs (attributes of operators such as *Scan*) are copied
+    as they are and cannot use any variable of the main graph.
+
+    :param op: :class:`OnnxOperator
+        <skl2onnx.algebra.onnx_operator.OnnxOperator>`
+    :param inputs: inputs of the expression, a dictionary or
+        a list of ``(name, type)``
+    :param outputs: outputs of the expression, inferred if None
+    :param other_outputs: additional outputs
+    :param dtype: *np.float32* or *np.float64*
+    :param target_opset: target opset
+    """
+
+    def __init__(self, op, inputs, outputs=None, other_outputs=None,
+                 dtype=np.float32, target_opset=None):
+        self.model = op.to_onnx(inputs, outputs=outputs,
+                                other_outputs=other_outputs,
+                                dtype=dtype, target_opset=target_opset)
+        graph = self.model.graph
+        self.input_names = [i.name for i in graph.input]
+        self.output_names = [o.name for o in graph.output]
+        self.opsets = {op.domain: op.version
+                       for op in self.model.opset_import}
+        # Initializers are converted once into numpy arrays.
+        self.initializers = [
+            (init.name, init.data_type, list(init.dims), to_array(init))
+            for init in graph.initializer]
+        self.nodes = [
+            (node.op_type, node.domain, list(node.input), list(node.output),
+             node.name or node.op_type,
+             {att.name: get_attribute_value(att) for att in node.attribute})
+            for node in graph.node]
+
+    @property
+    def graph(self):
+        """
+        Returns the compiled graph (*GraphProto*),
+        it must not be modified.
+        """
+        return self.model.graph
+
+    def add_to(self, scope, container, inputs, outputs=None,
+               constants=None):
+        """
+        Adds the nodes and the initializers of the template
+        into a container.
+
+        :param scope: scope
+        :param container: container
+        :param inputs: names, :class:`Variable
+            <skl2onnx.common._topology.Variable>` or numpy arrays
+            replacing the inputs of the template in the same order,
+            a numpy array is added as an initializer
+        :param outputs: names of the outputs, new names are
+            created if None
+        :param constants: dictionary ``{ name: numpy array }``,
+            replaces the initializers of the template
+        :return: names of the outputs
+        """
+        if len(inputs) != len(self.input_names):
+            raise RuntimeError(
+                "The template expects {} inputs not {}.".format(
+                    len(self.input_names), len(inputs)))
+        if outputs is not None and len(outputs) != len(self.output_names):
+            raise RuntimeError(
+                "The template produces {} outputs not {}.".format(
+                    len(self.output_names), len(outputs)))
+        if constants:
+            unknown = set(constants) - set(i[0] for i in self.initializers)
+            if unknown:
+                raise KeyError(
+                    "Unknown initializers {} in the template.".format(
+                        list(sorted(unknown))))
+
+        names = {'': ''}
+        for name, inp in zip(self.input_names, inputs):
+            if isinstance(inp, Variable):
+                names[name] = inp.onnx_name
+            elif isinstance(inp, np.ndarray):
+                new_name = scope.get_unique_variable_name(name)
+                container.add_initializer(
+                    new_name, _NP_TYPE_TO_TENSOR_TYPE[inp.dtype],
+                    list(inp.shape), inp.ravel())
+                names[name] = new_name
+            else:
+                names[name] = inp
+        for name, data_type, dims, value in self.initializers:
+            if constants and name in constants:
+                value = np.asarray(constants[name])
+                dims = list(value.shape)
+            new_name = scope.get_unique_variable_name(name)
+            container.add_initializer(new_name, data_type, dims,
+                                      value.ravel())
+            names[name] = new_name
+        if outputs is not None:
+            for name, out in zip(self.output_names, outputs):
+                names[name] = (out.onnx_name if isinstance(out, Variable)
+                               else out)
+
+        for op_type, domain, node_inputs, node_outputs, name, attrs in \
+                self.nodes:
+            new_outputs = []
+            for out in node_outputs:
+                if out not in names:
+                    names[out] = scope.get_unique_variable_name(out)
+                new_outputs.append(names[out])
+            container.add_node(
+                op_type, [names[i] for i in node_inputs], new_outputs,
+                op_domain=domain, op_version=self.opsets.get(domain, None),
+                name=scope.get_unique_operator_name(name), **attrs)
+        return [names[name] for name in self.output_names]
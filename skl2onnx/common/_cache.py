@@ -0,0 +1,247 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+On-disk cache of converted models.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import numpy as np
+import onnx
+from onnx import ModelProto
+
+
+def _qualified_name(obj):
+    name = getattr(obj, '__qualname__', getattr(obj, '__name__', None))
+    return "%s.%s" % (getattr(obj, '__module__', ''),
+                      name or obj.__class__.__name__)
+
+
+class _Fingerprint:
+    """
+    Walks through an object and hashes everything it contains,
+    numpy arrays are hashed from their buffer without any copy
+    if they are contiguous. It remembers the path of every object
+    it goes through to replace ``id(obj)`` in the conversion options.
+    """
+
+    def __init__(self):
+        self.hash = hashlib.sha256()
+        self.paths = {}
+        # keeps temporary objects alive so that their id
+        # cannot be given to another object
+        self._alive = []
+
+    def _write(self, *args):
+        for a in args:
+            self.hash.update(str(a).encode('utf-8'))
+            self.hash.update(b'\x00')
+
+    def _update_code(self, code):
+        # marshal.dumps is not used, its output depends
+        # on the reference counts of the constants
+        self.hash.update(code.co_code)
+        self._write(code.co_names, code.co_varnames, code.co_freevars)
+        for c in code.co_consts:
+            if hasattr(c, 'co_code'):
+                self._update_code(c)
+            else:
+                self._write(type(c).__name__, repr(c))
+
+    def update(self, obj, path='model'):
+        if obj is None or isinstance(
+                obj, (bool, int, float, complex, str, bytes)):
+            self._write(type(obj).__name__, repr(obj))
+        elif isinstance(obj, np.ndarray):
+            if obj.dtype == np.object_:
+                self._write('ndarray-object', obj.shape)
+                self.update(obj.ravel().tolist(), path)
+            else:
+                self._write('ndarray', obj.dtype.descr, obj.shape)
+                self.hash.update(np.ascontiguousarray(obj).data)
+        elif isinstance(obj, np.generic):
+            self._write('generic', obj.dtype.str, repr(obj))
+        elif isinstance(obj, (type, np.ufunc)) or (
+                callable(obj) and hasattr(obj, '__qualname__')):
+            # classes, functions, the code distinguishes two lambdas
+            self._write('callable', _qualified_name(obj))
+            if hasattr(obj, '__code__'):
+                self._update_code(obj.__code__)
+        elif id(obj) in self.paths:
+            # already seen, avoids infinite recursion
+            self._write('ref', self.paths[id(obj)])
+        else:
+            self.paths[id(obj)] = path
+            self._alive.append(obj)
+            if isinstance(obj, (list, tuple)):
+                self._write(type(obj).__name__, len(obj))
+                for i, o in enumerate(obj):
+                    self.update(o, "%s[%d]" % (path, i))
+            elif isinstance(obj, dict):
+                self._write('dict', len(obj))
+                for k, v in sorted(obj.items(), key=lambda kv: repr(kv[0])):
+                    self.update(k, path)
+                    self.update(v, "%s[%r]" % (path, k))
+            elif hasattr(obj, '__dict__'):
+                # estimators, sparse matrices, ...
+                self._write('object', _qualified_name(type(obj)))
+                self.update(vars(obj), path)
+            else:
+                # objects implemented in C such as sklearn.tree._tree.Tree
+                self._write('reduce', _qualified_name(type(obj)))
+                try:
+                    reduced = obj.__reduce_ex__(4)
+                except TypeError:
+                    # not picklable, the key is only valid
+                    # in the current process
+                    self._write(repr(obj))
+                    return
+                if isinstance(reduced, str):
+                    # global objects such as numpy functions
+                    self._write(reduced)
+                else:
+                    self.update(tuple(reduced[1:3]), path)
+
+
+class ConversionCache:
+    """
+    Stores converted models on disk, the key is a fingerprint
+    of the fitted model and of the conversion parameters.
+    The fingerprint hashes the buffers of every numpy array held
+    by the model and is much faster than the conversion.
+    Entries are loaded from a memory mapped file and evicted
+    from the least recently used when the cache exceeds
+    *max_size* bytes or *max_entries* entries.
+    Converters registered after a model was cached are not
+    taken into account, the cache should be cleared in that case.
+
+    :param path: folder storing the entries, it is created
+        if it does not exist
+    :param max_size: maximum size of the cache in bytes,
+        None for no limit
+    :param max_entries: maximum number of entries,
+        None for no limit
+    """
+
+    def __init__(self, path, max_size=None, max_entries=None):
+        self.path = path
+        self.max_size = max_size
+        self.max_entries = max_entries
+        os.makedirs(path, exist_ok=True)
+
+    def make_key(self, model, **kwargs):
+        """
+        Returns the key of a fitted model converted with
+        parameters *kwargs*, the keys of *options* given as
+        ``id(obj)`` are replaced by the location of *obj* in *model*.
+        """
+        from .. import __version__
+        fp = _Fingerprint()
+        fp.update(model)
+        options = kwargs.get('options', None)
+        if options is not None:
+            kwargs['options'] = {fp.paths.get(k, k): v
+                                 for k, v in options.items()}
+        fp.update((__version__, onnx.__version__), 'versions')
+        fp.update(kwargs, 'parameters')
+        return fp.hash.hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self.path, key + '.onnx')
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.onnx'):
+                continue
+            full = os.path.join(self.path, name)
+            try:
+                st = os.stat(full)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+        return entries
+
+    def load(self, key):
+        """
+        Returns the model stored for *key* or None if there is none.
+        """
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    onx = ModelProto()
+                    try:
+                        onx.ParseFromString(m)
+                    except TypeError:
+                        # pure python implementation of protobuf
+                        onx.ParseFromString(m[:])
+        except (FileNotFoundError, ValueError):
+            # ValueError: empty file cannot be mapped
+            return None
+        # the modification time tracks the last use
+        os.utime(filename, None)
+        return onx
+
+    def store(self, key, onx):
+        """
+        Stores model *onx* for *key* and evicts the least recently
+        used entries if the cache is too big.
+        """
+        fd, temp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(onx.SerializeToString())
+            os.replace(temp, self._filename(key))
+        except BaseException:
+            os.remove(temp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache
+        verifies the constraints on size and number of entries.
+        """
+        if self.max_size is None and self.max_entries is None:
+            return
+        entries = sorted(self._entries())
+        size = sum(e[1] for e in entries)
+        while entries and (
+                (self.max_size is not None and size > self.max_size) or
+                (self.max_entries is not None and
+                 len(entries) > self.max_entries)):
+            _, file_size, full = entries.pop(0)
+            try:
+                os.remove(full)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        for _, __, full in self._entries():
+            os.remove(full)
+
+    def __len__(self):
+        return len(self._entries())
+
+
+def get_conversion_cache(cache):
+    """
+    Returns *cache* if it is None or a :class:`ConversionCache`,
+    a cache stored in folder *cache* if it is a string.
+    """
+    if cache is None or isinstance(cache, ConversionCache):
+        return cache
+    if isinstance(cache, str):
+        return ConversionCache(cache)
+    raise TypeError(
+        "cache must be None, a folder or a ConversionCache "
+        "not {}.".format(type(cache)))
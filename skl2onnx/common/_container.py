@@ -4,16 +4,18 @@
 # license information.
 # --------------------------------------------------------------------------
 
+import hashlib
 import inspect
+import os
 import re
 import six
 import sys
-import traceback
 import warnings
 import numpy as np
 from scipy.sparse import coo_matrix
 from onnx import onnx_pb as onnx_proto
-from onnx.defs import onnx_opset_version, get_all_schemas_with_history
+from onnx.numpy_helper import to_array
+from onnx.defs import onnx_opset_version
 import onnx.onnx_cpp2py_export.defs as C
 from onnxconverter_common.onnx_ops import __dict__ as dict_apply_operation
 from ..proto import TensorProto
@@ -27,15 +29,26 @@ except ImportError:
     # onnx is too old.
     SparseTensorProto = None
     make_sparse_tensor = None
+from ._opset_index import get_opset_index
+from .data_types import _TENSOR_TYPE_TO_NP_TYPE
 from .interface import ModelContainer
 from .utils import get_domain
 
 
+def _apply_name(op_type):
+    return 'apply_' + re.sub('(?<!^)([A-Z])', '_\\1', op_type).lower()
+
+
 def _get_operation_list():
     """
     Investigates this module to extract all ONNX functions
     which needs to be converted with these functions.
+    The result is cached, the source of every function is parsed
+    the first time it is called.
     """
+    global _apply_operation_specific
+    if _apply_operation_specific is not None:
+        return _apply_operation_specific
     regs = [re.compile("container.add_node[(]'([A-Z][a-zA-Z0-9]*)', "
                        "\\[?input_name"),
             re.compile("container.add_node[(]'([A-Z][a-zA-Z0-9]*)', "
@@ -56,7 +69,12 @@ def _get_operation_list():
                     break
             if found is None:
                 continue
+            # apply_tile also adds an Identity node,
+            # the function named after the operator is preferred
+            if found in res and k != _apply_name(found):
+                continue
             res[found] = v
+    _apply_operation_specific = res
     return res
 
 
@@ -88,7 +106,102 @@ def _build_options(model, defined_options, default_values,
     return opts
 
 
-_apply_operation_specific = _get_operation_list()
+_apply_operation_specific = None
+
+# If True, ModelComponentContainer.add_node checks that operators
+# implemented in submodule _apply_operation are added with the
+# corresponding function, it walks through the callstack for every node
+# and is only meant to debug a converter.
+CHECK_APPLY_OPERATION = False
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Initializers with at least this number of elements are stored
+# in field raw_data if the values are given as a numpy array.
+RAW_DATA_MIN_SIZE = 128
+
+# Kinds of numpy arrays which can be stored in raw_data
+# for every ONNX element type.
+_raw_data_kinds = {
+    TensorProto.FLOAT: 'biuf',
+    TensorProto.DOUBLE: 'biuf',
+    TensorProto.FLOAT16: 'biuf',
+    TensorProto.INT8: 'biu',
+    TensorProto.INT16: 'biu',
+    TensorProto.INT32: 'biu',
+    TensorProto.INT64: 'biu',
+    TensorProto.UINT8: 'biu',
+    TensorProto.UINT16: 'biu',
+    TensorProto.UINT32: 'biu',
+    TensorProto.UINT64: 'biu',
+    TensorProto.BOOL: 'b',
+}
+
+
+def _make_raw_tensor(name, onnx_type, shape, content):
+    """
+    Creates a *TensorProto* from a numpy array, the values are
+    written into field raw_data from the array buffer without
+    creating any python object for every element.
+    Returns None if the array cannot be stored that way.
+    """
+    kinds = _raw_data_kinds.get(onnx_type, None)
+    if kinds is None or content.dtype.kind not in kinds:
+        return None
+    dtype = np.dtype(_TENSOR_TYPE_TO_NP_TYPE[onnx_type]).newbyteorder('<')
+    tensor = TensorProto()
+    tensor.data_type = onnx_type
+    tensor.name = name
+    tensor.dims.extend(shape)
+    tensor.raw_data = np.ascontiguousarray(content, dtype=dtype).tobytes()
+    return tensor
+
+
+def _get_initializer_key(tensor, values):
+    """
+    Returns a key identifying the content of an initializer
+    without serializing it: element type, shape and a digest of
+    the buffer holding the values, the buffer itself is returned
+    to compare two initializers sharing the same key.
+    The function returns *(None, None)* if the values cannot
+    be stored in a numpy array (strings for example).
+
+    :param tensor: *TensorProto*
+    :param values: values used to create the tensor
+    :return: key, buffer
+    """
+    if tensor.raw_data:
+        buffer = tensor.raw_data
+    else:
+        dtype = _TENSOR_TYPE_TO_NP_TYPE.get(tensor.data_type, None)
+        if dtype is None or dtype == np.object_:
+            return None, None
+        try:
+            buffer = np.ascontiguousarray(np.asarray(values, dtype=dtype))
+        except (TypeError, ValueError):
+            return None, None
+        if buffer.dtype == np.object_:
+            return None, None
+    digest = hashlib.md5(buffer).hexdigest()
+    return (tensor.data_type, tuple(tensor.dims), digest), buffer
+
+
+def _same_initializer(tensor, buffer, external_data=None):
+    """
+    Compares the values stored in *tensor* with a buffer
+    returned by :func:`_get_initializer_key`, values of a tensor
+    stored in an external file are read back with *external_data*.
+    """
+    if tensor.data_location == TensorProto.EXTERNAL:
+        cached = external_data.read(tensor)
+        if isinstance(buffer, bytes):
+            return cached.tobytes() == buffer
+        return cached.tobytes() == buffer.tobytes()
+    if isinstance(buffer, bytes):
+        return tensor.raw_data == buffer
+    cached = to_array(tensor)
+    return (cached.dtype == buffer.dtype and
+            cached.tobytes() == buffer.tobytes())
 
 
 class _WhiteBlackContainer:
@@ -219,7 +332,9 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
 
     def __init__(self, target_opset, options=None, dtype=None,
                  registered_models=None,
-                 white_op=None, black_op=None):
+                 white_op=None, black_op=None,
+                 deduplicate_initializers=True, n_jobs=None,
+                 external_data=None):
         """
         :param target_opset: number, for example, 7 for *ONNX 1.2*, and
                              8 for *ONNX 1.3*.
@@ -230,6 +345,17 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
             while converting a pipeline, if empty, all are allowed
         :param black_op: black list of ONNX nodes allowed
             while converting a pipeline, if empty, none are blacklisted
+        :param deduplicate_initializers: if True, an initializer equal
+            to an existing one is replaced by an *Identity* node
+            (see :meth:`add_initializer`), a constant given twice
+            to the algebra API is only added once
+        :param n_jobs: number of threads converters may use to
+            extract the attributes of independent estimators,
+            None or 1 means no parallelism
+        :param external_data: None or an opened :class:`ExternalDataWriter
+            <skl2onnx.common._external_data.ExternalDataWriter>`,
+            big initializers are written into a file as soon as
+            they are added
         """
         if dtype is None:
             raise ValueError("dtype must be specified, it should be either "
@@ -243,13 +369,25 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
         # ONNX tensors (type: TensorProto). They are initializers of
         # ONNX GraphProto.
         self.initializers = []
-        self.initializers_strings = {}
+        # Index of the initializers to detect duplicates,
+        # key: see _get_initializer_key, value: list of (name, tensor).
+        self.initializers_index = {}
+        self.deduplicate_initializers = deduplicate_initializers
+        self.external_data = external_data
+        # Constants added through the algebra API (see GraphState),
+        # key: id of the numpy array or digest of its values,
+        # value: (array, initializer name).
+        self.constant_pool = {}
+        self.n_jobs = n_jobs
         # Intermediate variables in ONNX computational graph. They are
         # ValueInfoProto in ONNX.
         self.value_info = []
         # ONNX nodes (type: NodeProto) used to define computation
         # structure
         self.nodes = []
+        # Names of the nodes in self.nodes, it is updated by add_node
+        # to check a node name is unique in constant time.
+        self.node_names = set()
         # ONNX operators' domain-version pair set. They will be added
         # into opset_import field in the final ONNX model.
         self.node_domain_version_pair_sets = set()
@@ -365,10 +503,18 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
                           TensorProto.FLOAT and TensorProto.STRING.
         :param shape: Tensor shape, a list of integers.
         :param content: Flattened tensor values (i.e., a float list
-                        or a float array).
+                        or a float array), a numpy array is stored
+                        in field *raw_data* if it is big enough
+                        (see *RAW_DATA_MIN_SIZE*).
         :param can_cast: the method can take the responsability
             to cast the constant
         :return: created tensor
+
+        If *deduplicate_initializers* is True and the same values
+        were already added with the same type and shape, no initializer
+        is added but an *Identity* node pointing to the existing one.
+        Initializers are compared based on a digest of their values
+        and not on their serialization.
         """
         if (can_cast and isinstance(content, (np.ndarray, coo_matrix)) and
                 onnx_type in (TensorProto.FLOAT, TensorProto.DOUBLE) and
@@ -378,8 +524,10 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
 
         sparse_tensor = None
         tensor = None
+        external = None
 
         cached_value = None
+        values = content
         if isinstance(content, TensorProto):
             tensor = TensorProto()
             tensor.data_type = content.data_type
@@ -388,7 +536,8 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
             tensor.dims.extend(content.dims)
         elif shape is None and isinstance(
                 content, (np.float32, np.float64, np.int32, np.int64, float)):
-            tensor = make_tensor(name, onnx_type, [], [content])
+            values = [content]
+            tensor = make_tensor(name, onnx_type, [], values)
         elif (SparseTensorProto is not None and
                 isinstance(content, SparseTensorProto)):
             raise NotImplementedError("Not implemented yet.")
@@ -423,20 +572,41 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
         else:
             if any(d is None for d in shape):
                 raise ValueError('Shape of initializer cannot contain None.')
-            tensor = make_tensor(name, onnx_type, shape, content)
+            external = (None if self.external_data is None else
+                        self.external_data.as_array(onnx_type, content))
+            if external is not None:
+                # The values are written into the external file
+                # once the initializer is known to be new.
+                tensor = TensorProto()
+                tensor.data_type = onnx_type
+                tensor.name = name
+                tensor.dims.extend(shape)
+                values = external
+            elif (isinstance(content, np.ndarray) and
+                    content.size >= RAW_DATA_MIN_SIZE):
+                tensor = _make_raw_tensor(name, onnx_type, shape, content)
+            if tensor is None:
+                tensor = make_tensor(name, onnx_type, shape, content)
 
         if tensor is not None:
-            if cached_value is None:
+            if not self.deduplicate_initializers:
+                self._store_initializer(tensor, external)
+                return tensor
+            key, buffer = None, None
+            if isinstance(tensor, TensorProto):
+                key, buffer = _get_initializer_key(tensor, values)
+            if key is None:
+                # Strings or attributes, the serialization
+                # is used as a key.
                 name = tensor.name
                 tensor.name = "tensor"
-                content = tensor.SerializeToString()
+                key = tensor.SerializeToString()
                 tensor.name = name
-            else:
-                content = cached_value.SerializeToString()
-            cached_name = self.initializers_strings.get(content, None)
+            cached_name = self._find_initializer(key, buffer)
             if cached_name is None:
-                self.initializers_strings[content] = name
-                self.initializers.append(tensor)
+                self.initializers_index.setdefault(key, []).append(
+                    (name, tensor))
+                self._store_initializer(tensor, external)
                 return tensor
 
             self.add_node(
@@ -445,10 +615,12 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
             return name
 
         if sparse_tensor is not None:
-            content = cached_value.SerializeToString()
-            cached_name = self.initializers_strings.get(content, None)
+            key = cached_value.SerializeToString()
+            cached_name = (self._find_initializer(key, None)
+                           if self.deduplicate_initializers else None)
             if cached_name is None:
-                self.initializers_strings[content] = name
+                if self.deduplicate_initializers:
+                    self.initializers_index[key] = [(name, sparse_tensor)]
                 self.add_node(
                     'Constant', [], [name], sparse_value=sparse_tensor,
                     op_version=self.target_opset, name=name + '_op')
@@ -462,28 +634,67 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
         raise RuntimeError(
             "Either tensor or sparse_tensor should be defined.")
 
+    def _find_initializer(self, key, buffer):
+        """
+        Returns the name of an existing initializer with the same
+        content or None if there is none. Values are only compared
+        when two initializers share the same key.
+        """
+        candidates = self.initializers_index.get(key, None)
+        if candidates is None:
+            return None
+        if buffer is None:
+            # The key is the serialized content.
+            return candidates[0][0]
+        for name, tensor in candidates:
+            if _same_initializer(tensor, buffer, self.external_data):
+                return name
+        return None
+
+    def _store_initializer(self, tensor, external):
+        """
+        Appends a new initializer, its values are written into
+        the external file if the container has one, *external*
+        holds the values of a tensor created without any.
+        """
+        if external is not None:
+            self.external_data.write(tensor, external)
+        elif (self.external_data is not None and
+                isinstance(tensor, TensorProto)):
+            self.external_data.offload(tensor)
+        self.initializers.append(tensor)
+
     def add_value_info(self, variable):
         self.value_info.append(self._make_value_info(variable))
 
     def _check_operator(self, op_type):
         """
         Checks that if *op_type* is one of the operators defined in
-        :mod:`skl2onnx.common._apply_container`, then it was called
-        from a function defined in this submodule by looking
-        into the callstack. The test is enabled for *python >= 3.6*.
-        """
-        if (op_type in _apply_operation_specific and
+        :mod:`skl2onnx.common._apply_container`, then a converter
+        defined outside this package adds it with the function
+        defined in this submodule. Nodes added by this package
+        or by these functions are not checked. Looking into the
+        callstack is slow, the test is only enabled if
+        *CHECK_APPLY_OPERATION* is True and for *python >= 3.6*.
+        """
+        if (CHECK_APPLY_OPERATION and
+                op_type in _get_operation_list() and
                 sys.version_info[:2] >= (3, 6)):
-            tb = traceback.extract_stack()
-            operation = []
-            fct = _apply_operation_specific[op_type]
+            fct = _get_operation_list()[op_type]
+            # frame 0 is this method, frame 1 is add_node
+            frame = sys._getframe(2)
+            caller = frame.f_code.co_filename
+            if (caller == fct.__code__.co_filename or
+                    caller.startswith(_PACKAGE_DIR)):
+                frame = None
             skl2 = False
-            for b in tb:
-                if "_apply_operation" in b.filename and b.name == fct.__name__:
-                    operation.append(b)
-                    if not skl2 and "skl2onnx" in b.filename:
-                        skl2 = True
-            if skl2 and len(operation) == 0:
+            while frame is not None:
+                if frame.f_code.co_filename.startswith(_PACKAGE_DIR):
+                    # the converter is called by this package
+                    skl2 = True
+                    break
+                frame = frame.f_back
+            if skl2:
                 raise RuntimeError(
                     "Operator '{0}' should be added with function "
                     "'{1}' in submodule _apply_operation.".format(
@@ -515,8 +726,7 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
         if name is None or not isinstance(
                 name, str) or name == '':
             name = "N%d" % len(self.nodes)
-        existing_names = set(n.name for n in self.nodes)
-        if name in existing_names:
+        if name in self.node_names:
             name += "-N%d" % len(self.nodes)
 
         if op_domain is None:
@@ -569,6 +779,7 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
 
         self.node_domain_version_pair_sets.add((op_domain, op_version))
         self.nodes.append(node)
+        self.node_names.add(name)
         if (self.target_opset is not None and
                 op_version is not None and
                 op_version > self.target_opset_any_domain(op_domain)):
@@ -607,40 +818,25 @@ class ModelComponentContainer(ModelContainer, _WhiteBlackContainer):
         Determines the highest version of operator
         *op_type* below or equal to *target_opset*.
         """
-        if not hasattr(self, '_op_versions'):
-            self._build_op_version()
-        key = domain, op_type
-        vers = self._op_versions.get(key, None)
+        index = get_opset_index()
+        highest = self.target_opset_any_domain(domain)
+        version = index.resolve(domain, op_type, highest)
+        if version is not None:
+            return version
+        vers = index.get_versions(domain, op_type)
         if vers is None:
             warnings.warn(
                 "Unable to find operator '{}' in domain '{}' in ONNX, "
                 "op_version is forced to 1.".format(
                     op_type, domain))
             vers = [1]
-        highest = self.target_opset_any_domain(domain)
-        pos = len(vers) - 1
-        while pos >= 0:
-            if vers[pos] <= highest:
-                return vers[pos]
-            pos -= 1
+            if highest >= 1:
+                return 1
         raise RuntimeError(
             "Unable to find a suitable version for operator '{}' "
             "in domain '{}'. Available versions: {}.".format(
                 op_type, domain, vers))
 
-    def _build_op_version(self):
-        res = {}
-        for schema in get_all_schemas_with_history():
-            dom = schema.domain
-            name = schema.name
-            vers = schema.since_version
-            if (dom, name) not in res:
-                res[dom, name] = set()
-            res[dom, name].add(vers)
-        self._op_versions = {}
-        for k, v in res.items():
-            self._op_versions[k] = list(sorted(v))
-
     def _get_allowed_options(self, model):
         if self.registered_models is not None:
             if inspect.isfunction(model):
@@ -0,0 +1,139 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Writes the values of initializers into a side file
+following ONNX external data format.
+"""
+import os
+import numpy as np
+from onnx import TensorProto
+from onnx.numpy_helper import to_array
+from .data_types import _TENSOR_TYPE_TO_NP_TYPE
+
+# Initializers with at least this number of bytes are written
+# into the external file, smaller ones stay in the model.
+EXTERNAL_DATA_MIN_SIZE = 1024
+
+# Fields of TensorProto which may hold the values.
+_DATA_FIELDS = ['raw_data', 'float_data', 'int32_data', 'int64_data',
+                'double_data', 'uint64_data']
+
+
+def set_external_location(tensor, location, offset, length):
+    """
+    Makes *tensor* refer to *length* bytes stored in file
+    *location* at position *offset*. Unlike
+    *onnx.external_data_helper.set_external_data*, the tensor
+    does not need to hold any *raw_data*.
+    """
+    tensor.data_location = TensorProto.EXTERNAL
+    del tensor.external_data[:]
+    for key, value in [('location', location), ('offset', offset),
+                       ('length', length)]:
+        entry = tensor.external_data.add()
+        entry.key = key
+        entry.value = str(value)
+
+
+class ExternalDataWriter:
+    """
+    Streams the values of initializers into a file as soon as
+    they are added to a container, the tensor kept in memory only
+    holds a reference to the file (location, offset, length).
+    The model must be saved in the same folder as the file.
+
+    :param path: file receiving the values, it is overwritten
+    :param size_threshold: initializers with fewer bytes
+        stay in the model
+    """
+
+    def __init__(self, path, size_threshold=EXTERNAL_DATA_MIN_SIZE):
+        self.path = path
+        self.location = os.path.basename(path)
+        self.size_threshold = size_threshold
+        self.offset = 0
+        self._file = None
+
+    def open(self):
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            self.offset = 0
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def as_array(self, onnx_type, content):
+        """
+        Returns the values to write as a contiguous
+        little endian array if *content* can be written
+        into the file, None otherwise.
+        """
+        if (onnx_type == TensorProto.STRING or
+                not isinstance(content, np.ndarray) or
+                content.dtype == np.object_ or
+                onnx_type not in _TENSOR_TYPE_TO_NP_TYPE):
+            return None
+        dtype = np.dtype(_TENSOR_TYPE_TO_NP_TYPE[onnx_type])
+        if content.size * dtype.itemsize < self.size_threshold:
+            return None
+        return np.ascontiguousarray(content, dtype=dtype.newbyteorder('<'))
+
+    def write(self, tensor, array):
+        """
+        Writes *array* into the file and makes *tensor* point to it.
+        """
+        if self._file is None:
+            raise RuntimeError(
+                "File '{}' is not opened.".format(self.path))
+        data = memoryview(array.reshape(-1)).cast('B')
+        self._file.write(data)
+        set_external_location(tensor, self.location, self.offset, len(data))
+        self.offset += len(data)
+
+    def offload(self, tensor):
+        """
+        Moves the values of a tensor already created into the file
+        if it is big enough. Returns True if the tensor was moved.
+        """
+        if (tensor.data_type == TensorProto.STRING or
+                tensor.data_location == TensorProto.EXTERNAL):
+            return False
+        dtype = _TENSOR_TYPE_TO_NP_TYPE.get(tensor.data_type, None)
+        if dtype is None:
+            return False
+        size = int(np.prod(tensor.dims)) * np.dtype(dtype).itemsize
+        if size < self.size_threshold:
+            return False
+        array = self.as_array(tensor.data_type, to_array(tensor))
+        for field in _DATA_FIELDS:
+            tensor.ClearField(field)
+        self.write(tensor, array)
+        return True
+
+    def read(self, tensor):
+        """
+        Reads back the values of a tensor written by this object,
+        returns a numpy array.
+        """
+        info = {e.key: e.value for e in tensor.external_data}
+        offset, length = int(info['offset']), int(info['length'])
+        if self._file is not None:
+            self._file.flush()
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        dtype = np.dtype(
+            _TENSOR_TYPE_TO_NP_TYPE[tensor.data_type]).newbyteorder('<')
+        return np.frombuffer(data, dtype=dtype).reshape(tuple(tensor.dims))
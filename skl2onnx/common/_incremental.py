@@ -0,0 +1,282 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Records which nodes and initializers every converter produced
+to convert a model again without calling the converters
+of the operators which did not change.
+"""
+import hashlib
+from onnx import AttributeProto, NodeProto, TensorProto, ValueInfoProto
+from onnx.numpy_helper import to_array
+from ._cache import _Fingerprint
+from ._container import _get_initializer_key
+
+
+def operator_fingerprint(operator, converter, container):
+    """
+    Returns a key which changes if the nodes produced by
+    *converter* for *operator* may change: the fitted model,
+    the converter, the inputs and outputs with their types,
+    the options given to the model and the conversion parameters.
+    """
+    fp = _Fingerprint()
+    fp.update(operator.raw_operator, 'model')
+    options = container.options
+    if options is not None and operator.raw_operator is not None:
+        raw = operator.raw_operator
+        options = (options.get(type(raw), None), options.get(id(raw), None))
+    fp.update((operator.full_name, operator.type, converter,
+               [(v.full_name, v.type) for v in operator.inputs],
+               [(v.full_name, v.type) for v in operator.outputs],
+               options, container.target_opset_all, str(container.dtype),
+               container.deduplicate_initializers), 'operator')
+    return fp.hash.hexdigest()
+
+
+def _tensor_digest(tensor):
+    tensor = TensorProto.FromString(tensor.SerializeToString())
+    tensor.name = ''
+    return hashlib.md5(tensor.SerializeToString()).hexdigest()
+
+
+def _defined_names(graph, names):
+    names.update(i.name for i in graph.input)
+    names.update(i.name for i in graph.initializer)
+    for node in graph.node:
+        names.update(node.output)
+
+
+def _consumed_names(nodes, names):
+    """
+    Adds to *names* the names consumed by *nodes* including
+    the names subgraphs take from the outer scope.
+    """
+    for node in nodes:
+        names.update(i for i in node.input if i)
+        for att in node.attribute:
+            if att.type == AttributeProto.GRAPH:
+                subs = [att.g]
+            elif att.type == AttributeProto.GRAPHS:
+                subs = att.graphs
+            else:
+                continue
+            for sub in subs:
+                inner = set()
+                _consumed_names(sub.node, inner)
+                defined = set()
+                _defined_names(sub, defined)
+                names.update(inner - defined)
+
+
+class ConvertedBlock:
+    """
+    Nodes, initializers and value info a converter added
+    to the container for one operator, they are stored as ranges
+    in the lists of the container which become the lists
+    of the graph in the converted model.
+
+    :param key: see :func:`operator_fingerprint`
+    :param nodes: range *(begin, end)*
+    :param initializers: range *(begin, end)*
+    :param value_info: range *(begin, end)*
+    :param domain_versions: set of *(domain, version)*
+        used by the nodes
+    """
+
+    def __init__(self, key, nodes, initializers, value_info,
+                 domain_versions):
+        self.key = key
+        self.nodes = nodes
+        self.initializers = initializers
+        self.value_info = value_info
+        self.domain_versions = domain_versions
+        # initializers the block uses but does not define,
+        # {name: digest}, None if the block cannot be reused
+        self.borrowed = {}
+        # variables of other operators the block uses
+        # besides the inputs of its operator
+        self.variables = set()
+        # True if the block was copied from a previous conversion
+        self.reused = False
+
+
+class ConvertedBlocks:
+    """
+    Blocks of every operator of a topology,
+    see :class:`ConvertedBlock`.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self.n_nodes = None
+        self.n_initializers = None
+
+    def start(self, container, key):
+        """
+        Starts a block, the set of *(domain, version)* of the container
+        is replaced by an empty set to collect those the block uses.
+        """
+        state = (key, len(container.nodes), len(container.initializers),
+                 len(container.value_info),
+                 container.node_domain_version_pair_sets)
+        container.node_domain_version_pair_sets = set()
+        return state
+
+    def end(self, container, operator, state, reused=False):
+        key, n_nodes, n_inits, n_vi, pairs = state
+        used = container.node_domain_version_pair_sets
+        pairs.update(used)
+        container.node_domain_version_pair_sets = pairs
+        block = ConvertedBlock(
+            key, (n_nodes, len(container.nodes)),
+            (n_inits, len(container.initializers)),
+            (n_vi, len(container.value_info)), used)
+        block.reused = reused
+        self.blocks[operator.full_name] = block
+
+    def finalize(self, topology, container):
+        """
+        Computes the initializers every block borrows
+        from the others once the conversion is complete.
+        """
+        self.n_nodes = len(container.nodes)
+        self.n_initializers = len(container.initializers)
+        initializers = {init.name: init for init in container.initializers}
+        inputs = {}
+        for scope in topology.scopes:
+            for op in scope.operators.values():
+                inputs[op.full_name] = set(v.full_name for v in op.inputs)
+        for name, block in self.blocks.items():
+            nodes = container.nodes[block.nodes[0]:block.nodes[1]]
+            inits = container.initializers[
+                block.initializers[0]:block.initializers[1]]
+            if any(init.data_location == TensorProto.EXTERNAL
+                   for init in inits):
+                block.borrowed = None
+                continue
+            defined = set(init.name for init in inits)
+            for node in nodes:
+                defined.update(node.output)
+            consumed = set()
+            _consumed_names(nodes, consumed)
+            consumed -= defined
+            consumed -= inputs.get(name, set())
+            borrowed = {}
+            for c in consumed:
+                init = initializers.get(c, None)
+                if init is None:
+                    block.variables.add(c)
+                elif init.data_location == TensorProto.EXTERNAL:
+                    borrowed = None
+                    break
+                else:
+                    borrowed[c] = _tensor_digest(init)
+            block.borrowed = borrowed
+
+
+class BlockReplay:
+    """
+    Copies the blocks of a previous conversion into a container.
+
+    :param onnx_model: model returned by the previous conversion
+    :param blocks: :class:`ConvertedBlocks` of the previous conversion
+    :param container: container of the new conversion
+    :param topology: topology of the new conversion
+    """
+
+    def __init__(self, onnx_model, blocks, container, topology):
+        graph = onnx_model.graph
+        if (blocks.n_nodes != len(graph.node) or
+                blocks.n_initializers != len(graph.initializer)):
+            raise RuntimeError(
+                "The model was modified after it was converted, "
+                "its nodes and initializers do not match the "
+                "topology anymore.")
+        self.graph = graph
+        self.blocks = blocks
+        self.container = container
+        self.topology = topology
+        self._initializers = {}
+        self._n_indexed = 0
+
+    def _initializer_digest(self, name):
+        inits = self.container.initializers
+        while self._n_indexed < len(inits):
+            init = inits[self._n_indexed]
+            self._initializers[init.name] = init
+            self._n_indexed += 1
+        init = self._initializers.get(name, None)
+        if init is None or not isinstance(init, TensorProto):
+            return None
+        return _tensor_digest(init)
+
+    def replay(self, operator, key, scope):
+        """
+        Adds the nodes and initializers of the previous conversion
+        of *operator* into the container if *key* did not change
+        and the names the block defines are still available.
+        Returns True if it succeeded, False if the converter
+        must be called.
+        """
+        block = self.blocks.blocks.get(operator.full_name, None)
+        if block is None or block.key != key or block.borrowed is None:
+            return False
+        graph = self.graph
+        nodes = graph.node[block.nodes[0]:block.nodes[1]]
+        inits = graph.initializer[block.initializers[0]:
+                                  block.initializers[1]]
+        value_info = graph.value_info[block.value_info[0]:
+                                      block.value_info[1]]
+        container = self.container
+
+        outputs = set(v.full_name for v in operator.outputs)
+        names = set(init.name for init in inits)
+        for node in nodes:
+            names.update(node.output)
+        names -= outputs
+        if any(n in scope.onnx_variable_names for n in names):
+            return False
+        if any(node.name in container.node_names or
+               node.name in scope.onnx_operator_names for node in nodes):
+            return False
+        for name, digest in block.borrowed.items():
+            if self._initializer_digest(name) != digest:
+                return False
+        for name in block.variables:
+            # the variable must be produced by an operator
+            # of the new topology
+            if not any(name in s.variables for s in self.topology.scopes):
+                return False
+
+        scope.onnx_variable_names.update(names)
+        for node in nodes:
+            # the container owns its nodes, optimizations
+            # must not modify the previous model
+            copy = NodeProto()
+            copy.CopyFrom(node)
+            container.nodes.append(copy)
+            container.node_names.add(node.name)
+            scope.onnx_operator_names.add(node.name)
+        for init in inits:
+            if container.deduplicate_initializers:
+                key, _ = _get_initializer_key(
+                    init, None if init.raw_data else to_array(init))
+                if key is None:
+                    name = init.name
+                    init = TensorProto.FromString(init.SerializeToString())
+                    init.name = "tensor"
+                    key = init.SerializeToString()
+                    init.name = name
+                container.initializers_index.setdefault(key, []).append(
+                    (init.name, init))
+            container.initializers.append(init)
+        for vi in value_info:
+            copy = ValueInfoProto()
+            copy.CopyFrom(vi)
+            container.value_info.append(copy)
+        container.node_domain_version_pair_sets.update(
+            block.domain_versions)
+        return True
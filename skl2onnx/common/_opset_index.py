@@ -0,0 +1,128 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Index of the versions of every ONNX operator.
+"""
+import json
+from bisect import bisect_right
+from onnx.defs import get_all_schemas_with_history
+
+
+class OpsetIndex:
+    """
+    Stores the versions (*since_version*) of every operator
+    defined by *onnx* and memoizes the version to use
+    for a target opset. The index is built once per process
+    (see :func:`get_opset_index`), it can be serialized with
+    :meth:`to_json` and restored with :meth:`from_json` to avoid
+    querying module *onnx.defs* again.
+
+    :param versions: dictionary ``{ (domain, op_type): sorted versions }``,
+        None to build it from the schemas registered in *onnx*
+    """
+
+    def __init__(self, versions=None):
+        if versions is None:
+            versions = OpsetIndex._build_versions()
+        self.versions = versions
+        self._resolved = {}
+
+    @staticmethod
+    def _build_versions():
+        res = {}
+        for schema in get_all_schemas_with_history():
+            key = schema.domain, schema.name
+            if key not in res:
+                res[key] = set()
+            res[key].add(schema.since_version)
+        return {k: list(sorted(v)) for k, v in res.items()}
+
+    def get_versions(self, domain, op_type):
+        """
+        Returns the sorted list of versions of operator *op_type*
+        in domain *domain*, None if the operator is unknown.
+        """
+        return self.versions.get((domain, op_type), None)
+
+    def resolve(self, domain, op_type, target_opset):
+        """
+        Returns the highest version of operator *op_type* lower
+        or equal to *target_opset*, None if there is none
+        or if the operator is unknown.
+        """
+        key = domain, op_type, target_opset
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        vers = self.versions.get((domain, op_type), None)
+        res = None
+        if vers is not None:
+            pos = bisect_right(vers, target_opset)
+            if pos > 0:
+                res = vers[pos - 1]
+        self._resolved[key] = res
+        return res
+
+    def __getstate__(self):
+        return {'versions': self.versions}
+
+    def __setstate__(self, state):
+        self.versions = state['versions']
+        self._resolved = {}
+
+    def to_json(self, filename=None):
+        """
+        Returns the index as a JSON string,
+        it is also written in *filename* if not None.
+        """
+        content = json.dumps(
+            [[dom, name, vers]
+             for (dom, name), vers in sorted(self.versions.items())])
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(content)
+        return content
+
+    @staticmethod
+    def from_json(content=None, filename=None):
+        """
+        Restores an index serialized with :meth:`to_json`
+        from a string or a file.
+        """
+        if filename is not None:
+            with open(filename, 'r') as f:
+                content = f.read()
+        return OpsetIndex({(dom, name): vers
+                           for dom, name, vers in json.loads(content)})
+
+
+_opset_index = None
+
+
+def get_opset_index():
+    """
+    Returns the index shared by the whole process,
+    it is built the first time the function is called.
+    """
+    global _opset_index
+    if _opset_index is None:
+        _opset_index = OpsetIndex()
+    return _opset_index
+
+
+def set_opset_index(index):
+    """
+    Replaces the index shared by the whole process, a worker
+    can restore an index serialized by the main process instead
+    of building it again. None resets the index.
+    """
+    global _opset_index
+    if index is not None and not isinstance(index, OpsetIndex):
+        raise TypeError(
+            "index must be None or an OpsetIndex not {}.".format(
+                type(index)))
+    _opset_index = index
@@ -0,0 +1,895 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Rewrites the graph produced by the converters before the model
+is created: it removes nodes which only copy their input,
+evaluates the nodes whose inputs are constant
+and fuses chains of nodes of the same type.
+"""
+from collections import OrderedDict
+from functools import reduce
+import numpy as np
+from onnx import (
+    AttributeProto, ModelProto, NodeProto, TensorProto, ValueInfoProto)
+from onnx.helper import make_node
+from onnx.numpy_helper import from_array, to_array
+from ._incremental import _consumed_names
+from .data_types import TensorType, _TENSOR_TYPE_TO_NP_TYPE
+
+
+# Casts which do not lose any information, a chain
+# Cast(Cast(X, t1), t2) is equivalent to Cast(X, t2)
+# if the first cast is one of them.
+_LOSSLESS_CASTS = set()
+for _from, _to in [
+        (TensorProto.BOOL, [
+            TensorProto.INT8, TensorProto.INT16, TensorProto.INT32,
+            TensorProto.INT64, TensorProto.UINT8, TensorProto.UINT16,
+            TensorProto.UINT32, TensorProto.UINT64, TensorProto.FLOAT16,
+            TensorProto.FLOAT, TensorProto.DOUBLE]),
+        (TensorProto.INT8, [TensorProto.INT16, TensorProto.INT32,
+                            TensorProto.INT64, TensorProto.FLOAT,
+                            TensorProto.DOUBLE]),
+        (TensorProto.UINT8, [TensorProto.INT16, TensorProto.INT32,
+                             TensorProto.INT64, TensorProto.UINT16,
+                             TensorProto.UINT32, TensorProto.UINT64,
+                             TensorProto.FLOAT, TensorProto.DOUBLE]),
+        (TensorProto.INT16, [TensorProto.INT32, TensorProto.INT64,
+                             TensorProto.FLOAT, TensorProto.DOUBLE]),
+        (TensorProto.UINT16, [TensorProto.INT32, TensorProto.INT64,
+                              TensorProto.UINT32, TensorProto.UINT64,
+                              TensorProto.FLOAT, TensorProto.DOUBLE]),
+        (TensorProto.INT32, [TensorProto.INT64, TensorProto.DOUBLE]),
+        (TensorProto.UINT32, [TensorProto.INT64, TensorProto.UINT64,
+                              TensorProto.DOUBLE]),
+        (TensorProto.FLOAT16, [TensorProto.FLOAT, TensorProto.DOUBLE]),
+        (TensorProto.FLOAT, [TensorProto.DOUBLE])]:
+    for _t in _to:
+        _LOSSLESS_CASTS.add((_from, _t))
+
+
+def _get_attribute(node, name):
+    for att in node.attribute:
+        if att.name == name:
+            return att
+    return None
+
+
+def _rename_input(node, old, new):
+    """
+    Replaces input *old* by *new* in a node and in the subgraphs
+    which use *old* from the outer scope.
+    """
+    for i, name in enumerate(node.input):
+        if name == old:
+            node.input[i] = new
+    for att in node.attribute:
+        if att.type == AttributeProto.GRAPH:
+            subs = [att.g]
+        elif att.type == AttributeProto.GRAPHS:
+            subs = att.graphs
+        else:
+            continue
+        for sub in subs:
+            if (any(i.name == old for i in sub.input) or
+                    any(i.name == old for i in sub.initializer)):
+                # the subgraph hides the name
+                continue
+            for n in sub.node:
+                if old in n.output:
+                    break
+                _rename_input(n, old, new)
+
+
+class OptimizedGraph:
+    """
+    Nodes, initializers, inputs and outputs of a graph
+    with the producer and the consumers of every result.
+    The optimization passes modify the nodes inplace
+    and remove them with :meth:`remove`.
+
+    :param nodes: list of *NodeProto*
+    :param initializers: list of *TensorProto*
+    :param inputs: names of the graph inputs
+    :param outputs: names of the graph outputs
+    :param types: element type of the results whose type is known,
+        ``{name: TensorProto type}``
+    :param ranks: rank of the results whose shape is known,
+        ``{name: rank}``
+    :param opset: opset of the main domain, None for the latest one
+    """
+
+    def __init__(self, nodes, initializers, inputs, outputs, types=None,
+                 ranks=None, opset=None):
+        self.nodes = list(nodes)
+        self.initializers = OrderedDict(
+            (init.name, init) for init in initializers)
+        self.inputs = set(inputs)
+        self.outputs = set(outputs)
+        self.types = {} if types is None else dict(types)
+        self.ranks = {} if ranks is None else dict(ranks)
+        self.opset = opset
+        for name, init in self.initializers.items():
+            if isinstance(init, TensorProto):
+                self.types[name] = init.data_type
+                self.ranks[name] = len(init.dims)
+        self.producers = {}
+        self.consumers = {}
+        self.removed = set()
+        for node in self.nodes:
+            self._index(node)
+
+    def _index(self, node):
+        for o in node.output:
+            self.producers[o] = node
+        if node.op_type == 'Cast' and node.domain in ('', 'ai.onnx'):
+            self.types[node.output[0]] = _get_attribute(node, 'to').i
+        names = set()
+        _consumed_names([node], names)
+        for name in names:
+            if name in self.consumers:
+                self.consumers[name].append(node)
+            else:
+                self.consumers[name] = [node]
+
+    def is_removed(self, node):
+        return id(node) in self.removed
+
+    def remove(self, node):
+        """
+        Removes a node, its outputs must not be used anymore.
+        """
+        self.removed.add(id(node))
+        names = set()
+        _consumed_names([node], names)
+        for name in names:
+            cons = self.consumers[name]
+            cons[:] = [c for c in cons if c is not node]
+
+    def set_input(self, node, index, name):
+        """
+        Replaces input *index* of *node* by *name*.
+        """
+        old = node.input[index]
+        node.input[index] = name
+        if old not in node.input:
+            cons = self.consumers[old]
+            cons[:] = [c for c in cons if c is not node]
+        self._add_consumer(name, node)
+
+    def _add_consumer(self, name, node):
+        cons = self.consumers.setdefault(name, [])
+        if not any(c is node for c in cons):
+            cons.append(node)
+
+    def single_consumer(self, name):
+        """
+        Returns the only node consuming *name* if *name*
+        is not a graph output, None otherwise.
+        """
+        if name in self.outputs:
+            return None
+        cons = self.consumers.get(name, [])
+        return cons[0] if len(cons) == 1 else None
+
+    def producer(self, name, op_type):
+        """
+        Returns the node producing *name* if its type is *op_type*
+        and it belongs to the main domain.
+        """
+        node = self.producers.get(name, None)
+        if (node is None or node.op_type != op_type or
+                node.domain not in ('', 'ai.onnx') or
+                self.is_removed(node)):
+            return None
+        return node
+
+    def constant(self, name):
+        """
+        Returns the value of an initializer as a numpy array
+        or None if *name* is not an initializer.
+        """
+        init = self.initializers.get(name, None)
+        if (not isinstance(init, TensorProto) or
+                init.data_location == TensorProto.EXTERNAL):
+            return None
+        return to_array(init)
+
+    def insert(self, node, before):
+        """
+        Inserts a new node before another one.
+        """
+        index = [i for i, n in enumerate(self.nodes) if n is before][0]
+        self.nodes.insert(index, node)
+        self._index(node)
+
+    def add_constant(self, name, value):
+        """
+        Adds a new initializer.
+        """
+        init = from_array(value, name=name)
+        self.initializers[name] = init
+        self.types[name] = init.data_type
+        self.ranks[name] = len(init.dims)
+
+    def replace_by_constants(self, node, values):
+        """
+        Removes a node and adds its outputs as initializers.
+        """
+        self.remove(node)
+        for name, value in zip(node.output, values):
+            self.producers.pop(name, None)
+            self.add_constant(name, value)
+
+    def bypass(self, node):
+        """
+        Removes a node whose only output is equal to its first input.
+        Returns False if it is not possible because both names
+        are graph inputs or outputs.
+        """
+        x, y = node.input[0], node.output[0]
+        if y not in self.outputs:
+            self.remove(node)
+            for c in self.consumers.pop(y, []):
+                _rename_input(c, y, x)
+                self._add_consumer(x, c)
+            return True
+        if (x in self.outputs or x in self.inputs or
+                x not in self.producers or
+                self.is_removed(self.producers[x])):
+            return False
+        # The producer of x directly produces y.
+        self.remove(node)
+        producer = self.producers.pop(x)
+        for i, o in enumerate(producer.output):
+            if o == x:
+                producer.output[i] = y
+        self.producers[y] = producer
+        for c in self.consumers.pop(x, []):
+            _rename_input(c, x, y)
+            self._add_consumer(y, c)
+        if x in self.types:
+            self.types[y] = self.types[x]
+        return True
+
+    def to_lists(self):
+        """
+        Returns the remaining nodes and the initializers still used.
+        """
+        nodes = [n for n in self.nodes if not self.is_removed(n)]
+        inits = [init for name, init in self.initializers.items()
+                 if (self.consumers.get(name, None) or
+                     name in self.outputs or
+                     not isinstance(init, TensorProto))]
+        return nodes, inits
+
+
+def _main_domain_nodes(graph, op_type):
+    return [node for node in graph.nodes
+            if node.op_type == op_type and node.domain in ('', 'ai.onnx')]
+
+
+def remove_identity(graph):
+    """
+    Removes the *Identity* nodes,
+    the container adds one for every deduplicated initializer.
+    """
+    changes = 0
+    for node in _main_domain_nodes(graph, 'Identity'):
+        if not graph.is_removed(node) and graph.bypass(node):
+            changes += 1
+    return changes
+
+
+def _attribute_value(node, name, default=None):
+    att = _get_attribute(node, name)
+    if att is None:
+        return default
+    if att.type == AttributeProto.INT:
+        return att.i
+    if att.type == AttributeProto.FLOAT:
+        return att.f
+    if att.type == AttributeProto.INTS:
+        return list(att.ints)
+    if att.type == AttributeProto.TENSOR:
+        return to_array(att.t)
+    raise NotImplementedError(
+        "Unable to read attribute '{}' of type {}.".format(name, att.type))
+
+
+def _axes(node, inputs, index=1):
+    # axes is an attribute before opset 13 and an input after
+    if len(inputs) > index:
+        return [int(a) for a in inputs[index]]
+    return _attribute_value(node, 'axes')
+
+
+def _fold_elementwise(fct):
+    def fold(node, *inputs):
+        return [np.asarray(fct(*inputs)).astype(inputs[0].dtype)]
+    return fold
+
+
+def _fold_div(node, a, b):
+    if not np.issubdtype(a.dtype, np.floating):
+        # integer division rounds toward zero in ONNX
+        return None
+    return [np.asarray(a / b).astype(a.dtype)]
+
+
+def _fold_reduce(fct):
+    def fold(node, *inputs):
+        axes = _axes(node, inputs)
+        keepdims = _attribute_value(node, 'keepdims', 1)
+        axis = None if not axes else tuple(axes)
+        res = fct(inputs[0], axis=axis, keepdims=keepdims == 1)
+        return [np.asarray(res).astype(inputs[0].dtype)]
+    return fold
+
+
+def _fold_cast(node, x):
+    to = _attribute_value(node, 'to')
+    if to == TensorProto.STRING or to not in _TENSOR_TYPE_TO_NP_TYPE:
+        return None
+    return [x.astype(_TENSOR_TYPE_TO_NP_TYPE[to])]
+
+
+def _fold_reshape(node, x, shape):
+    shape = [x.shape[i] if s == 0 else s for i, s in enumerate(shape)]
+    return [x.reshape(shape)]
+
+
+def _fold_transpose(node, x):
+    return [np.transpose(x, _attribute_value(node, 'perm'))]
+
+
+def _fold_squeeze(node, *inputs):
+    axes = _axes(node, inputs)
+    axis = None if axes is None else tuple(axes)
+    return [np.squeeze(inputs[0], axis=axis)]
+
+
+def _fold_unsqueeze(node, *inputs):
+    x = inputs[0]
+    axes = _axes(node, inputs)
+    rank = len(x.shape) + len(axes)
+    for axis in sorted(a + rank if a < 0 else a for a in axes):
+        x = np.expand_dims(x, axis)
+    return [x]
+
+
+def _fold_flatten(node, x):
+    axis = _attribute_value(node, 'axis', 1)
+    if axis < 0:
+        axis += len(x.shape)
+    first = int(np.prod(x.shape[:axis]))
+    return [x.reshape((first, int(np.prod(x.shape[axis:]))))]
+
+
+def _fold_gemm(node, a, b, c=None):
+    if _attribute_value(node, 'transA', 0):
+        a = a.T
+    if _attribute_value(node, 'transB', 0):
+        b = b.T
+    res = _attribute_value(node, 'alpha', 1.) * np.matmul(a, b)
+    if c is not None:
+        res = res + _attribute_value(node, 'beta', 1.) * c
+    return [res.astype(a.dtype)]
+
+
+# Functions evaluating a node with numpy, key: op_type,
+# value: function taking the node and its inputs and
+# returning the list of outputs or None if it cannot be done.
+_constant_folding_functions = {
+    'Abs': _fold_elementwise(np.abs),
+    'Add': _fold_elementwise(np.add),
+    'Cast': _fold_cast,
+    'Concat': lambda node, *inputs: [np.concatenate(
+        inputs, axis=_attribute_value(node, 'axis'))],
+    'Constant': lambda node: [_attribute_value(node, 'value')],
+    'Div': _fold_div,
+    'Exp': _fold_elementwise(np.exp),
+    'Flatten': _fold_flatten,
+    'Gather': lambda node, x, indices: [np.take(
+        x, indices, axis=_attribute_value(node, 'axis', 0))],
+    'Gemm': _fold_gemm,
+    'Identity': lambda node, x: [x],
+    'Log': _fold_elementwise(np.log),
+    'MatMul': _fold_elementwise(np.matmul),
+    'Max': _fold_elementwise(lambda *x: reduce(np.maximum, x)),
+    'Min': _fold_elementwise(lambda *x: reduce(np.minimum, x)),
+    'Mul': _fold_elementwise(np.multiply),
+    'Neg': _fold_elementwise(np.negative),
+    'Pow': _fold_elementwise(np.power),
+    'Reciprocal': _fold_elementwise(np.reciprocal),
+    'ReduceMax': _fold_reduce(np.max),
+    'ReduceMean': _fold_reduce(np.mean),
+    'ReduceMin': _fold_reduce(np.min),
+    'ReduceProd': _fold_reduce(np.prod),
+    'ReduceSum': _fold_reduce(np.sum),
+    'ReduceSumSquare': _fold_reduce(
+        lambda x, **kwargs: np.sum(x * x, **kwargs)),
+    'Reshape': _fold_reshape,
+    'Shape': lambda node, x: [np.array(x.shape, dtype=np.int64)],
+    'Sqrt': _fold_elementwise(np.sqrt),
+    'Squeeze': _fold_squeeze,
+    'Sub': _fold_elementwise(np.subtract),
+    'Sum': _fold_elementwise(lambda *x: reduce(np.add, x)),
+    'Transpose': _fold_transpose,
+    'Unsqueeze': _fold_unsqueeze,
+}
+
+# Operators whose float results depend on the implementation
+# (summation order, approximated functions), numpy and the runtime
+# may not round them the same way. They are only folded
+# for integers.
+_FOLD_INTEGER_ONLY = {
+    'Exp', 'Gemm', 'Log', 'MatMul', 'Pow', 'ReduceMean', 'ReduceProd',
+    'ReduceSum', 'ReduceSumSquare', 'Sqrt',
+}
+
+# Folding a node must not make the model much bigger,
+# an output may have more elements than the inputs
+# up to this size.
+_FOLD_MAX_SIZE = 1024
+
+
+def fold_constants(graph):
+    """
+    Evaluates with numpy the nodes whose inputs are all
+    initializers and replaces them by initializers,
+    see *_constant_folding_functions* for the supported operators.
+    Nodes producing graph outputs are not folded, the optimized
+    model must return the same results, see *_FOLD_INTEGER_ONLY*.
+    """
+    changes = 0
+    for node in graph.nodes:
+        if (graph.is_removed(node) or
+                node.op_type not in _constant_folding_functions or
+                node.domain not in ('', 'ai.onnx') or
+                any(o in graph.outputs for o in node.output)):
+            continue
+        names = list(node.input)
+        while names and names[-1] == '':
+            # missing optional inputs
+            names.pop()
+        inputs = [graph.constant(name) for name in names]
+        if any(i is None for i in inputs):
+            continue
+        if (node.op_type in _FOLD_INTEGER_ONLY and
+                any(not np.issubdtype(i.dtype, np.integer)
+                    for i in inputs)):
+            continue
+        with np.errstate(all='ignore'):
+            try:
+                outputs = _constant_folding_functions[node.op_type](
+                    node, *inputs)
+            except (ValueError, TypeError, IndexError):
+                # invalid node, the runtime will report the error
+                continue
+        if (outputs is None or len(outputs) != len(node.output) or
+                any(o is None for o in outputs)):
+            continue
+        size = sum(o.size for o in outputs)
+        if (node.op_type != 'Constant' and
+                size > max(sum(i.size for i in inputs), _FOLD_MAX_SIZE)):
+            continue
+        graph.replace_by_constants(node, outputs)
+        changes += 1
+    return changes
+
+
+def fuse_reshape(graph):
+    """
+    Replaces ``Reshape(Reshape(X, s1), s2)`` by ``Reshape(X, s2)``
+    if *s2* is a constant without any zero.
+    """
+    changes = 0
+    for node in _main_domain_nodes(graph, 'Reshape'):
+        if graph.is_removed(node) or len(node.attribute) > 0:
+            continue
+        first = graph.producer(node.input[0], 'Reshape')
+        if first is None or graph.single_consumer(node.input[0]) is None:
+            continue
+        shape = graph.constant(node.input[1])
+        if shape is None or (shape == 0).any():
+            # 0 copies the dimension of the input
+            continue
+        graph.set_input(node, 0, first.input[0])
+        graph.remove(first)
+        changes += 1
+    return changes
+
+
+def fuse_cast(graph):
+    """
+    Removes the *Cast* nodes converting to the type their input
+    already has and replaces ``Cast(Cast(X, t1), t2)`` by
+    ``Cast(X, t2)`` if the first cast does not lose information.
+    Element types are known for graph inputs, initializers,
+    outputs of *Cast* nodes and the variables of the topology.
+    """
+    changes = 0
+    for node in _main_domain_nodes(graph, 'Cast'):
+        if graph.is_removed(node):
+            continue
+        first = graph.producer(node.input[0], 'Cast')
+        if (first is not None and
+                graph.single_consumer(node.input[0]) is not None):
+            before = graph.types.get(first.input[0], None)
+            middle = _get_attribute(first, 'to').i
+            if before == middle or (before, middle) in _LOSSLESS_CASTS:
+                graph.set_input(node, 0, first.input[0])
+                graph.remove(first)
+                changes += 1
+        to = _get_attribute(node, 'to').i
+        if graph.types.get(node.input[0], None) == to and graph.bypass(node):
+            changes += 1
+    return changes
+
+
+def fuse_transpose(graph):
+    """
+    Replaces ``Transpose(Transpose(X, p1), p2)`` by
+    ``Transpose(X, p1[p2])`` and removes the transpositions
+    which keep the same order.
+    """
+    changes = 0
+    for node in _main_domain_nodes(graph, 'Transpose'):
+        if graph.is_removed(node):
+            continue
+        perm = _get_attribute(node, 'perm')
+        if perm is None:
+            continue
+        first = graph.producer(node.input[0], 'Transpose')
+        if (first is not None and
+                graph.single_consumer(node.input[0]) is not None):
+            first_perm = _get_attribute(first, 'perm')
+            if (first_perm is not None and
+                    len(first_perm.ints) == len(perm.ints)):
+                new_perm = [first_perm.ints[i] for i in perm.ints]
+                del perm.ints[:]
+                perm.ints.extend(new_perm)
+                graph.set_input(node, 0, first.input[0])
+                graph.remove(first)
+                changes += 1
+        if (list(perm.ints) == list(range(len(perm.ints))) and
+                graph.bypass(node)):
+            changes += 1
+    return changes
+
+
+# Operators whose output has the rank of their first input.
+_SAME_RANK = {
+    'Abs', 'Cast', 'Clip', 'Elu', 'Erf', 'Exp', 'Identity', 'LeakyRelu',
+    'Log', 'LogSoftmax', 'Neg', 'Reciprocal', 'Relu', 'Sigmoid', 'Softmax',
+    'Softplus', 'Sqrt', 'Tanh', 'Transpose',
+}
+
+# Operators whose output has the highest rank of their inputs.
+_BROADCAST_RANK = {'Add', 'Div', 'Max', 'Min', 'Mul', 'Pow', 'Sub', 'Sum'}
+
+
+def _infer_ranks(graph):
+    """
+    Propagates the known ranks and element types through the graph.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for node in graph.nodes:
+            if (graph.is_removed(node) or
+                    node.domain not in ('', 'ai.onnx') or
+                    len(node.output) == 0):
+                continue
+            output = node.output[0]
+            if (node.op_type != 'Cast' and output not in graph.types and
+                    node.input[0] in graph.types and (
+                        node.op_type in _SAME_RANK or
+                        node.op_type in _BROADCAST_RANK or
+                        node.op_type in ('Gemm', 'MatMul', 'Reshape'))):
+                graph.types[output] = graph.types[node.input[0]]
+                changed = True
+            if output in graph.ranks:
+                continue
+            ranks = [graph.ranks.get(i, None) for i in node.input]
+            rank = None
+            if node.op_type in _SAME_RANK:
+                rank = ranks[0]
+            elif node.op_type in _BROADCAST_RANK:
+                if None not in ranks:
+                    rank = max(ranks)
+            elif node.op_type == 'MatMul':
+                if None not in ranks and min(ranks) >= 2:
+                    rank = max(ranks)
+            elif node.op_type == 'Gemm':
+                rank = 2
+            elif node.op_type == 'Reshape':
+                shape = graph.constant(node.input[1])
+                if shape is not None:
+                    rank = shape.size
+            if rank is not None:
+                graph.ranks[output] = rank
+                changed = True
+
+
+def _gemm_bias(graph, add, name):
+    """
+    Returns the bias added to *name* by node *add*
+    if it can be given to a *Gemm* node.
+    """
+    index = 1 if add.input[0] == name else 0
+    if add.input[1 - index] != name:
+        return None
+    bias = graph.constant(add.input[index])
+    if bias is None or bias.ndim > 2 or (
+            bias.ndim == 2 and bias.shape[0] != 1):
+        return None
+    return bias
+
+
+def fuse_gemm(graph):
+    """
+    Replaces ``MatMul(X, W) + B`` by ``Gemm(X, W, B)`` if *X* and *W*
+    are matrices and *B* a constant row, a transposed *W* becomes
+    attribute *transB*. It requires opset 7 for the broadcasting
+    of *B*. Only float matrices are fused, *onnxruntime* does not
+    implement *Gemm* for doubles.
+    """
+    if graph.opset is not None and graph.opset < 7:
+        return 0
+    nodes = _main_domain_nodes(graph, 'MatMul')
+    if len(nodes) == 0:
+        return 0
+    _infer_ranks(graph)
+    changes = 0
+    for node in nodes:
+        if graph.is_removed(node):
+            continue
+        x, w, y = node.input[0], node.input[1], node.output[0]
+        if (graph.ranks.get(x, None) != 2 or
+                graph.ranks.get(w, None) != 2 or
+                graph.types.get(w, None) != TensorProto.FLOAT):
+            continue
+        add = graph.single_consumer(y)
+        if (add is None or add.op_type != 'Add' or
+                add.domain not in ('', 'ai.onnx') or
+                _gemm_bias(graph, add, y) is None):
+            continue
+
+        inputs = [x, w]
+        trans = graph.producer(w, 'Transpose')
+        trans_b = 0
+        if trans is not None and graph.single_consumer(w) is not None:
+            perm = _get_attribute(trans, 'perm')
+            if perm is None or list(perm.ints) == [1, 0]:
+                inputs[1] = trans.input[0]
+                trans_b = 1
+                graph.remove(trans)
+        inputs.append(add.input[1 if add.input[0] == y else 0])
+        output = add.output[0]
+        gemm = make_node('Gemm', inputs, [output], name=node.name,
+                         transB=trans_b)
+        graph.remove(node)
+        graph.remove(add)
+        graph.producers[output] = gemm
+        graph.insert(gemm, node)
+        graph.ranks[output] = 2
+        changes += 1
+    return changes
+
+
+# Operators whose results are not the same for the same inputs.
+_NON_DETERMINISTIC = {
+    'Multinomial', 'RandomNormal', 'RandomNormalLike', 'RandomUniform',
+    'RandomUniformLike',
+}
+
+
+def _node_key(node):
+    atts = sorted(node.attribute, key=lambda att: att.name)
+    return (node.domain, node.op_type, tuple(node.input), len(node.output),
+            b''.join(att.SerializeToString() for att in atts))
+
+
+def eliminate_common_subexpressions(graph):
+    """
+    Merges the nodes with the same type, attributes and inputs,
+    the converters of every branch of a pipeline usually cast
+    or slice the same inputs. Only the operators of the main and
+    *ai.onnx.ml* domains are considered.
+    """
+    changes = 0
+    seen = {}
+    for node in graph.nodes:
+        if (graph.is_removed(node) or
+                node.op_type in _NON_DETERMINISTIC or
+                node.domain not in ('', 'ai.onnx', 'ai.onnx.ml')):
+            continue
+        key = _node_key(node)
+        first = seen.get(key, None)
+        if first is None:
+            seen[key] = node
+            continue
+        if any(o in graph.outputs or (o and not f)
+               for o, f in zip(node.output, first.output)):
+            # a graph output or an optional output the first
+            # node does not produce
+            continue
+        graph.remove(node)
+        for old, new in zip(node.output, first.output):
+            if not old:
+                continue
+            graph.producers.pop(old, None)
+            for c in graph.consumers.pop(old, []):
+                _rename_input(c, old, new)
+                graph._add_consumer(new, c)
+        changes += 1
+    return changes
+
+
+def remove_dead_nodes(graph):
+    """
+    Removes the nodes whose outputs are neither graph outputs
+    nor used by any other node.
+    """
+    changes = 0
+    for node in reversed(graph.nodes):
+        if graph.is_removed(node) or any(
+                o in graph.outputs or graph.consumers.get(o, None)
+                for o in node.output if o):
+            continue
+        graph.remove(node)
+        for o in node.output:
+            graph.producers.pop(o, None)
+        changes += 1
+    return changes
+
+
+# Optimization passes, key: name, value: function taking an
+# OptimizedGraph and returning the number of changes it made.
+_optimization_passes = OrderedDict([
+    ('identity', remove_identity),
+    ('constant', fold_constants),
+    ('reshape', fuse_reshape),
+    ('cast', fuse_cast),
+    ('transpose', fuse_transpose),
+    ('gemm', fuse_gemm),
+    ('cse', eliminate_common_subexpressions),
+    ('dead', remove_dead_nodes),
+])
+
+
+def get_optimization_passes(optimize):
+    """
+    Returns the list of optimization functions for parameter
+    *optimize*: True for every registered pass, a list of names
+    to choose some of them.
+    """
+    if optimize is True:
+        return list(_optimization_passes.values())
+    if isinstance(optimize, str):
+        optimize = [optimize]
+    passes = []
+    for name in optimize:
+        if name not in _optimization_passes:
+            raise ValueError(
+                "Unknown optimization '{}', it must be in {}.".format(
+                    name, list(_optimization_passes)))
+        passes.append(_optimization_passes[name])
+    return passes
+
+
+def optimize_graph(graph, optimize=True, max_iter=10):
+    """
+    Applies the optimization passes on an :class:`OptimizedGraph`
+    until none of them changes the graph.
+
+    :param graph: :class:`OptimizedGraph`
+    :param optimize: see :func:`get_optimization_passes`
+    :param max_iter: maximum number of times the passes are applied
+    :return: number of changes
+    """
+    passes = get_optimization_passes(optimize)
+    total = 0
+    for _ in range(max_iter):
+        changes = sum(fct(graph) for fct in passes)
+        total += changes
+        if changes == 0:
+            break
+    return total
+
+
+def _known_types(value_infos):
+    types = {}
+    ranks = {}
+    for vi in value_infos:
+        if vi.type.HasField('tensor_type'):
+            types[vi.name] = vi.type.tensor_type.elem_type
+            if vi.type.tensor_type.HasField('shape'):
+                ranks[vi.name] = len(vi.type.tensor_type.shape.dim)
+    return types, ranks
+
+
+def optimize_container(container, optimize=True, variables=None):
+    """
+    Optimizes the nodes and initializers of a container
+    (:class:`ModelComponentContainer
+    <skl2onnx.common._container.ModelComponentContainer>`)
+    before the model is created.
+
+    :param container: container
+    :param optimize: see :func:`get_optimization_passes`
+    :param variables: None or the variables of the topology,
+        their types (given by the shape calculators) tell
+        which casts do not change anything
+    :return: number of changes
+    """
+    value_infos = list(container.inputs)
+    for var in variables or []:
+        if var.type is None or not isinstance(var.type, TensorType):
+            continue
+        vi = ValueInfoProto()
+        vi.name = var.onnx_name
+        vi.type.CopyFrom(var.type.to_onnx_type())
+        value_infos.append(vi)
+    types, ranks = _known_types(value_infos)
+    graph = OptimizedGraph(
+        container.nodes, container.initializers,
+        [vi.name for vi in container.inputs],
+        [vi.name for vi in container.outputs], types=types,
+        ranks=ranks, opset=container.target_opset)
+    changes = optimize_graph(graph, optimize)
+    if changes > 0:
+        container.nodes, container.initializers = graph.to_lists()
+        names = set()
+        for node in container.nodes:
+            names.update(node.output)
+        container.value_info = [vi for vi in container.value_info
+                                if vi.name in names]
+    return changes
+
+
+def optimize_model(model, optimize=True):
+    """
+    Returns an optimized copy of an ONNX model, only the main graph
+    is optimized.
+
+    :param model: *ModelProto*
+    :param optimize: see :func:`get_optimization_passes`
+    :return: *ModelProto*
+    """
+    onnx_model = ModelProto()
+    onnx_model.CopyFrom(model)
+    main = onnx_model.graph
+    types, ranks = _known_types(list(main.input) + list(main.value_info))
+    opsets = [op.version for op in model.opset_import
+              if op.domain in ('', 'ai.onnx')]
+    graph = OptimizedGraph(
+        main.node, main.initializer, [vi.name for vi in main.input],
+        [vi.name for vi in main.output], types=types, ranks=ranks,
+        opset=opsets[0] if opsets else None)
+    if optimize_graph(graph, optimize) == 0:
+        return onnx_model
+    nodes, inits = graph.to_lists()
+    nodes = [_copy(node, NodeProto) for node in nodes]
+    inits = [_copy(init, TensorProto) for init in inits]
+    names = set(i.name for i in main.input)
+    for node in nodes:
+        names.update(node.output)
+    value_info = [_copy(vi, ValueInfoProto) for vi in main.value_info
+                  if vi.name in names]
+    for field, values in [(main.node, nodes), (main.initializer, inits),
+                          (main.value_info, value_info)]:
+        del field[:]
+        field.extend(values)
+    return onnx_model
+
+
+def _copy(proto, cls):
+    res = cls()
+    res.CopyFrom(proto)
+    return res
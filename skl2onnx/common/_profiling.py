@@ -0,0 +1,129 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Records where the time goes during a conversion.
+"""
+import json
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class ConversionProfile:
+    """
+    Collects the wall time of every step of a conversion,
+    the parsing, every step of the compilation of the topology
+    and every converter call. Measures made on a container
+    also record the number of nodes and initializers added
+    to the graph and their size in bytes once serialized.
+    An instance is returned by :func:`convert_sklearn
+    <skl2onnx.convert_sklearn>` when *profile* is True.
+
+    Every record is a dictionary with the following keys:
+
+    * *name*: name of the step or of the converted operator
+    * *category*: ``'phase'`` or ``'converter'``
+    * *depth*: nesting level, a step may contain other steps
+    * *start*, *duration*: in seconds, *start* is relative to
+      the creation of the profile
+    * *n_nodes*, *n_initializers*, *bytes*: only if the step
+      was measured on a container
+    * any additional information given to :meth:`measure`,
+      the converter calls add *type* (operator alias) and *model*
+      (class of the converted model)
+    """
+
+    def __init__(self):
+        self.records = []
+        self._depth = 0
+        self._origin = perf_counter()
+
+    @contextmanager
+    def measure(self, name, category='phase', container=None, **kwargs):
+        """
+        Context manager measuring the code it wraps.
+
+        :param name: name of the step
+        :param category: category of the step
+        :param container: :class:`ModelComponentContainer
+            <skl2onnx.common._container.ModelComponentContainer>`,
+            if not None, the record includes the number of nodes and
+            initializers added to it
+        :param kwargs: additional information stored in the record
+        """
+        record = dict(name=name, category=category, depth=self._depth)
+        record.update(kwargs)
+        # The record is added before the nested ones to keep
+        # the records sorted by start time.
+        self.records.append(record)
+        if container is not None:
+            n_nodes = len(container.nodes)
+            n_initializers = len(container.initializers)
+        self._depth += 1
+        begin = perf_counter()
+        try:
+            yield record
+        finally:
+            end = perf_counter()
+            self._depth -= 1
+            record['start'] = begin - self._origin
+            record['duration'] = end - begin
+            if container is not None:
+                nodes = container.nodes[n_nodes:]
+                initializers = container.initializers[n_initializers:]
+                record['n_nodes'] = len(nodes)
+                record['n_initializers'] = len(initializers)
+                record['bytes'] = (
+                    sum(node.ByteSize() for node in nodes) +
+                    sum(init.ByteSize() for init in initializers))
+
+    def to_json(self, filename=None):
+        """
+        Returns the records as a JSON string,
+        it is also written in *filename* if not None.
+        """
+        content = json.dumps({'records': self.records}, indent=1)
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(content)
+        return content
+
+    def to_chrome_trace(self, filename=None):
+        """
+        Returns the records in the *Trace Event Format*
+        as a JSON string, it is also written in *filename* if not None.
+        The file can be loaded in *chrome://tracing* or
+        `Perfetto <https://ui.perfetto.dev/>`_.
+        """
+        events = []
+        for record in self.records:
+            args = {k: v for k, v in record.items()
+                    if k not in ('name', 'category', 'start', 'duration')}
+            events.append({
+                'name': record['name'], 'cat': record['category'],
+                'ph': 'X', 'pid': 0, 'tid': 0,
+                'ts': record['start'] * 1e6,
+                'dur': record['duration'] * 1e6,
+                'args': args})
+        content = json.dumps({'traceEvents': events,
+                              'displayTimeUnit': 'ms'}, indent=1)
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(content)
+        return content
+
+
+@contextmanager
+def measure(profile, name, category='phase', container=None, **kwargs):
+    """
+    Calls :meth:`ConversionProfile.measure` if *profile* is not None,
+    does nothing otherwise.
+    """
+    if profile is None:
+        yield None
+    else:
+        with profile.measure(name, category=category, container=container,
+                             **kwargs) as record:
+            yield record
@@ -3,14 +3,94 @@
 # Licensed under the MIT License. See License.txt in the project root for
 # license information.
 # --------------------------------------------------------------------------
+from importlib import import_module
 from .utils_checking import check_signature
 
+
+class _LazyPool(dict):
+    """
+    Dictionary of registered functions. The built-in converters and
+    shape calculators are declared with the module registering them
+    (see :meth:`declare`), the module is imported the first time one
+    of its keys is requested. Enumerating the keys imports
+    every declared module.
+    """
+
+    def __init__(self):
+        dict.__init__(self)
+        self.modules = {}
+
+    def declare(self, module_name, operator_names):
+        """
+        Declares that module *module_name* registers every
+        name in *operator_names* when it is imported.
+        """
+        for name in operator_names:
+            self.modules[name] = module_name
+
+    def _load(self, key):
+        module_name = self.modules.get(key, None)
+        if module_name is not None:
+            # The entry is removed after the import so that another
+            # thread requesting the same key waits for the import.
+            import_module(module_name)
+            self.modules.pop(key, None)
+
+    def load_all(self):
+        """
+        Imports every declared module.
+        """
+        for key in list(self.modules):
+            self._load(key)
+
+    def _first(self):
+        # First registered function, no module is imported.
+        for key in dict.__iter__(self):
+            return dict.__getitem__(self, key)
+        return None
+
+    def __missing__(self, key):
+        if key in self.modules:
+            self._load(key)
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.modules:
+            self._load(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        self.load_all()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.load_all()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.load_all()
+        return dict.values(self)
+
+    def items(self):
+        self.load_all()
+        return dict.items(self)
+
+
 # This dictionary defines the converters which can be invoked in the
 # conversion framework defined in _topology.py. A key in this dictionary
 # is an operator's unique ID (e.g., string and type) while the
 # associated value is the callable object used to convert the
 # operator specified by the key.
-_converter_pool = {}
+_converter_pool = _LazyPool()
 
 
 class RegisteredConverter:
@@ -37,7 +117,7 @@ class RegisteredConverter:
 # dictionary is an operator's unique ID (e.g., string and type) while
 # the associated value is the callable object used to infer the output
 # shape(s) for the operator specified by the key.
-_shape_calculator_pool = {}
+_shape_calculator_pool = _LazyPool()
 
 
 def register_converter(operator_name, conversion_function, overwrite=False,
@@ -54,12 +134,15 @@ def register_converter(operator_name, conversion_function, overwrite=False,
     :param options: supported options for this converter
         (dictionary {name: supported values or None})
     """
-    if not overwrite and operator_name in _converter_pool:
+    # The membership test imports the module registering the built-in
+    # converter first, it would fail if it was imported after.
+    exists = operator_name in _converter_pool
+    if not overwrite and exists:
         raise ValueError('We do not overwrite registered converter '
                          'by default')
-    if len(_converter_pool) > 0:
-        key = next(iter(_converter_pool))
-        check_signature(conversion_function, _converter_pool[key]._fct,
+    first = _converter_pool._first()
+    if first is not None:
+        check_signature(conversion_function, first._fct,
                         skip=('operator', ))
     _converter_pool[operator_name] = RegisteredConverter(
         conversion_function, options)
@@ -85,12 +168,13 @@ def register_shape_calculator(operator_name, calculator_function,
                       (i.e., calculator_function). Set this flag to True
                       to enable overwriting.
     """
-    if not overwrite and operator_name in _shape_calculator_pool:
+    exists = operator_name in _shape_calculator_pool
+    if not overwrite and exists:
         raise ValueError('We do not overwrite registrated shape calculator '
                          'by default')
-    if calculator_function is not None and len(_shape_calculator_pool) > 0:
-        key = next(iter(_shape_calculator_pool))
-        check_signature(calculator_function, _shape_calculator_pool[key],
+    first = _shape_calculator_pool._first()
+    if calculator_function is not None and first is not None:
+        check_signature(calculator_function, first,
                         skip=('operator', ))
     _shape_calculator_pool[operator_name] = calculator_function
 
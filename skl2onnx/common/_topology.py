@@ -4,8 +4,11 @@
 # license information.
 # --------------------------------------------------------------------------
 
+import heapq
+from collections import deque
 import re
 import warnings
+from itertools import islice
 import numpy as np
 from onnx import onnx_pb as onnx_proto
 from onnxconverter_common.data_types import (  # noqa
@@ -28,6 +31,9 @@ from . import _registration
 from . import utils
 from .exceptions import MissingShapeCalculator, MissingConverter
 from ._container import ModelComponentContainer, _build_options
+from ._incremental import BlockReplay, ConvertedBlocks, operator_fingerprint
+from ._optimize import optimize_container
+from ._profiling import measure
 from .interface import OperatorBase
 type_fct = type
 
@@ -107,8 +113,9 @@ class Variable:
         Creates a data type from a protobuf object.
         """
         def get_shape(tt):
-            return [tt.shape.dim[i].dim_value
-                    for i in range(len(tt.shape.dim))]
+            # unknown and symbolic dimensions become None
+            return [d.dim_value if d.HasField('dim_value') else None
+                    for d in tt.shape.dim]
 
         if hasattr(obj, 'extend'):
             return [Variable.from_pb(o) for o in obj]
@@ -425,6 +432,17 @@ class Scope:
             fail=fail)
 
 
+def _already_assigned_error(variable, operator):
+    return RuntimeError(
+        "A variable is already assigned ({}) "
+        "for operator '{}' (name='{}'). This "
+        "may still happen if a converter is a "
+        "combination of sub-operators and one of "
+        "of them is producing this output. "
+        "In that case, an identity node must be "
+        "added.".format(variable, operator.type, operator.onnx_name))
+
+
 class Topology:
     """
     Holds instances on :class:`Scope <skl2onnx.common._topology.Scope>` and
@@ -435,6 +453,13 @@ class Topology:
     must be called to convert the topological graph into *ONNX* graph.
     """ # noqa
 
+    # When several operators can be produced at the same time,
+    # the ones with the highest priority are produced last.
+    _operator_priorities = {
+        'tensorToProbabilityMap': 2,
+        'tensorToLabel': 1
+    }
+
     def __init__(self, model, default_batch_size=1, initial_types=None,
                  reserved_variable_names=None, reserved_operator_names=None,
                  target_opset=None, custom_conversion_functions=None,
@@ -491,6 +516,10 @@ class Topology:
         # indirectly affects _infer_all_shapes and _prune functions.
         self.root_names = list()
 
+        # Nodes and initializers produced for every operator,
+        # set by convert_topology if record_blocks is True.
+        self.converted_blocks = None
+
         for k in self.custom_conversion_functions:
             if not callable(k):
                 raise TypeError("Keys in custom_conversion_functions must be "
@@ -580,82 +609,173 @@ class Topology:
         simply go though all operators without considering their
         topological structure, please use another function,
         unordered_operator_iterator.
+
+        The graph is traversed by passes. Every pass goes through
+        the operators sorted by priority and declaration order and
+        produces every operator whose inputs are fed. The traversal
+        keeps an index of the operators consuming every variable and
+        the number of inputs not fed yet for every operator,
+        the cost is linear in the number of operators and variables.
+        Operators declared while iterating (by a converter for example)
+        are produced in the next pass.
         """
         self._initialize_graph_status_for_traversing()
-        priorities = {
-            'tensorToProbabilityMap': 2,
-            'tensorToLabel': 1
-        }
-        while not all(operator.is_evaluated for scope in self.scopes
-                      for operator in scope.operators.values()):
-            is_evaluation_happened = False
-            for operator in sorted(self.unordered_operator_iterator(),
-                                   key=lambda op: priorities[op.type]
-                                   if op.type in priorities else 0):
-                if not isinstance(operator.inputs, list):
-                    raise TypeError(
-                        "operator.inputs must be a list not {}".format(
-                            type(operator.inputs)))
-                if (all(variable.is_fed for variable in operator.inputs)
-                        and not operator.is_evaluated):
-                    # Check if over-writing problem occurs (i.e., multiple
-                    # operators produce results on one variable).
-                    for variable in operator.outputs:
-                        # Throw an error if this variable has been treated as
-                        # an output somewhere
-                        if variable.is_fed:
-                            raise RuntimeError(
-                                "A variable is already assigned ({}) "
-                                "for operator '{}' (name='{}'). This "
-                                "may still happen if a converter is a "
-                                "combination of sub-operators and one of "
-                                "of them is producing this output. "
-                                "In that case, an identity node must be "
-                                "added.".format(
-                                    variable, operator.type,
-                                    operator.onnx_name))
-                        # Mark this variable as filled
-                        variable.is_fed = True
-                    # Make this operator as handled
-                    operator.is_evaluated = True
-                    is_evaluation_happened = True
-
-                    # Send out an operator
-                    yield operator
-
-                    # This step may create new nodes if the
-                    # the converter is called while looping on
-                    # the nodes. The outputs of an operator
-                    # are not necessary the inputs of the next
-                    # one and but can processed by other ONNX nodes
-                    # inserted in the container. As a result, some
-                    # variables never have is_fed set to True which
-                    # is updated now unless they are an operator
-                    # output.
-                    known_outputs = {}
-                    for op in self.unordered_operator_iterator():
-                        for out in op.outputs:
-                            if hasattr(out, 'onnx_name'):
-                                known_outputs[out.onnx_name] = out
-                            else:
-                                known_outputs[out] = out
-                    for variable in self.unordered_variable_iterator():
-                        if variable.is_fed:
-                            continue
-                        if variable.onnx_name in known_outputs:
-                            continue
-                        update = (False if self.root_names and
-                                  variable.onnx_name not in self.root_names
-                                  else True)
-                        if update:
-                            variable.is_fed = True
-                            is_evaluation_happened = True
-
-            # After scanning through the whole computational graph, at
-            # least one operator should be evaluated. If not, we need
-            # to terminate this procedure to avoid dead lock.
-            if not is_evaluation_happened:
-                break
+        roots = set(self.root_names)
+        priorities = Topology._operator_priorities
+
+        # key: (priority, scope index, operator index in scope)
+        operators = {}
+        # key -> first pass the operator can be produced in
+        first_pass = {}
+        # key -> number of inputs not fed yet
+        pending = {}
+        # id(variable) -> keys of the operators consuming it
+        consumers = {}
+        # onnx_name of every variable produced by an operator
+        produced = set()
+        # number of operators, variables indexed in every scope
+        known_operators = []
+        known_variables = []
+        # ready operators for the current pass (heap),
+        # ready operators for the next pass
+        current = []
+        delayed = []
+        state = {'pass': 0, 'cursor': None}
+
+        def push(key):
+            if (first_pass[key] <= state['pass'] and
+                    (state['cursor'] is None or key > state['cursor'])):
+                heapq.heappush(current, key)
+            else:
+                delayed.append(key)
+
+        def register(key, operator, npass):
+            if not isinstance(operator.inputs, list):
+                raise TypeError(
+                    "operator.inputs must be a list not {}".format(
+                        type(operator.inputs)))
+            for out in operator.outputs:
+                produced.add(out.onnx_name if hasattr(out, 'onnx_name')
+                             else out)
+            if operator.is_evaluated:
+                return
+            operators[key] = operator
+            first_pass[key] = npass
+            n_pending = 0
+            seen = set()
+            for variable in operator.inputs:
+                if id(variable) in seen:
+                    continue
+                seen.add(id(variable))
+                if not variable.is_fed:
+                    n_pending += 1
+                    consumers.setdefault(id(variable), []).append(key)
+            pending[key] = n_pending
+            if n_pending == 0:
+                push(key)
+
+        def feed(variable):
+            variable.is_fed = True
+            for key in consumers.pop(id(variable), []):
+                pending[key] -= 1
+                if pending[key] == 0 and not operators[key].is_evaluated:
+                    push(key)
+
+        def update_index(npass):
+            # Indexes operators and variables declared since
+            # the last call. The whole index is rebuilt if some of
+            # them were removed.
+            for si, scope in enumerate(self.scopes):
+                if si >= len(known_operators):
+                    known_operators.append(0)
+                    known_variables.append(0)
+                if (len(scope.operators) < known_operators[si] or
+                        len(scope.variables) < known_variables[si]):
+                    for container in (operators, first_pass, pending,
+                                      consumers, current, delayed):
+                        container.clear()
+                    produced.clear()
+                    del known_operators[:]
+                    del known_variables[:]
+                    update_index(npass)
+                    return
+            for si, scope in enumerate(self.scopes):
+                n = known_operators[si]
+                if len(scope.operators) == n:
+                    continue
+                for oi, operator in enumerate(
+                        islice(scope.operators.values(), n, None), n):
+                    register((priorities.get(operator.type, 0), si, oi),
+                             operator, npass)
+                known_operators[si] = len(scope.operators)
+
+            # This step may create new nodes if the
+            # the converter is called while looping on
+            # the nodes. The outputs of an operator
+            # are not necessary the inputs of the next
+            # one and but can processed by other ONNX nodes
+            # inserted in the container. As a result, some
+            # variables never have is_fed set to True which
+            # is updated now unless they are an operator
+            # output.
+            for si, scope in enumerate(self.scopes):
+                n = known_variables[si]
+                if len(scope.variables) == n:
+                    continue
+                for variable in islice(scope.variables.values(), n, None):
+                    if variable.is_fed or variable.onnx_name in produced:
+                        continue
+                    if not roots or variable.onnx_name in roots:
+                        feed(variable)
+                known_variables[si] = len(scope.variables)
+
+        update_index(0)
+        while True:
+            if not current:
+                if not delayed:
+                    # Inputs may have been modified after an operator
+                    # was indexed, the last pass checks every operator
+                    # not evaluated before stopping.
+                    delayed.extend(
+                        key for key, operator in operators.items()
+                        if not operator.is_evaluated and
+                        all(variable.is_fed for variable in operator.inputs))
+                    if not delayed:
+                        break
+                # After scanning through the whole computational graph,
+                # the next pass starts.
+                current.extend(delayed)
+                del delayed[:]
+                heapq.heapify(current)
+                state['pass'] += 1
+                state['cursor'] = None
+
+            key = heapq.heappop(current)
+            operator = operators[key]
+            if operator.is_evaluated:
+                continue
+            if not all(variable.is_fed for variable in operator.inputs):
+                # Inputs were replaced after the operator was indexed.
+                register(key, operator, state['pass'] + 1)
+                continue
+            state['cursor'] = key
+
+            # Check if over-writing problem occurs (i.e., multiple
+            # operators produce results on one variable).
+            for variable in operator.outputs:
+                # Throw an error if this variable has been treated as
+                # an output somewhere
+                if variable.is_fed:
+                    raise _already_assigned_error(variable, operator)
+                # Mark this variable as filled
+                feed(variable)
+            # Make this operator as handled
+            operator.is_evaluated = True
+
+            # Send out an operator
+            yield operator
+
+            update_index(state['pass'] + 1)
 
     def _check_structure(self):
         """
@@ -767,15 +887,71 @@ class Topology:
             else:
                 operator.infer_types()
 
-    def _resolve_duplicates(self):
+    def _build_graph_index(self):
+        """
+        Returns a dictionary ``{ onnx_name: [(operator, i), ...] }``
+        which gives for every variable the operators consuming it
+        and the position of the variable in their inputs.
+        """
+        consumers = {}
+        for operator in self.unordered_operator_iterator():
+            for i, variable in enumerate(operator.inputs):
+                consumers.setdefault(variable.onnx_name, []).append(
+                    (operator, i))
+        return consumers
+
+    def _evaluate(self, consumers):
+        """
+        Conducts a dummy evaluation of this topology. It sets all
+        reachable operators evaluated and all reachable variables fed
+        and returns the evaluated operators in a topological order.
+        Every operator and every variable is visited once
+        thanks to the index returned by :meth:`_build_graph_index`.
+        """
+        self._initialize_graph_status_for_traversing()
+        pending = {}
+        ready = deque()
+        for operator in self.unordered_operator_iterator():
+            pending[id(operator)] = len(set(
+                variable.onnx_name for variable in operator.inputs
+                if not variable.is_fed))
+            if pending[id(operator)] == 0:
+                ready.append(operator)
+
+        order = []
+        while ready:
+            operator = ready.popleft()
+            for variable in operator.outputs:
+                if variable.is_fed:
+                    raise _already_assigned_error(variable, operator)
+                variable.is_fed = True
+                seen = set()
+                for consumer, _ in consumers.get(variable.onnx_name, []):
+                    if id(consumer) in seen:
+                        continue
+                    seen.add(id(consumer))
+                    pending[id(consumer)] -= 1
+                    if pending[id(consumer)] == 0:
+                        ready.append(consumer)
+            operator.is_evaluated = True
+            order.append(operator)
+        return order
+
+    def _resolve_duplicates(self, consumers=None, order=None):
         """
         Merge variables connected by identity operator to reduce the
-        number of redundant variables
+        number of redundant variables. *consumers* is the index
+        returned by :meth:`_build_graph_index` and *order* the
+        operators in a topological order, both are computed if None.
         """
+        if consumers is None:
+            consumers = self._build_graph_index()
+        if order is None:
+            order = self._evaluate(consumers)
         self._initialize_graph_status_for_traversing()
 
         # Traverse the graph from roots to leaves
-        for operator in self.topological_operator_iterator():
+        for operator in order:
             if operator.type != 'identity':
                 continue
 
@@ -786,13 +962,10 @@ class Topology:
             # Replace the output variable with the input variable everywhere
             original = operator.inputs[0]
             duplicate = operator.outputs[0]
-            for another_scope in self.scopes:
-                for another_operator in another_scope.operators.values():
-                    for i in range(len(another_operator.inputs)):
-                        if (another_operator.inputs[i].onnx_name
-                                != duplicate.onnx_name):
-                            continue
-                        another_operator.inputs[i] = original
+            replaced = consumers.pop(duplicate.onnx_name, [])
+            for another_operator, i in replaced:
+                another_operator.inputs[i] = original
+            consumers.setdefault(original.onnx_name, []).extend(replaced)
 
             # When original variable's documentation string or
             # denotation is empty but duplicate's is not, we copy that
@@ -879,11 +1052,17 @@ class Topology:
                         variable.type.shape += [1] * (
                             4 - len(variable.type.shape))
 
-    def _prune(self):
-        # Conduct a dummy evaluation of this topology. It may set all
-        # reachable operators evaluated and all reachable variables fed.
-        for operator in self.topological_operator_iterator():
-            pass
+    def _prune(self, consumers=None):
+        """
+        Removes the operators and the variables which cannot be reached
+        from the inputs. *consumers* is the index returned by
+        :meth:`_build_graph_index`, it is computed if None.
+        The function returns the remaining operators in a topological
+        order.
+        """
+        if consumers is None:
+            consumers = self._build_graph_index()
+        order = self._evaluate(consumers)
 
         for scope in self.scopes:
             # Remove unused operators
@@ -901,24 +1080,38 @@ class Topology:
                     abandoned_variable_names.append(variable.onnx_name)
             for onnx_name in abandoned_variable_names:
                 scope.delete_local_variable(onnx_name)
+        return order
 
-    def compile(self):
+    def compile(self, profile=None):
         """
         This function aims at giving every operator enough information
         so that all operator conversions can happen independently. We
         also want to check, fix, and simplify the network structure
         here.
+
+        :param profile: :class:`ConversionProfile
+            <skl2onnx.common._profiling.ConversionProfile>`,
+            if not None, every step is measured
         """
-        self._prune()
-        self._resolve_duplicates()
-        self._fix_shapes()
-        self._infer_all_types()
-        self._check_structure()
+        # The index of consumers is built once and kept up to date
+        # by the two first steps.
+        consumers = self._build_graph_index()
+        with measure(profile, '_prune'):
+            order = self._prune(consumers)
+        with measure(profile, '_resolve_duplicates'):
+            self._resolve_duplicates(consumers, order)
+        for step in [self._fix_shapes, self._infer_all_types,
+                     self._check_structure]:
+            with measure(profile, step.__name__):
+                step()
 
 
 def convert_topology(topology, model_name, doc_string, target_opset,
                      channel_first_inputs=None, dtype=None,
-                     options=None):
+                     options=None, deduplicate_initializers=True,
+                     n_jobs=None, profile=None, external_data=None,
+                     previous=None, record_blocks=False, optimize=False,
+                     keep_outputs=None):
     """
     This function is used to convert our Topology object defined in
     _parser.py into a ONNX model (type: ModelProto).
@@ -935,6 +1128,35 @@ def convert_topology(topology, model_name, doc_string, target_opset,
         `np.float32` or `np.float64`
     :param options: see :ref:`l-conv-options`
     include '1.1.2', '1.2', and so on.
+    :param deduplicate_initializers: if True, initializers with the same
+        content are stored once
+    :param n_jobs: number of threads used by converters to extract
+        the attributes of independent estimators
+    :param profile: :class:`ConversionProfile
+        <skl2onnx.common._profiling.ConversionProfile>`,
+        if not None, every converter call is measured
+    :param external_data: None or an opened :class:`ExternalDataWriter
+        <skl2onnx.common._external_data.ExternalDataWriter>`
+        receiving the values of big initializers
+    :param previous: None or a tuple *(onnx_model, topology)* returned by
+        a previous conversion with *record_blocks=True*, the nodes and
+        initializers of every operator whose fitted model, inputs,
+        outputs and options did not change are copied from *onnx_model*
+        instead of calling its converter
+    :param record_blocks: if True, the nodes and initializers
+        every converter adds are recorded in *topology.converted_blocks*
+        (see :class:`ConvertedBlocks
+        <skl2onnx.common._incremental.ConvertedBlocks>`)
+    :param optimize: False, True or a list of optimization names,
+        if not False, the graph is rewritten before the model is created
+        to remove useless nodes and fuse chains of nodes
+        (see :func:`get_optimization_passes
+        <skl2onnx.common._optimize.get_optimization_passes>`),
+        blocks cannot be recorded in that case
+    :param keep_outputs: None to keep every output or the names of the
+        outputs to keep, the operators and the nodes which only compute
+        the other outputs are removed, blocks cannot be recorded
+        in that case
     :return: a ONNX ModelProto
     """
     if dtype is None:
@@ -968,7 +1190,9 @@ def convert_topology(topology, model_name, doc_string, target_opset,
         target_opset, options=options, dtype=dtype,
         registered_models=topology.registered_models,
         white_op=topology.raw_model._white_op,
-        black_op=topology.raw_model._black_op)
+        black_op=topology.raw_model._black_op,
+        deduplicate_initializers=deduplicate_initializers,
+        n_jobs=n_jobs, external_data=external_data)
 
     # Put roots and leaves as ONNX's model into buffers. They will be
     # added into ModelComponentContainer later.
@@ -1038,9 +1262,40 @@ def convert_topology(topology, model_name, doc_string, target_opset,
         if name in other_outputs:
             container.add_output(other_outputs[name])
 
+    if record_blocks and optimize:
+        raise ValueError(
+            "Blocks cannot be recorded if the graph is optimized.")
+    skipped = set()
+    if keep_outputs is not None:
+        if record_blocks:
+            raise ValueError(
+                "Blocks cannot be recorded if outputs are removed.")
+        if isinstance(keep_outputs, str):
+            keep_outputs = [keep_outputs]
+        names = [o.name for o in container.outputs]
+        missing = [name for name in keep_outputs if name not in names]
+        if missing or len(keep_outputs) == 0:
+            raise ValueError(
+                "Unable to keep outputs {}, the model produces {}.".format(
+                    missing or keep_outputs, names))
+        container.outputs = [o for o in container.outputs
+                             if o.name in keep_outputs]
+        skipped = _unneeded_operators(topology, keep_outputs)
+    blocks = ConvertedBlocks() if record_blocks else None
+    replay = None
+    if previous is not None:
+        if previous[1].converted_blocks is None:
+            raise RuntimeError(
+                "The previous topology holds no converted blocks, "
+                "it must be converted with record_blocks=True.")
+        replay = BlockReplay(previous[0], previous[1].converted_blocks,
+                             container, topology)
+
     # Traverse the graph from roots to leaves
     # This loop could eventually be parallelized.
     for operator in topology.topological_operator_iterator():
+        if operator.full_name in skipped:
+            continue
         scope = next(scope for scope in topology.scopes
                      if scope.name == operator.scope)
         mtype = type(operator.raw_operator)
@@ -1063,8 +1318,80 @@ def convert_topology(topology, model_name, doc_string, target_opset,
                     "".format(operator.type,
                               type(getattr(operator, 'raw_model', None))))
         container.validate_options(operator)
-        conv(scope, operator, container)
+        key = None
+        if blocks is not None or replay is not None:
+            key = operator_fingerprint(operator, conv, container)
+            state = (None if blocks is None
+                     else blocks.start(container, key))
+        if replay is not None and replay.replay(operator, key, scope):
+            reused = True
+        else:
+            reused = False
+            raw_model = (None if operator.raw_operator is None
+                         else type(operator.raw_operator).__name__)
+            with measure(profile, operator.full_name, category='converter',
+                         container=container, type=operator.type,
+                         model=raw_model):
+                conv(scope, operator, container)
+        if blocks is not None:
+            blocks.end(container, operator, state, reused=reused)
+
+    if blocks is not None:
+        blocks.finalize(topology, container)
+        topology.converted_blocks = blocks
+
+    if keep_outputs is not None:
+        with measure(profile, 'keep_outputs'):
+            optimize_container(container, 'dead')
+
+    if optimize:
+        with measure(profile, 'optimize'):
+            optimize_container(
+                container, optimize,
+                variables=topology.unordered_variable_iterator())
+
+    with measure(profile, 'make_model'):
+        onnx_model = _make_model(container, model_name)
 
+    # Update domain version
+    _update_domain_version(container, onnx_model)
+
+    # Add extra information
+    opv = min(onnx_target_opset,
+              _get_main_opset_version(onnx_model) or onnx_target_opset)
+    irv = OPSET_TO_IR_VERSION.get(opv, onnx_proto.IR_VERSION)
+    onnx_model.ir_version = irv
+    onnx_model.producer_name = utils.get_producer()
+    onnx_model.producer_version = utils.get_producer_version()
+    onnx_model.domain = utils.get_domain()
+    onnx_model.model_version = utils.get_model_version()
+    onnx_model.doc_string = doc_string
+
+    return onnx_model
+
+
+def _unneeded_operators(topology, outputs):
+    """
+    Returns the full names of the operators which do not
+    contribute to any output in *outputs*.
+    """
+    needed = set(outputs)
+    operators = list(topology.unordered_operator_iterator())
+    kept = set()
+    changed = True
+    while changed:
+        changed = False
+        for op in operators:
+            if op.full_name in kept:
+                continue
+            if any(v.full_name in needed for v in op.outputs):
+                kept.add(op.full_name)
+                needed.update(v.full_name for v in op.inputs)
+                changed = True
+    return set(op.full_name for op in operators) - kept
+
+
+def _make_model(container, model_name):
     # Create a graph from its main components
     if container.target_opset_onnx < 9:
         # When calling ModelComponentContainer's add_initializer(...),
@@ -1107,23 +1434,7 @@ def convert_topology(topology, model_name, doc_string, target_opset,
     graph.value_info.extend(container.value_info)
 
     # Create model
-    onnx_model = make_model(graph)
-
-    # Update domain version
-    _update_domain_version(container, onnx_model)
-
-    # Add extra information
-    opv = min(onnx_target_opset,
-              _get_main_opset_version(onnx_model) or onnx_target_opset)
-    irv = OPSET_TO_IR_VERSION.get(opv, onnx_proto.IR_VERSION)
-    onnx_model.ir_version = irv
-    onnx_model.producer_name = utils.get_producer()
-    onnx_model.producer_version = utils.get_producer_version()
-    onnx_model.domain = utils.get_domain()
-    onnx_model.model_version = utils.get_model_version()
-    onnx_model.doc_string = doc_string
-
-    return onnx_model
+    return make_model(graph)
 
 
 def _update_domain_version(container, onnx_model):
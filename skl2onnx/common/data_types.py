@@ -105,6 +105,29 @@ def guess_data_type(type_, shape=None):
                     "".format(type(type_)))
 
 
+# Numpy type of every ONNX tensor type, onnx.mapping is deprecated.
+_TENSOR_TYPE_TO_NP_TYPE = {
+    TensorProto.FLOAT: np.dtype(np.float32),
+    TensorProto.UINT8: np.dtype(np.uint8),
+    TensorProto.INT8: np.dtype(np.int8),
+    TensorProto.UINT16: np.dtype(np.uint16),
+    TensorProto.INT16: np.dtype(np.int16),
+    TensorProto.INT32: np.dtype(np.int32),
+    TensorProto.INT64: np.dtype(np.int64),
+    TensorProto.BOOL: np.dtype(np.bool_),
+    TensorProto.FLOAT16: np.dtype(np.float16),
+    TensorProto.DOUBLE: np.dtype(np.float64),
+    TensorProto.COMPLEX64: np.dtype(np.complex64),
+    TensorProto.COMPLEX128: np.dtype(np.complex128),
+    TensorProto.UINT32: np.dtype(np.uint32),
+    TensorProto.UINT64: np.dtype(np.uint64),
+    TensorProto.STRING: np.dtype(np.object_),
+}
+
+# ONNX tensor type of every numpy type.
+_NP_TYPE_TO_TENSOR_TYPE = {v: k for k, v in _TENSOR_TYPE_TO_NP_TYPE.items()}
+
+
 def guess_numpy_type(data_type):
     """
     Guess the corresponding numpy type based on data_type.
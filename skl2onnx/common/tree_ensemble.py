@@ -6,6 +6,8 @@
 """
 Common functions to convert any learner based on trees.
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 
@@ -110,6 +112,53 @@ def sklearn_threshold(dy, dtype, mode):
                        "'BRANCH_LEQ' (actually '{}').".format(mode))
 
 
+def find_switch_points(fy, nfy):
+    """
+    Vectorized version of :func:`find_switch_point`,
+    *fy* and *nfy* are arrays of the same shape.
+    """
+    a = np.asarray(fy, dtype=np.float64).copy()
+    b = np.asarray(nfy, dtype=np.float64).copy()
+    fa = a.astype(np.float32)
+    # Every element follows the same bisection as find_switch_point,
+    # an element which stopped moving is a fixed point of the loop.
+    while True:
+        m = (a + b) / 2
+        same = m.astype(np.float32) == fa
+        na = np.where(same, m, a)
+        nb = np.where(same, b, m)
+        if np.array_equal(na, a) and np.array_equal(nb, b):
+            return a
+        a, b = na, nb
+
+
+def sklearn_thresholds(dy, dtype, mode):
+    """
+    Vectorized version of :func:`sklearn_threshold`,
+    *dy* is an array of thresholds.
+    """
+    if mode == "BRANCH_LEQ":
+        dy = np.asarray(dy, dtype=np.float64)
+        fy = dy.astype(np.float32)
+        eps = np.maximum(np.abs(fy), np.finfo(np.float32).eps) * \
+            np.float32(10)
+        if dtype == np.float32:
+            nfy = np.nextafter(fy, fy - eps, dtype=np.float32)
+            return np.where(fy <= dy, fy, nfy).astype(np.float64)
+        elif dtype == np.float64:
+            afy = np.nextafter(fy, fy - eps, dtype=np.float32)
+            afy2 = find_switch_points(afy, fy)
+            bfy = np.nextafter(fy, fy + eps, dtype=np.float32)
+            bfy2 = find_switch_points(fy, bfy)
+            return np.where(
+                (fy > dy) & (dy > afy2), afy2,
+                np.where((fy <= dy) & (dy <= bfy2), bfy2,
+                         fy.astype(np.float64)))
+        raise TypeError("Unexpected dtype {}.".format(dtype))
+    raise RuntimeError("Threshold is not changed for other mode and "
+                       "'BRANCH_LEQ' (actually '{}').".format(mode))
+
+
 def add_node(attr_pairs, is_classifier, tree_id, tree_weight, node_id,
              feature_id, mode, value, true_child_id, false_child_id,
              weights, weight_id_bias, leaf_weights_are_counts,
@@ -164,28 +213,62 @@ def add_tree_to_attribute_pairs(attr_pairs, is_classifier, tree, tree_id,
                                 leaf_weights_are_counts,
                                 adjust_threshold_for_sklearn=False,
                                 dtype=None):
-    for i in range(tree.node_count):
-        node_id = i
-        weight = tree.value[i]
+    """
+    Appends every node of a *scikit-learn* tree to *attr_pairs*.
+    The attributes are computed with numpy on the whole tree
+    and every list is extended once instead of once per node.
+    The result is the same as calling :func:`add_node` on every node.
+    """
+    n_nodes = tree.node_count
+    node_ids = np.arange(n_nodes)
+    left = tree.children_left[:n_nodes]
+    right = tree.children_right[:n_nodes]
+    is_branch = (left > node_ids) | (right > node_ids)
+    is_leaf = ~is_branch
 
-        if tree.children_left[i] > i or tree.children_right[i] > i:
-            mode = 'BRANCH_LEQ'
-            feat_id = tree.feature[i]
-            threshold = tree.threshold[i]
-            left_child_id = int(tree.children_left[i])
-            right_child_id = int(tree.children_right[i])
-        else:
-            mode = 'LEAF'
-            feat_id = 0
-            threshold = 0.
-            left_child_id = 0
-            right_child_id = 0
+    threshold = np.where(is_branch, tree.threshold[:n_nodes], 0.)
+    if adjust_threshold_for_sklearn and is_branch.any():
+        threshold[is_branch] = sklearn_thresholds(
+            threshold[is_branch], dtype, 'BRANCH_LEQ')
 
-        add_node(attr_pairs, is_classifier, tree_id, tree_weight, node_id,
-                 feat_id, mode, threshold, left_child_id, right_child_id,
-                 weight, weight_id_bias, leaf_weights_are_counts,
-                 adjust_threshold_for_sklearn=adjust_threshold_for_sklearn,
-                 dtype=dtype)
+    attr_pairs['nodes_treeids'].extend([tree_id] * n_nodes)
+    attr_pairs['nodes_nodeids'].extend(node_ids.tolist())
+    attr_pairs['nodes_featureids'].extend(
+        np.where(is_branch, tree.feature[:n_nodes], 0).tolist())
+    attr_pairs['nodes_modes'].extend(
+        np.where(is_branch, 'BRANCH_LEQ', 'LEAF').tolist())
+    attr_pairs['nodes_values'].extend(threshold.tolist())
+    attr_pairs['nodes_truenodeids'].extend(
+        np.where(is_branch, left, 0).tolist())
+    attr_pairs['nodes_falsenodeids'].extend(
+        np.where(is_branch, right, 0).tolist())
+    attr_pairs['nodes_missing_value_tracks_true'].extend([False] * n_nodes)
+    attr_pairs['nodes_hitrates'].extend([1.] * n_nodes)
+
+    # Add leaf information for making prediction
+    leaf_ids = node_ids[is_leaf]
+    weights = tree.value[:n_nodes][is_leaf].reshape((leaf_ids.shape[0], -1))
+    if leaf_weights_are_counts:
+        # cumsum adds the weights in the same order as the builtin sum
+        # used by add_node, the normalized weights are then identical.
+        s = np.cumsum(weights, axis=1)[:, -1:]
+        factor = tree_weight / np.where(s != 0., s, 1.)
+    else:
+        factor = tree_weight
+    weights = weights * factor
+    if weights.shape[1] == 2 and is_classifier:
+        weights = weights[:, 1:]
+
+    n_weights = weights.shape[1]
+    prefix = 'class' if is_classifier else 'target'
+    attr_pairs[prefix + '_treeids'].extend(
+        [tree_id] * (leaf_ids.shape[0] * n_weights))
+    attr_pairs[prefix + '_nodeids'].extend(
+        np.repeat(leaf_ids, n_weights).tolist())
+    attr_pairs[prefix + '_ids'].extend(
+        np.tile(np.arange(n_weights) + weight_id_bias,
+                leaf_ids.shape[0]).tolist())
+    attr_pairs[prefix + '_weights'].extend(weights.ravel().tolist())
 
 
 def add_tree_to_attribute_pairs_hist_gradient_boosting(
@@ -218,3 +301,56 @@ def add_tree_to_attribute_pairs_hist_gradient_boosting(
                  weight, weight_id_bias, leaf_weights_are_counts,
                  adjust_threshold_for_sklearn=adjust_threshold_for_sklearn,
                  dtype=dtype, nodes_missing_value_tracks_true=missing)
+
+
+def _effective_n_jobs(n_jobs, n_tasks):
+    if n_jobs is None or n_tasks <= 1:
+        return 1
+    if n_jobs < 0:
+        n_jobs = max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return min(n_jobs, n_tasks)
+
+
+def map_trees(fct, args, n_jobs=None):
+    """
+    Returns ``[fct(*a) for a in args]``. The calls are distributed
+    over a pool of *n_jobs* threads if *n_jobs* is greater than 1,
+    a negative value means the number of cores plus one minus *n_jobs*
+    as in *scikit-learn*. The results are returned in the order of
+    *args* whatever the order the calls end.
+    """
+    args = list(args)
+    n_jobs = _effective_n_jobs(n_jobs, len(args))
+    if n_jobs == 1:
+        return [fct(*a) for a in args]
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(lambda a: fct(*a), args))
+
+
+def add_trees_to_attribute_pairs(attr_pairs, tree_calls, n_jobs=None):
+    """
+    Runs every call in *tree_calls*, a list of
+    ``(fct, args, kwargs)`` where *fct* is
+    :func:`add_tree_to_attribute_pairs` or
+    :func:`add_tree_to_attribute_pairs_hist_gradient_boosting`,
+    as ``fct(attr_pairs, *args, **kwargs)``.
+    If *n_jobs* is greater than 1, every tree fills its own lists
+    in a pool of threads and the lists are concatenated in the order
+    of *tree_calls*, *attr_pairs* is the same as in the serial case.
+    """
+    n_jobs = _effective_n_jobs(n_jobs, len(tree_calls))
+    if n_jobs == 1:
+        for fct, args, kwargs in tree_calls:
+            fct(attr_pairs, *args, **kwargs)
+        return
+
+    keys = [k for k, v in attr_pairs.items() if isinstance(v, list)]
+
+    def _call(fct, args, kwargs):
+        pairs = {k: [] for k in keys}
+        fct(pairs, *args, **kwargs)
+        return pairs
+
+    for pairs in map_trees(_call, tree_calls, n_jobs=n_jobs):
+        for k in keys:
+            attr_pairs[k].extend(pairs[k])
@@ -7,8 +7,10 @@
 from uuid import uuid4
 import numpy as np
 from .proto import get_latest_tested_opset_version
+from .common._cache import get_conversion_cache
+from .common._external_data import ExternalDataWriter
+from .common._profiling import ConversionProfile, measure
 from .common._topology import convert_topology
-from ._parse import parse_sklearn_model
 
 # Invoke the registration of all our converters and shape calculators.
 from . import shape_calculators # noqa
@@ -20,7 +22,10 @@ def convert_sklearn(model, name=None, initial_types=None, doc_string='',
                     custom_shape_calculators=None,
                     custom_parsers=None, options=None,
                     dtype=np.float32, intermediate=False,
-                    white_op=None, black_op=None, final_types=None):
+                    white_op=None, black_op=None, final_types=None,
+                    deduplicate_initializers=True, n_jobs=None,
+                    profile=False, cache=None, external_data_path=None,
+                    previous=None, optimize=False, keep_outputs=None):
     """
     This function produces an equivalent ONNX model of the given scikit-learn model.
     The supported converters is returned by function
@@ -52,7 +57,9 @@ def convert_sklearn(model, name=None, initial_types=None, doc_string='',
     :param dtype: float type to use everywhere in the graph,
         `np.float32` or `np.float64`
     :param intermediate: if True, the function returns the converted model and , and :class:`Topology`,
-        it returns the converted model otherwise
+        it returns the converted model otherwise, the topology records the nodes
+        every converter produced and can be given to a future conversion
+        (see parameter *previous*)
     :param white_op: white list of ONNX nodes allowed while converting a pipeline,
         if empty, all are allowed
     :param black_op: black list of ONNX nodes allowed while converting a pipeline,
@@ -60,6 +67,50 @@ def convert_sklearn(model, name=None, initial_types=None, doc_string='',
     :param final_types: a python list. Works the same way as initial_types
         but not mandatory, it is used to overwrites the type
         (if type is not None) and the name of every output.
+    :param deduplicate_initializers: if True, initializers with the same content
+        are stored once, it can be disabled to save time and memory when
+        the model has very large initializers which are unlikely to be
+        duplicated
+    :param n_jobs: number of threads used to extract the attributes of
+        independent estimators such as the trees of a random forest,
+        None or 1 means the conversion is sequential, -1 means all cores,
+        the converted model is the same whatever the value
+    :param profile: if True, the function also returns a
+        :class:`ConversionProfile <skl2onnx.common._profiling.ConversionProfile>`
+        which records the time spent in every step of the conversion and in every
+        converter, the profile is the last element of the returned tuple
+    :param cache: None, a folder or a :class:`ConversionCache
+        <skl2onnx.common._cache.ConversionCache>`, if not None, the converted model
+        is stored in the cache and the next conversion of the same fitted model with
+        the same parameters loads it from the cache, the cache is not used if
+        *intermediate* or *profile* is True or if *external_data_path* is defined
+    :param external_data_path: if not None, the values of every initializer
+        bigger than *EXTERNAL_DATA_MIN_SIZE* bytes are written into this file
+        as soon as a converter adds it, following ONNX external data format,
+        the returned model only holds references to this file and must be
+        saved in the same folder, it avoids the 2 Gb limit of protobuf and
+        keeps a single copy of the coefficients in memory
+    :param previous: None or the tuple *(onnx_model, topology)* returned by a previous
+        conversion with *intermediate=True*, typically the same pipeline before one of its
+        steps was fitted again, the converters are only called for the operators whose
+        fitted model, inputs, outputs or options changed, the nodes and initializers
+        of the other operators are copied from the previous model which must not be
+        modified, the cache is not used and *external_data_path* must be None
+    :param optimize: False, True or a list of optimization names (``'identity'``,
+        ``'constant'``, ``'reshape'``, ``'cast'``, ``'transpose'``, ``'gemm'``,
+        ``'cse'``, ``'dead'``), if not False, the graph is rewritten before the model is created
+        to remove the *Identity* nodes and the casts which do not change the type,
+        to replace the nodes whose inputs are all initializers by their results,
+        to fuse consecutive *Reshape*, *Cast* or *Transpose* nodes and a matrix
+        multiplication followed by an addition into *Gemm*, to merge the nodes
+        computing the same results and to remove the nodes whose results are not
+        used, the topology returned with *intermediate=True* cannot be given to
+        parameter *previous* in that case
+    :param keep_outputs: None to keep every output or a list of output names
+        (``['output_probability']`` for example), the other outputs are removed
+        from the graph with the converters and the nodes which only compute them,
+        the topology returned with *intermediate=True* cannot be given to
+        parameter *previous* in that case
     :return: An ONNX model (type: ModelProto) which is equivalent to the input scikit-learn model
 
     Example of *initial_types*:
@@ -133,32 +184,86 @@ def convert_sklearn(model, name=None, initial_types=None, doc_string='',
             raise ValueError('Initial types are required. See usage of '
                              'convert(...) in skl2onnx.convert for details')
 
+    target_opset = (target_opset
+                    if target_opset else get_latest_tested_opset_version())
+
+    if previous is not None and external_data_path is not None:
+        raise NotImplementedError(
+            "previous cannot be used with external_data_path.")
+
+    cache = get_conversion_cache(cache)
+    if (cache is not None and not intermediate and not profile and
+            external_data_path is None and previous is None):
+        cache_key = cache.make_key(
+            model, name=name, initial_types=initial_types,
+            doc_string=doc_string, target_opset=target_opset,
+            custom_conversion_functions=custom_conversion_functions,
+            custom_shape_calculators=custom_shape_calculators,
+            custom_parsers=custom_parsers, options=options, dtype=dtype,
+            white_op=white_op, black_op=black_op, final_types=final_types,
+            deduplicate_initializers=deduplicate_initializers,
+            optimize=optimize, keep_outputs=keep_outputs)
+        onnx_model = cache.load(cache_key)
+        if onnx_model is not None:
+            return onnx_model
+    else:
+        cache_key = None
+
     if name is None:
         name = str(uuid4().hex)
 
-    target_opset = (target_opset
-                    if target_opset else get_latest_tested_opset_version())
+    # The parser imports every supported scikit-learn model,
+    # it is only imported when a model is converted.
+    from ._parse import parse_sklearn_model
+    profile = ConversionProfile() if profile else None
+
     # Parse scikit-learn model as our internal data structure
     # (i.e., Topology)
-    topology = parse_sklearn_model(
-        model, initial_types, target_opset, custom_conversion_functions,
-        custom_shape_calculators, custom_parsers, options=options,
-        dtype=dtype, white_op=white_op, black_op=black_op,
-        final_types=final_types)
+    with measure(profile, 'parse_sklearn_model'):
+        topology = parse_sklearn_model(
+            model, initial_types, target_opset, custom_conversion_functions,
+            custom_shape_calculators, custom_parsers, options=options,
+            dtype=dtype, white_op=white_op, black_op=black_op,
+            final_types=final_types)
 
     # Infer variable shapes
-    topology.compile()
+    with measure(profile, 'compile'):
+        topology.compile(profile=profile)
 
     # Convert our Topology object into ONNX. The outcome is an ONNX model.
-    onnx_model = convert_topology(topology, name, doc_string, target_opset,
-                                  dtype=dtype, options=options)
-
-    return (onnx_model, topology) if intermediate else onnx_model
+    external_data = (None if external_data_path is None
+                     else ExternalDataWriter(external_data_path))
+    with measure(profile, 'convert_topology'):
+        if external_data is not None:
+            external_data.open()
+        try:
+            onnx_model = convert_topology(
+                topology, name, doc_string, target_opset, dtype=dtype,
+                options=options,
+                deduplicate_initializers=deduplicate_initializers,
+                n_jobs=n_jobs, profile=profile, external_data=external_data,
+                previous=previous,
+                record_blocks=(intermediate and not optimize and
+                               keep_outputs is None),
+                optimize=optimize, keep_outputs=keep_outputs)
+        finally:
+            if external_data is not None:
+                external_data.close()
+
+    if cache_key is not None:
+        cache.store(cache_key, onnx_model)
+
+    res = (onnx_model, topology) if intermediate else (onnx_model, )
+    if profile is not None:
+        res += (profile, )
+    return res if len(res) > 1 else onnx_model
 
 
 def to_onnx(model, X=None, name=None, initial_types=None,
             target_opset=None, options=None, dtype=np.float32,
-            white_op=None, black_op=None, final_types=None):
+            white_op=None, black_op=None, final_types=None,
+            deduplicate_initializers=True, n_jobs=None, cache=None,
+            external_data_path=None, optimize=False, keep_outputs=None):
     """
     Calls :func:`convert_sklearn` with simplified parameters.
 
@@ -180,6 +285,12 @@ def to_onnx(model, X=None, name=None, initial_types=None,
     :param final_types: a python list. Works the same way as initial_types
         but not mandatory, it is used to overwrites the type
         (if type is not None) and the name of every output.
+    :param deduplicate_initializers: see :func:`convert_sklearn`
+    :param n_jobs: see :func:`convert_sklearn`
+    :param cache: see :func:`convert_sklearn`
+    :param external_data_path: see :func:`convert_sklearn`
+    :param optimize: see :func:`convert_sklearn`
+    :param keep_outputs: see :func:`convert_sklearn`
     :return: converted model
 
     This function checks if the model inherits from class
@@ -193,6 +304,10 @@ def to_onnx(model, X=None, name=None, initial_types=None,
         if options is not None:
             raise NotImplementedError(
                 "options not yet implemented for OnnxOperatorMixin.")
+        if external_data_path is not None:
+            raise NotImplementedError(
+                "external_data_path not yet implemented for "
+                "OnnxOperatorMixin.")
         return model.to_onnx(X=X, name=name, dtype=dtype,
                              target_opset=target_opset)
     if name is None:
@@ -205,7 +320,11 @@ def to_onnx(model, X=None, name=None, initial_types=None,
                            target_opset=target_opset,
                            name=name, options=options, dtype=dtype,
                            white_op=white_op, black_op=black_op,
-                           final_types=final_types)
+                           final_types=final_types,
+                           deduplicate_initializers=deduplicate_initializers,
+                           n_jobs=n_jobs, cache=cache,
+                           external_data_path=external_data_path,
+                           optimize=optimize, keep_outputs=keep_outputs)
 
 
 def wrap_as_onnx_mixin(model, target_opset=None):
@@ -0,0 +1,167 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Loads the structure of an ONNX model without the values
+of its initializers. The file is memory-mapped and walked
+through at the protobuf wire format level, the values of big
+initializers are replaced by references to their location
+in the file following ONNX external data format.
+"""
+import mmap
+import os
+from onnx import ModelProto, TensorProto
+from ..common._external_data import set_external_location
+
+# Initializers with fewer bytes are parsed as usual.
+LAZY_MIN_SIZE = 1024
+
+# Field numbers in onnx.proto.
+_MODEL_GRAPH = 7
+_GRAPH_INITIALIZER = 5
+_TENSOR_DATA_TYPE = 2
+_TENSOR_FLOAT_DATA = 4
+_TENSOR_RAW_DATA = 9
+_TENSOR_DOUBLE_DATA = 10
+_TENSOR_DATA_LOCATION = 14
+
+# Data fields stored as little endian values when they are packed,
+# they can be mapped as they are, key: field, value: element type.
+_MAPPABLE_FIELDS = {
+    _TENSOR_RAW_DATA: None,
+    _TENSOR_FLOAT_DATA: TensorProto.FLOAT,
+    _TENSOR_DOUBLE_DATA: TensorProto.DOUBLE,
+}
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not (b & 0x80):
+            return result, pos
+        shift += 7
+
+
+def _write_varint(value):
+    res = bytearray()
+    while True:
+        b = value & 0x7f
+        value >>= 7
+        if value:
+            res.append(b | 0x80)
+        else:
+            res.append(b)
+            return bytes(res)
+
+
+def _enumerate_fields(buf, begin, end):
+    """
+    Enumerates the fields of a serialized message,
+    yields tuple *(field, wire_type, start, value_begin, value_end)*,
+    *start* is the position of the key.
+    """
+    pos = begin
+    while pos < end:
+        start = pos
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            _, next_pos = _read_varint(buf, pos)
+        elif wire_type == 1:
+            next_pos = pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            next_pos = pos + length
+        elif wire_type == 5:
+            next_pos = pos + 4
+        else:
+            raise RuntimeError(
+                "Unexpected wire type {} at position {}.".format(
+                    wire_type, start))
+        yield field, wire_type, start, pos, next_pos
+        pos = next_pos
+
+
+def _length_delimited(field, content):
+    return _write_varint((field << 3) | 2) + _write_varint(len(content)) + \
+        content
+
+
+def _lazy_tensor(buf, begin, end, location):
+    """
+    Returns the serialized tensor where the values are
+    replaced by a reference to the file if they can be mapped.
+    """
+    header = []
+    data = None
+    data_type = None
+    for field, wire_type, start, vbegin, vend in _enumerate_fields(
+            buf, begin, end):
+        if field == _TENSOR_DATA_LOCATION:
+            # already stored in an external file
+            return bytes(buf[begin:end])
+        if field == _TENSOR_DATA_TYPE:
+            data_type, _ = _read_varint(buf, vbegin)
+        if field in _MAPPABLE_FIELDS and wire_type == 2:
+            if data is not None:
+                # values split into several chunks
+                return bytes(buf[begin:end])
+            data = field, vbegin, vend
+        else:
+            header.append(bytes(buf[start:vend]))
+    if data is None or data[2] - data[1] < LAZY_MIN_SIZE:
+        return bytes(buf[begin:end])
+    expected = _MAPPABLE_FIELDS[data[0]]
+    if expected is not None and expected != data_type:
+        return bytes(buf[begin:end])
+    tensor = TensorProto()
+    tensor.ParseFromString(b''.join(header))
+    set_external_location(tensor, location, data[1], data[2] - data[1])
+    return tensor.SerializeToString()
+
+
+def _lazy_graph(buf, begin, end, location):
+    parts = []
+    for field, wire_type, start, vbegin, vend in _enumerate_fields(
+            buf, begin, end):
+        if field == _GRAPH_INITIALIZER and wire_type == 2:
+            parts.append(_length_delimited(
+                field, _lazy_tensor(buf, vbegin, vend, location)))
+        else:
+            parts.append(bytes(buf[start:vend]))
+    return b''.join(parts)
+
+
+def load_lazy_model(filename):
+    """
+    Loads a model without the values of its big initializers,
+    they are replaced by references to their location in the file
+    (location is the name of the file, the model must stay
+    in the same folder), initializers already stored in external
+    files keep their references.
+
+    :param filename: model filename
+    :return: *ModelProto*
+    """
+    location = os.path.basename(filename)
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ModelProto()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            parts = []
+            for field, wire_type, start, vbegin, vend in _enumerate_fields(
+                    buf, 0, len(buf)):
+                if field == _MODEL_GRAPH and wire_type == 2:
+                    parts.append(_length_delimited(
+                        field, _lazy_graph(buf, vbegin, vend, location)))
+                else:
+                    parts.append(bytes(buf[start:vend]))
+    model = ModelProto()
+    model.ParseFromString(b''.join(parts))
+    return model
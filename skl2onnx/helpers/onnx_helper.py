@@ -4,9 +4,13 @@
 # license information.
 # --------------------------------------------------------------------------
 
+from collections import OrderedDict
 from io import BytesIO
+import os
+import numpy as np
 import onnx # noqa
 from onnx import shape_inference
+from onnx.numpy_helper import to_array
 from ..proto.onnx_helper_modified import (
     make_node, make_tensor_value_info, make_graph,
     make_model, ValueInfoProto
@@ -14,25 +18,63 @@ from ..proto.onnx_helper_modified import (
 from ..proto import get_latest_tested_opset_version
 from onnx import onnx_pb as onnx_proto
 from ..common._topology import Variable
+from ..common.data_types import _TENSOR_TYPE_TO_NP_TYPE
+from ._onnx_lazy import load_lazy_model
 
 
-def load_onnx_model(onnx_file_or_bytes):
+def load_onnx_model(onnx_file_or_bytes, lazy=False):
     """
     Loads an *ONNX* file.
 
     :param onnx_file_or_bytes: *ONNX* file or bytes
+    :param lazy: only for a filename, if True, the file is
+        memory-mapped and only the structure of the model is parsed,
+        the values of big initializers (and of initializers stored
+        in external files) are not loaded, these initializers refer
+        to their location in the files following ONNX external
+        data format, see :func:`get_initializer_array`
     :return: *ONNX* model
     """
     if isinstance(onnx_file_or_bytes, str):
+        if lazy:
+            return load_lazy_model(onnx_file_or_bytes)
         with open(onnx_file_or_bytes, "rb") as f:
             return onnx.load(f)
-    elif hasattr(onnx_file_or_bytes, 'read'):
+    if lazy:
+        raise TypeError("lazy=True only works with a filename.")
+    if hasattr(onnx_file_or_bytes, 'read'):
         return onnx.load(onnx_file_or_bytes)
     else:
         b = BytesIO(onnx_file_or_bytes)
         return onnx.load(b)
 
 
+def get_initializer_array(tensor, folder=None):
+    """
+    Returns the values of an initializer as a numpy array.
+    If the values are stored in an external file, the file is
+    memory-mapped and the function returns a read-only view on it.
+
+    :param tensor: *TensorProto*
+    :param folder: folder the locations of external data
+        are relative to, usually the folder of the model
+    :return: numpy array
+    """
+    if tensor.data_location != onnx_proto.TensorProto.EXTERNAL:
+        return to_array(tensor)
+    info = {e.key: e.value for e in tensor.external_data}
+    path = info['location']
+    if folder is not None:
+        path = os.path.join(folder, path)
+    dtype = np.dtype(
+        _TENSOR_TYPE_TO_NP_TYPE[tensor.data_type]).newbyteorder('<')
+    shape = tuple(tensor.dims)
+    if int(info.get('length', 1)) == 0 or 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r',
+                     offset=int(info.get('offset', 0)), shape=shape)
+
+
 def save_onnx_model(model, filename=None):
     """
     Saves a model as a file or bytes.
@@ -172,11 +214,16 @@ def select_model_inputs_outputs(model, outputs=None, inputs=None):
     return onnx_model
 
 
-def infer_outputs(op_type, inputs, outputs=None, initializer=None,
-                  target_opset=None, **atts):
-    """
-    Infers outputs type and shapes given an ONNX operator.
-    """
+# Results of shape inference, key: nodes, input types and opsets
+# of the temporary model built by infer_outputs,
+# value: list of ValueInfoProto.
+_infer_outputs_cache = OrderedDict()
+
+# Maximum number of results kept in _infer_outputs_cache.
+INFER_OUTPUTS_CACHE_SIZE = 1024
+
+
+def _make_infer_nodes(op_type, inputs, outputs=None, **atts):
     if isinstance(op_type, str):
         required_outputs = []
         if outputs:
@@ -187,28 +234,27 @@ def infer_outputs(op_type, inputs, outputs=None, initializer=None,
                     required_outputs.append(o)
                 else:
                     raise TypeError("Unable to require output {}.".format(o))
+        atts.setdefault('_dtype', np.float32)
         node = make_node(op_type, [i.onnx_name for i in inputs],
                          required_outputs, **atts)
-        node = [node]
-    elif hasattr(op_type, 'nodes'):
-        node = op_type.nodes
-    else:
-        raise RuntimeError("Unable to build ONNX nodes from type {}.".format(
-            type(op_type)))
+        return [node]
+    if hasattr(op_type, 'nodes'):
+        return op_type.nodes
+    raise RuntimeError("Unable to build ONNX nodes from type {}.".format(
+        type(op_type)))
+
 
+def _make_infer_inputs(inputs, initializer=None):
     input_init = inputs.copy()
     if initializer:
         input_init.extend(initializer)
     onnx_inputs = []
     for input in input_init:
         if isinstance(input, Variable):
-            onnx_type = input.type.to_onnx_type()
-            tensor_type = onnx_type.tensor_type
-            shape = [tensor_type.shape.dim[i].dim_value
-                     for i in range(len(tensor_type.shape.dim))]
-            inp = make_tensor_value_info(input.onnx_name,
-                                         tensor_type.elem_type,
-                                         tuple(shape))
+            # unknown and symbolic dimensions are kept
+            inp = ValueInfoProto()
+            inp.name = input.onnx_name
+            inp.type.CopyFrom(input.type.to_onnx_type())
             onnx_inputs.append(inp)
         elif isinstance(input, onnx.TensorProto):
             v = make_tensor_value_info(
@@ -224,33 +270,73 @@ def infer_outputs(op_type, inputs, outputs=None, initializer=None,
             onnx_inputs.append(value_info)
         else:
             onnx_inputs.append(input)
+    return onnx_inputs
 
-    graph = make_graph(node, 'infer_shapes',
-                       onnx_inputs, [])
-    original_model = make_model(graph, producer_name='skl2onnx')
+
+def _make_infer_opsets(nodes, target_opset=None):
     domains = {}
-    for n in node:
+    for n in nodes:
         domains[n.domain] = max(domains.get(n.domain, 1),
                                 getattr(n, 'op_version', 1))
-    for i, (k, v) in enumerate(domains.items()):
-        if i == 0 and len(original_model.opset_import) == 1:
-            op_set = original_model.opset_import[0]
-        else:
-            op_set = original_model.opset_import.add()
-        op_set.domain = k
+    opsets = []
+    for k in domains:
         if target_opset:
             if isinstance(target_opset, dict):
-                op_set.version = target_opset.get(
+                version = target_opset.get(
                     k, get_latest_tested_opset_version())
             else:
-                op_set.version = target_opset
+                version = target_opset
+        else:
+            version = get_latest_tested_opset_version()
+        opsets.append((k, version))
+    return opsets
+
+
+def _make_infer_model(nodes, onnx_inputs, opsets):
+    """
+    Builds the temporary model given to the shape inference
+    by :func:`infer_outputs`.
+    """
+    graph = make_graph(nodes, 'infer_shapes', onnx_inputs, [])
+    original_model = make_model(graph, producer_name='skl2onnx')
+    for i, (k, v) in enumerate(opsets):
+        if i == 0 and len(original_model.opset_import) == 1:
+            op_set = original_model.opset_import[0]
         else:
-            op_set.version = get_latest_tested_opset_version()
-
-    inferred_model = shape_inference.infer_shapes(original_model)
-    shapes = Variable.from_pb(inferred_model.graph.value_info)
-    if len(shapes) == 0:
-        raise RuntimeError("Shape inference fails.\n"
-                           "*Inputs*\n{}\n*Model*\n{}'".format(
-                            onnx_inputs, original_model))
-    return shapes
+            op_set = original_model.opset_import.add()
+        op_set.domain = k
+        op_set.version = v
+    return original_model
+
+
+def infer_outputs(op_type, inputs, outputs=None, initializer=None,
+                  target_opset=None, **atts):
+    """
+    Infers outputs type and shapes given an ONNX operator.
+    The results are cached: the shape inference only runs once for
+    the same nodes, the same input types (including symbolic
+    dimensions) and the same opsets,
+    see *INFER_OUTPUTS_CACHE_SIZE*.
+    """
+    nodes = _make_infer_nodes(op_type, inputs, outputs=outputs, **atts)
+    onnx_inputs = _make_infer_inputs(inputs, initializer=initializer)
+    opsets = _make_infer_opsets(nodes, target_opset=target_opset)
+    # initializers only contribute their type and dimensions
+    key = (tuple(n.SerializeToString() for n in nodes),
+           tuple(i.SerializeToString() for i in onnx_inputs),
+           tuple(opsets))
+    value_info = _infer_outputs_cache.get(key, None)
+    if value_info is None:
+        original_model = _make_infer_model(nodes, onnx_inputs, opsets)
+        inferred_model = shape_inference.infer_shapes(original_model)
+        value_info = list(inferred_model.graph.value_info)
+        if len(value_info) == 0:
+            raise RuntimeError("Shape inference fails.\n"
+                               "*Inputs*\n{}\n*Model*\n{}'".format(
+                                original_model.graph.input, original_model))
+        _infer_outputs_cache[key] = value_info
+        while len(_infer_outputs_cache) > INFER_OUTPUTS_CACHE_SIZE:
+            _infer_outputs_cache.popitem(last=False)
+    else:
+        _infer_outputs_cache.move_to_end(key)
+    return Variable.from_pb(value_info)
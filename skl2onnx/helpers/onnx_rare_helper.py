@@ -4,82 +4,340 @@
 # license information.
 # --------------------------------------------------------------------------
 
-import onnx
-from ..proto.onnx_helper_modified import (
-    make_graph, make_model
-)
-from onnx.defs import get_all_schemas_with_history
-
-
-def _build_op_version():
-    res = {}
-    for schema in get_all_schemas_with_history():
-        dom = schema.domain
-        name = schema.name
-        vers = schema.since_version
-        if (dom, name) not in res:
-            res[dom, name] = set()
-        res[dom, name].add(vers)
-    op_versions = {}
-    for k, v in res.items():
-        op_versions[k] = list(sorted(v))
-    return op_versions
-
-
-def _check_possible_opset(versions, nodes, domain, old_opset, new_opset):
-    if old_opset >= new_opset:
-        raise RuntimeError("Condition new_opset > old_opset is not true.")
-    for node in nodes:
-        name = node.op_type
-        vers = versions.get((domain, name), None)
+import numpy as np
+from onnx import AttributeProto, ModelProto
+from onnx.helper import make_attribute
+from onnx.numpy_helper import from_array, to_array
+from ..common._opset_index import get_opset_index
+
+
+# Rewrites of operators whose specifications changed between
+# two versions, key: (domain, op_type, version), value: (upgrade,
+# downgrade), see register_opset_rewrite.
+_opset_rewrites = {}
+
+
+def register_opset_rewrite(op_type, version, upgrade=None, downgrade=None,
+                           domain=''):
+    """
+    Registers the functions rewriting a node when its operator
+    changed in opset *version*. Function *upgrade* converts a node
+    following the specifications before *version* into a node
+    following the specifications introduced in *version*,
+    function *downgrade* does the opposite. Both have the signature
+    ``fn(node, graph, context)``: the node belongs to a copy
+    of the model and is modified inplace, *graph* is the graph
+    holding the node, *context* gives access to the initializers and
+    creates new ones (see :class:`_RewriteContext`). A function
+    raises a *RuntimeError* if the node cannot be rewritten.
+    None means the rewrite is not possible.
+
+    :param op_type: operator type
+    :param version: opset in which the operator changed
+    :param upgrade: function or None
+    :param downgrade: function or None
+    :param domain: domain
+    """
+    _opset_rewrites[domain, op_type, version] = (upgrade, downgrade)
+
+
+class _RewriteContext:
+    """
+    Gives the rewrite functions access to the initializers
+    of the model and creates new ones with unique names.
+    Initializers created with the same values in the same graph
+    are shared.
+
+    :param graphs: main graph and its subgraphs
+    """
+
+    def __init__(self, graphs):
+        self.graphs = graphs
+        self.names = None
+        self._initializers = {}
+        self._created = {}
+
+    def unique_name(self, prefix):
+        if self.names is None:
+            self.names = set()
+            for graph in self.graphs:
+                self.names.update(init.name for init in graph.initializer)
+                for node in graph.node:
+                    self.names.update(node.output)
+                    self.names.add(node.name)
+        name = prefix
+        i = 0
+        while name in self.names:
+            i += 1
+            name = "%s_%d" % (prefix, i)
+        self.names.add(name)
+        return name
+
+    def add_initializer(self, graph, value, prefix):
+        """
+        Adds a numpy array as an initializer of *graph*,
+        returns its name.
+        """
+        key = id(graph), value.dtype, value.shape, value.tobytes()
+        name = self._created.get(key, None)
+        if name is None:
+            name = self.unique_name(prefix)
+            graph.initializer.append(from_array(value, name=name))
+            self._created[key] = name
+        return name
+
+    def get_initializer(self, graph, name):
+        """
+        Returns the value of an initializer of *graph*
+        or of the main graph as a numpy array, None if not found.
+        """
+        for g in [graph, self.graphs[0]]:
+            key = id(g)
+            if key not in self._initializers:
+                self._initializers[key] = {
+                    init.name: init for init in g.initializer}
+            init = self._initializers[key].get(name, None)
+            if init is not None:
+                return to_array(init)
+        return None
+
+
+def _edit_node(node, inputs=None, drop=None, attributes=None):
+    if inputs is not None:
+        del node.input[:]
+        node.input.extend(inputs)
+    if drop:
+        for i in range(len(node.attribute) - 1, -1, -1):
+            if node.attribute[i].name in drop:
+                del node.attribute[i]
+    if attributes:
+        node.attribute.extend(
+            make_attribute(k, v) for k, v in sorted(attributes.items()))
+
+
+def _get_attribute(node, name, default=None):
+    for att in node.attribute:
+        if att.name == name:
+            if att.type == AttributeProto.INT:
+                return att.i
+            if att.type == AttributeProto.INTS:
+                return list(att.ints)
+            raise RuntimeError(
+                "Unexpected type for attribute '{}' in node '{}'.".format(
+                    name, node.name))
+    return default
+
+
+def _get_constant_input(node, index, graph, context):
+    value = context.get_initializer(graph, node.input[index])
+    if value is None:
+        raise RuntimeError(
+            "Input '{}' of node '{}' ({}) must be an initializer to be "
+            "converted into an attribute.".format(
+                node.input[index], node.name, node.op_type))
+    return value
+
+
+def _upgrade_attribute_to_input(att_name, scalar=False):
+    # The attribute becomes the second input.
+    def upgrade(node, graph, context):
+        value = _get_attribute(node, att_name)
+        if value is None:
+            return
+        init = context.add_initializer(
+            graph, np.array([value] if scalar else value, dtype=np.int64),
+            (node.name or node.op_type) + '_' + att_name)
+        _edit_node(node, inputs=[node.input[0], init], drop=[att_name])
+    return upgrade
+
+
+def _downgrade_input_to_attribute(att_name, scalar=False):
+    # The second input becomes an attribute.
+    def downgrade(node, graph, context):
+        if len(node.input) < 2 or not node.input[1]:
+            if _get_attribute(node, 'noop_with_empty_axes', 0):
+                raise RuntimeError(
+                    "Node '{}' ({}) uses noop_with_empty_axes."
+                    "".format(node.name, node.op_type))
+            _edit_node(node, drop=['noop_with_empty_axes'])
+            return
+        value = _get_constant_input(node, 1, graph, context)
+        value = value.ravel().tolist()
+        if scalar:
+            value = value[0]
+        _edit_node(node, inputs=node.input[:1],
+                   drop=['noop_with_empty_axes'],
+                   attributes={att_name: value})
+    return downgrade
+
+
+def _unchanged(node, graph, context):
+    pass
+
+
+def _downgrade_positive_axis(*att_names):
+    # Versions 11 accept negative axes.
+    def downgrade(node, graph, context):
+        for name in att_names:
+            value = _get_attribute(node, name)
+            if value is None or (isinstance(value, list) and not value):
+                continue
+            if min(value if isinstance(value, list) else [value]) < 0:
+                raise RuntimeError(
+                    "Node '{}' ({}) uses a negative axis.".format(
+                        node.name, node.op_type))
+    return downgrade
+
+
+def _downgrade_default_attributes(**defaults):
+    # New attributes can be removed if they hold their default value.
+    def downgrade(node, graph, context):
+        for name, value in defaults.items():
+            if _get_attribute(node, name, value) != value:
+                raise RuntimeError(
+                    "Node '{}' ({}) uses {}={}.".format(
+                        node.name, node.op_type, name,
+                        _get_attribute(node, name)))
+        _edit_node(node, drop=list(defaults))
+    return downgrade
+
+
+for _op in ['ReduceSum', 'ReduceMean', 'ReduceMax', 'ReduceMin',
+            'ReduceProd', 'ReduceSumSquare', 'ReduceL1', 'ReduceL2',
+            'ReduceLogSum', 'ReduceLogSumExp', 'ArgMax', 'ArgMin',
+            'Flatten', 'Softmax', 'LogSoftmax', 'Hardmax', 'Squeeze',
+            'Unsqueeze']:
+    register_opset_rewrite(
+        _op, 11, _unchanged, _downgrade_positive_axis('axis', 'axes'))
+register_opset_rewrite(
+    'Scan', 11, _unchanged,
+    _downgrade_positive_axis('scan_input_axes', 'scan_output_axes'))
+for _op in ['ArgMax', 'ArgMin']:
+    register_opset_rewrite(
+        _op, 12, _unchanged,
+        _downgrade_default_attributes(select_last_index=0))
+for _op in ['ReduceSum', 'Squeeze', 'Unsqueeze']:
+    register_opset_rewrite(
+        _op, 13, _upgrade_attribute_to_input('axes'),
+        _downgrade_input_to_attribute('axes'))
+register_opset_rewrite(
+    'TopK', 10, _upgrade_attribute_to_input('k', scalar=True),
+    _downgrade_input_to_attribute('k', scalar=True))
+register_opset_rewrite(
+    'TopK', 11, _unchanged,
+    _downgrade_default_attributes(largest=1, sorted=1))
+
+
+def _group_nodes(graph, groups, graphs):
+    """
+    Groups the nodes of a graph and its subgraphs by
+    *(domain, op_type)* in a dictionary
+    ``{ (domain, op_type): [(graph, position)] }``,
+    the graphs are appended to list *graphs*.
+    """
+    graphs.append(graph)
+    for i, node in enumerate(graph.node):
+        key = node.domain, node.op_type
+        if key in groups:
+            groups[key].append((graph, i))
+        else:
+            groups[key] = [(graph, i)]
+        for att in node.attribute:
+            if att.type == AttributeProto.GRAPH:
+                _group_nodes(att.g, groups, graphs)
+            elif att.type == AttributeProto.GRAPHS:
+                for sub in att.graphs:
+                    _group_nodes(sub, groups, graphs)
+
+
+def _check_possible_opset(index, op_types, domain, old_opset, new_opset):
+    """
+    Checks every operator type once and returns the rewrites to apply,
+    a dictionary ``{ op_type: [function] }``. It raises an exception
+    if an operator changed between *old_opset* and *new_opset*
+    and no rewrite was registered for this change.
+    """
+    rewrites = {}
+    if old_opset == new_opset:
+        return rewrites
+    upgrade = new_opset > old_opset
+    low, high = min(old_opset, new_opset), max(old_opset, new_opset)
+    for name in op_types:
+        vers = index.get_versions(domain, name)
         if vers is None:
             # custom operator
             continue
-        for v in vers:
-            if v > old_opset and v <= new_opset:
+        if not upgrade and index.resolve(domain, name, new_opset) is None:
+            raise RuntimeError(
+                "Operator '{}' (domain: '{}') does not exist in opset {}."
+                "".format(name, domain, new_opset))
+        changes = [v for v in vers if low < v <= high]
+        if index.resolve(domain, name, old_opset) is None:
+            # the operator did not exist before old_opset
+            changes = changes[1:]
+        if not upgrade:
+            changes = changes[::-1]
+        funcs = []
+        for v in changes:
+            rw = _opset_rewrites.get((domain, name, v), None)
+            fct = None if rw is None else rw[0 if upgrade else 1]
+            if fct is None:
                 raise RuntimeError(
                     "Operator '{}' (domain: '{}') was updated "
                     "in opset {} in ]{}, {}]."
-                    "".format(name, domain, v, old_opset, new_opset))
+                    "".format(name, domain, v, low, high))
+            if fct is not _unchanged:
+                funcs.append(fct)
+        if funcs:
+            rewrites[name] = funcs
+    return rewrites
 
 
 def upgrade_opset_number(model, new_opsets):
     """
-    Upgrades the domain opsets. It checks if that's
-    possible. It means ONNX specifications do not
-    propose a new version of every operator between
-    the current opset and the new one.
+    Changes the domain opsets of a model. It checks if that's
+    possible: ONNX specifications must not propose a new version
+    of any operator used by the model between the current opset
+    and the new one, unless a rewrite was registered for this change
+    (see :func:`register_opset_rewrite`). Nodes are grouped by
+    *(domain, op_type)*, every operator type is checked once.
+    Rewrites are registered for the operators which added
+    negative axes in opset 11 (*ReduceSum*, *Scan*, ...),
+    *ArgMax*, *ArgMin* (opset 12), *TopK* (opsets 10, 11)
+    and *ReduceSum*, *Squeeze*, *Unsqueeze* (opset 13).
+    The new opset may be lower than the current one.
 
     :param model: *ONNX* model
-    :param new_opdets: integer or dictionary
+    :param new_opsets: integer or dictionary
         ``{ domain: opset }``
     :return: modified model
     """
     if isinstance(new_opsets, int):
         new_opsets = {'': new_opsets}
-    graph = make_graph(model.graph.node, model.graph.name, model.graph.input,
-                       model.graph.input, model.graph.initializer)
-    onnx_model = make_model(graph)
-    onnx_model.ir_version = model.ir_version
-    onnx_model.producer_name = model.producer_name
-    onnx_model.producer_version = model.producer_version
-    onnx_model.domain = model.domain
-    onnx_model.model_version = model.model_version
-    onnx_model.doc_string = model.doc_string
-    if len(model.metadata_props) > 0:
-        values = {p.key: p.value for p in model.metadata_props}
-        onnx.helper.set_model_props(onnx_model, values)
-
-    # fix opset import
-    versions = _build_op_version()
-    for oimp in model.opset_import:
-        op_set = onnx_model.opset_import.add()
-        op_set.domain = oimp.domain
-        if oimp.domain in new_opsets:
-            _check_possible_opset(versions, model.graph.node,
-                                  oimp.domain, oimp.version,
-                                  new_opsets[oimp.domain])
-            op_set.version = new_opsets[oimp.domain]
-        else:
-            op_set.version = oimp.version
+    onnx_model = ModelProto()
+    onnx_model.CopyFrom(model)
+
+    index = get_opset_index()
+    groups = {}
+    graphs = []
+    _group_nodes(onnx_model.graph, groups, graphs)
+    rewrites = {}
+    for oimp in onnx_model.opset_import:
+        if oimp.domain not in new_opsets:
+            continue
+        op_types = [op for dom, op in groups if dom == oimp.domain]
+        found = _check_possible_opset(
+            index, op_types, oimp.domain, oimp.version,
+            new_opsets[oimp.domain])
+        for op, funcs in found.items():
+            rewrites[oimp.domain, op] = funcs
+        oimp.version = new_opsets[oimp.domain]
+
+    if rewrites:
+        context = _RewriteContext(graphs)
+        for key, funcs in rewrites.items():
+            for graph, i in groups[key]:
+                node = graph.node[i]
+                for fct in funcs:
+                    fct(node, graph, context)
     return onnx_model
@@ -5,107 +5,121 @@
 # --------------------------------------------------------------------------
 
 # To register a converter for scikit-learn operators,
-# import associated modules here.
-from . import ada_boost
-from . import array_feature_extractor
-from . import bagging
-from . import binariser
-from . import calibrated_classifier_cv
-from . import cast_op
-from . import concat_op
-from . import cross_decomposition
-from . import decision_tree
-from . import decomposition
-from . import dict_vectoriser
-from . import feature_selection
-from . import flatten_op
-from . import function_transformer
-from . import gaussian_process
-from . import gaussian_mixture
-from . import gradient_boosting
-from . import grid_search_cv
-from . import id_op
-from . import imputer_op
-from . import isolation_forest
-from . import k_bins_discretiser
-from . import k_means
-from . import label_binariser
-from . import label_encoder
-from . import linear_classifier
-from . import linear_regressor
-from . import multilayer_perceptron
-from . import multiply_op
-from . import naive_bayes
-from . import nearest_neighbours
-from . import normaliser
-from . import one_hot_encoder
-from . import one_vs_rest_classifier
-from . import ordinal_encoder
-from . import polynomial_features
-from . import power_transformer
-from . import random_forest
-from . import random_projection
-from . import ransac_regressor
-from . import scaler_op
-from . import sgd_classifier
-from . import stacking
-from . import support_vector_machines
-from . import text_vectoriser
-from . import tfidf_transformer
-from . import tfidf_vectoriser
-from . import voting_classifier
-from . import voting_regressor
-from . import zip_map
+# add the associated module and the aliases it registers here.
+# The module is imported the first time one of them is requested.
+from ..common._registration import _converter_pool
 
-__all__ = [
-    ada_boost,
-    array_feature_extractor,
-    bagging,
-    binariser,
-    calibrated_classifier_cv,
-    cast_op,
-    concat_op,
-    cross_decomposition,
-    decision_tree,
-    decomposition,
-    dict_vectoriser,
-    feature_selection,
-    flatten_op,
-    function_transformer,
-    gaussian_process,
-    gaussian_mixture,
-    gradient_boosting,
-    grid_search_cv,
-    id_op,
-    imputer_op,
-    isolation_forest,
-    k_bins_discretiser,
-    k_means,
-    label_binariser,
-    label_encoder,
-    linear_classifier,
-    linear_regressor,
-    multilayer_perceptron,
-    multiply_op,
-    naive_bayes,
-    nearest_neighbours,
-    normaliser,
-    one_hot_encoder,
-    one_vs_rest_classifier,
-    ordinal_encoder,
-    polynomial_features,
-    power_transformer,
-    random_forest,
-    random_projection,
-    ransac_regressor,
-    scaler_op,
-    sgd_classifier,
-    stacking,
-    support_vector_machines,
-    text_vectoriser,
-    tfidf_transformer,
-    tfidf_vectoriser,
-    voting_classifier,
-    voting_regressor,
-    zip_map,
-]
+_modules = {
+    'ada_boost': ['SklearnAdaBoostClassifier', 'SklearnAdaBoostRegressor'],
+    'array_feature_extractor': ['SklearnArrayFeatureExtractor'],
+    'bagging': ['SklearnBaggingClassifier', 'SklearnBaggingRegressor'],
+    'binariser': ['SklearnBinarizer'],
+    'calibrated_classifier_cv': ['SklearnCalibratedClassifierCV'],
+    'cast_op': ['SklearnCastTransformer', 'SklearnCast'],
+    'concat_op': ['SklearnConcat'],
+    'cross_decomposition': ['SklearnPLSRegression'],
+    'decision_tree': [
+        'SklearnDecisionTreeClassifier',
+        'SklearnDecisionTreeRegressor',
+        'SklearnExtraTreeClassifier',
+        'SklearnExtraTreeRegressor',
+    ],
+    'decomposition': [
+        'SklearnIncrementalPCA',
+        'SklearnPCA',
+        'SklearnTruncatedSVD',
+    ],
+    'dict_vectoriser': ['SklearnDictVectorizer'],
+    'feature_selection': [
+        'SklearnGenericUnivariateSelect',
+        'SklearnRFE',
+        'SklearnRFECV',
+        'SklearnSelectFdr',
+        'SklearnSelectFpr',
+        'SklearnSelectFromModel',
+        'SklearnSelectFwe',
+        'SklearnSelectKBest',
+        'SklearnSelectPercentile',
+        'SklearnVarianceThreshold',
+    ],
+    'flatten_op': ['SklearnFlatten'],
+    'function_transformer': ['SklearnFunctionTransformer'],
+    'gaussian_mixture': [
+        'SklearnGaussianMixture',
+        'SklearnBayesianGaussianMixture',
+    ],
+    'gaussian_process': ['SklearnGaussianProcessRegressor'],
+    'gradient_boosting': [
+        'SklearnGradientBoostingClassifier',
+        'SklearnGradientBoostingRegressor',
+    ],
+    'grid_search_cv': ['SklearnGridSearchCV'],
+    'id_op': ['SklearnIdentity'],
+    'imputer_op': ['SklearnImputer', 'SklearnSimpleImputer'],
+    'isolation_forest': ['SklearnIsolationForest'],
+    'k_bins_discretiser': ['SklearnKBinsDiscretizer'],
+    'k_means': ['SklearnKMeans', 'SklearnMiniBatchKMeans'],
+    'label_binariser': ['SklearnLabelBinarizer'],
+    'label_encoder': ['SklearnLabelEncoder'],
+    'linear_classifier': ['SklearnLinearClassifier', 'SklearnLinearSVC'],
+    'linear_regressor': ['SklearnLinearRegressor', 'SklearnLinearSVR'],
+    'multilayer_perceptron': ['SklearnMLPClassifier', 'SklearnMLPRegressor'],
+    'multiply_op': ['SklearnMultiply'],
+    'naive_bayes': [
+        'SklearnBernoulliNB',
+        'SklearnCategoricalNB',
+        'SklearnComplementNB',
+        'SklearnGaussianNB',
+        'SklearnMultinomialNB',
+    ],
+    'nearest_neighbours': [
+        'SklearnKNeighborsClassifier',
+        'SklearnRadiusNeighborsClassifier',
+        'SklearnKNeighborsRegressor',
+        'SklearnRadiusNeighborsRegressor',
+        'SklearnKNeighborsTransformer',
+        'SklearnNearestNeighbors',
+        'SklearnKNNImputer',
+        'SklearnNeighborhoodComponentsAnalysis',
+    ],
+    'normaliser': ['SklearnNormalizer'],
+    'one_hot_encoder': ['SklearnOneHotEncoder'],
+    'one_vs_rest_classifier': ['SklearnOneVsRestClassifier'],
+    'ordinal_encoder': ['SklearnOrdinalEncoder'],
+    'polynomial_features': ['SklearnPolynomialFeatures'],
+    'power_transformer': ['SklearnPowerTransformer'],
+    'random_forest': [
+        'SklearnRandomForestClassifier',
+        'SklearnRandomForestRegressor',
+        'SklearnExtraTreesClassifier',
+        'SklearnExtraTreesRegressor',
+        'SklearnHistGradientBoostingClassifier',
+        'SklearnHistGradientBoostingRegressor',
+    ],
+    'random_projection': ['SklearnGaussianRandomProjection'],
+    'ransac_regressor': ['SklearnRANSACRegressor'],
+    'scaler_op': [
+        'SklearnRobustScaler',
+        'SklearnScaler',
+        'SklearnMinMaxScaler',
+        'SklearnMaxAbsScaler',
+    ],
+    'sgd_classifier': ['SklearnSGDClassifier'],
+    'stacking': ['SklearnStackingClassifier', 'SklearnStackingRegressor'],
+    'support_vector_machines': [
+        'SklearnOneClassSVM',
+        'SklearnSVC',
+        'SklearnSVR',
+    ],
+    'text_vectoriser': ['SklearnCountVectorizer'],
+    'tfidf_transformer': ['SklearnTfidfTransformer'],
+    'tfidf_vectoriser': ['SklearnTfidfVectorizer'],
+    'voting_classifier': ['SklearnVotingClassifier'],
+    'voting_regressor': ['SklearnVotingRegressor'],
+    'zip_map': ['SklearnZipMap'],
+}
+
+for _name, _aliases in _modules.items():
+    _converter_pool.declare(__name__ + '.' + _name, _aliases)
+
+__all__ = list(sorted(_modules))
@@ -32,47 +32,30 @@ def populate_tree_attributes(model, name):
     attrs = {}
     attrs['name'] = name
     attrs['post_transform'] = 'NONE'
-    attrs['nodes_treeids'] = []
-    attrs['nodes_nodeids'] = []
-    attrs['nodes_featureids'] = []
-    attrs['nodes_modes'] = []
-    attrs['nodes_values'] = []
-    attrs['nodes_truenodeids'] = []
-    attrs['nodes_falsenodeids'] = []
-    attrs['nodes_missing_value_tracks_true'] = []
-    attrs['nodes_hitrates'] = []
-    attrs['class_treeids'] = []
-    attrs['class_nodeids'] = []
-    attrs['class_ids'] = []
-    attrs['class_weights'] = []
-    attrs['classlabels_int64s'] = list(range(model.tree_.node_count))
-
-    for i in range(model.tree_.node_count):
-        node_id = i
-        if (model.tree_.children_left[i] > i and
-                model.tree_.children_right[i] > i):
-            feat = model.tree_.feature[i]
-            thresh = model.tree_.threshold[i]
-            left = model.tree_.children_left[i]
-            right = model.tree_.children_right[i]
-            mode = 'BRANCH_LEQ'
-        else:
-            feat, thresh, left, right = 0, 0., 0, 0
-            mode = 'LEAF'
-        attrs['nodes_nodeids'].append(node_id)
-        attrs['nodes_treeids'].append(0)
-        attrs['nodes_featureids'].append(feat)
-        attrs['nodes_modes'].append(mode)
-        attrs['nodes_truenodeids'].append(left)
-        attrs['nodes_falsenodeids'].append(right)
-        attrs['nodes_missing_value_tracks_true'].append(False)
-        attrs['nodes_hitrates'].append(1.)
-        attrs['nodes_values'].append(thresh)
-        if mode == 'LEAF':
-            attrs['class_ids'].append(node_id)
-            attrs['class_weights'].append(1.)
-            attrs['class_treeids'].append(0)
-            attrs['class_nodeids'].append(node_id)
+    tree = model.tree_
+    n_nodes = tree.node_count
+    node_ids = np.arange(n_nodes)
+    left = tree.children_left[:n_nodes]
+    right = tree.children_right[:n_nodes]
+    is_branch = (left > node_ids) & (right > node_ids)
+    leaf_ids = node_ids[~is_branch].tolist()
+
+    attrs['nodes_treeids'] = [0] * n_nodes
+    attrs['nodes_nodeids'] = node_ids.tolist()
+    attrs['nodes_featureids'] = np.where(
+        is_branch, tree.feature[:n_nodes], 0).tolist()
+    attrs['nodes_modes'] = np.where(is_branch, 'BRANCH_LEQ', 'LEAF').tolist()
+    attrs['nodes_values'] = np.where(
+        is_branch, tree.threshold[:n_nodes], 0.).tolist()
+    attrs['nodes_truenodeids'] = np.where(is_branch, left, 0).tolist()
+    attrs['nodes_falsenodeids'] = np.where(is_branch, right, 0).tolist()
+    attrs['nodes_missing_value_tracks_true'] = [False] * n_nodes
+    attrs['nodes_hitrates'] = [1.] * n_nodes
+    attrs['class_treeids'] = [0] * len(leaf_ids)
+    attrs['class_nodeids'] = leaf_ids
+    attrs['class_ids'] = list(leaf_ids)
+    attrs['class_weights'] = [1.] * len(leaf_ids)
+    attrs['classlabels_int64s'] = list(range(n_nodes))
     return attrs
 
 
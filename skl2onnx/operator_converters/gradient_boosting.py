@@ -10,7 +10,8 @@ import six
 from ..common._apply_operation import apply_cast
 from ..common.data_types import BooleanTensorType, Int64TensorType
 from ..common._registration import register_converter
-from ..common.tree_ensemble import add_tree_to_attribute_pairs
+from ..common.tree_ensemble import (
+    add_tree_to_attribute_pairs, add_trees_to_attribute_pairs)
 from ..common.tree_ensemble import get_default_tree_classifier_attribute_pairs
 from ..common.tree_ensemble import get_default_tree_regressor_attribute_pairs
 from ..proto import onnx_proto
@@ -66,20 +67,24 @@ def convert_sklearn_gradient_boosting_classifier(
     tree_weight = op.learning_rate
     n_est = (op.n_estimators_ if hasattr(op, 'n_estimators_') else
              op.n_estimators)
+    tree_calls = []
     if op.n_classes_ == 2:
         for tree_id in range(n_est):
             tree = op.estimators_[tree_id][0].tree_
-            add_tree_to_attribute_pairs(attrs, True, tree, tree_id,
-                                        tree_weight, 0, False, True,
-                                        dtype=container.dtype)
+            tree_calls.append((
+                add_tree_to_attribute_pairs,
+                (True, tree, tree_id, tree_weight, 0, False, True),
+                dict(dtype=container.dtype)))
     else:
         for i in range(n_est):
             for c in range(op.n_classes_):
                 tree_id = i * op.n_classes_ + c
                 tree = op.estimators_[i][c].tree_
-                add_tree_to_attribute_pairs(attrs, True, tree, tree_id,
-                                            tree_weight, c, False, True,
-                                            dtype=container.dtype)
+                tree_calls.append((
+                    add_tree_to_attribute_pairs,
+                    (True, tree, tree_id, tree_weight, c, False, True),
+                    dict(dtype=container.dtype)))
+    add_trees_to_attribute_pairs(attrs, tree_calls, n_jobs=container.n_jobs)
 
     input_name = operator.input_full_names
     if type(operator.inputs[0].type) == BooleanTensorType:
@@ -122,11 +127,15 @@ def convert_sklearn_gradient_boosting_regressor(
     tree_weight = op.learning_rate
     n_est = (op.n_estimators_ if hasattr(op, 'n_estimators_') else
              op.n_estimators)
+    tree_calls = []
     for i in range(n_est):
         tree = op.estimators_[i][0].tree_
         tree_id = i
-        add_tree_to_attribute_pairs(attrs, False, tree, tree_id, tree_weight,
-                                    0, False, True, dtype=container.dtype)
+        tree_calls.append((
+            add_tree_to_attribute_pairs,
+            (False, tree, tree_id, tree_weight, 0, False, True),
+            dict(dtype=container.dtype)))
+    add_trees_to_attribute_pairs(attrs, tree_calls, n_jobs=container.n_jobs)
 
     input_name = operator.input_full_names
     if type(operator.inputs[0].type) in (BooleanTensorType, Int64TensorType):
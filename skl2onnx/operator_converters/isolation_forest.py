@@ -13,7 +13,8 @@ from ..common._registration import register_converter
 from ..common.data_types import BooleanTensorType, Int64TensorType
 from ..common.tree_ensemble import (
     add_tree_to_attribute_pairs,
-    get_default_tree_regressor_attribute_pairs)
+    get_default_tree_regressor_attribute_pairs,
+    map_trees)
 from ..proto import onnx_proto
 from ..algebra.onnx_ops import (
     OnnxTreeEnsembleRegressor, OnnxLog,
@@ -47,18 +48,17 @@ def convert_sklearn_isolation_forest(
 
     # decision_path
     scores = []
-    for i, (tree, features) in enumerate(
-            zip(op.estimators_, op.estimators_features_)):
+    all_attrs = map_trees(
+        _tree_attributes,
+        [(tree.tree_, container.dtype) for tree in op.estimators_],
+        n_jobs=container.n_jobs)
+    for i, (features, (attrs, labels_sample, labels_length)) in enumerate(
+            zip(op.estimators_features_, all_attrs)):
 
         # X_subset = X[:, features]
         gather = OnnxGather(input_name, features.astype(np.int64),
                             axis=1, op_version=opv)
 
-        attrs = get_default_tree_regressor_attribute_pairs()
-        attrs['n_targets'] = 1
-        add_tree_to_attribute_pairs(attrs, False, tree.tree_, 0, 1., 0, False,
-                                    True, dtype=container.dtype)
-
         # tree leave
         attrs['n_targets'] = 1
         attrs['post_transform'] = 'NONE'
@@ -67,8 +67,7 @@ def convert_sklearn_isolation_forest(
         leave = OnnxTreeEnsembleRegressor(gather, op_version=opv, **attrs)
 
         # tree - retrieve node_sample
-        labels = _build_labels(tree.tree_, output="node_sample")
-        ordered = list(sorted(labels.items()))
+        ordered = list(sorted(labels_sample.items()))
         values = [float(_[1]) for _ in ordered]
         if any(map(lambda i: int(i[0]) != i[0], ordered)):
             keys = [float(_[0]) for _ in ordered]
@@ -92,8 +91,7 @@ def convert_sklearn_isolation_forest(
         node_sample.set_onnx_name_prefix('node_sample%d' % i)
 
         # tree - retrieve path_length
-        labels = _build_labels(tree.tree_, output="path_length")
-        ordered = list(sorted(labels.items()))
+        ordered = list(sorted(labels_length.items()))
         values = [float(_[1]) for _ in ordered]
         if any(map(lambda i: int(i[0]) != i[0], ordered)):
             keys = [float(_[0]) for _ in ordered]
@@ -216,6 +214,19 @@ def convert_sklearn_isolation_forest(
     less.add_to(scope, container)
 
 
+def _tree_attributes(tree, dtype):
+    """
+    Returns the attributes of the tree ensemble computing the leaf
+    of one tree, the number of samples and the path length of every leaf.
+    """
+    attrs = get_default_tree_regressor_attribute_pairs()
+    attrs['n_targets'] = 1
+    add_tree_to_attribute_pairs(attrs, False, tree, 0, 1., 0, False,
+                                True, dtype=dtype)
+    return (attrs, _build_labels(tree, output="node_sample"),
+            _build_labels(tree, output="path_length"))
+
+
 def _build_labels(tree, output):
     def _recursive_build_labels(index, current):
         current[index] = True
@@ -18,8 +18,10 @@ from ..common._registration import register_converter
 from ..common.tree_ensemble import (
     add_tree_to_attribute_pairs,
     add_tree_to_attribute_pairs_hist_gradient_boosting,
+    add_trees_to_attribute_pairs,
     get_default_tree_classifier_attribute_pairs,
-    get_default_tree_regressor_attribute_pairs
+    get_default_tree_regressor_attribute_pairs,
+    map_trees
 )
 from ..common.utils_classifier import get_label_classes
 from ..proto import onnx_proto
@@ -43,6 +45,20 @@ def _num_estimators(op):
         "Model should have attribute 'estimators_' or '_predictors'.")
 
 
+def _tree_path_attributes(tree, is_classifier, dtype):
+    """
+    Returns the attributes of the tree ensemble computing the leaf
+    of one tree and the labels of the decision path for every leaf.
+    """
+    if is_classifier:
+        attrs = get_default_tree_classifier_attribute_pairs()
+    else:
+        attrs = get_default_tree_regressor_attribute_pairs()
+    add_tree_to_attribute_pairs(attrs, is_classifier, tree, 0, 1., 0, False,
+                                True, dtype=dtype)
+    return attrs, _build_labels(tree)
+
+
 def _calculate_labels(scope, container, model, proba):
     predictions = []
     transposed_result_name = scope.get_unique_variable_name(
@@ -139,27 +155,32 @@ def convert_sklearn_random_forest_classifier(
             raise NotImplementedError(
                 "Model should have attribute 'estimators_' or '_predictors'.")
 
+        tree_calls = []
         for tree_id in range(estimator_count):
 
             if hasattr(op, 'estimators_'):
                 tree = op.estimators_[tree_id].tree_
-                add_tree_to_attribute_pairs(
-                    attr_pairs, True, tree, tree_id,
-                    tree_weight, 0, True, True,
-                    dtype=container.dtype)
+                tree_calls.append((
+                    add_tree_to_attribute_pairs,
+                    (True, tree, tree_id, tree_weight, 0, True, True),
+                    dict(dtype=container.dtype)))
             else:
                 # HistGradientBoostClassifier
                 if len(op._predictors[tree_id]) == 1:
                     tree = op._predictors[tree_id][0]
-                    add_tree_to_attribute_pairs_hist_gradient_boosting(
-                        attr_pairs, True, tree, tree_id, tree_weight, 0,
-                        False, False, dtype=container.dtype)
+                    tree_calls.append((
+                        add_tree_to_attribute_pairs_hist_gradient_boosting,
+                        (True, tree, tree_id, tree_weight, 0, False, False),
+                        dict(dtype=container.dtype)))
                 else:
                     for cl, tree in enumerate(op._predictors[tree_id]):
-                        add_tree_to_attribute_pairs_hist_gradient_boosting(
-                            attr_pairs, True, tree, tree_id * n_outputs + cl,
-                            tree_weight, cl, False, False,
-                            dtype=container.dtype)
+                        tree_calls.append((
+                            add_tree_to_attribute_pairs_hist_gradient_boosting,
+                            (True, tree, tree_id * n_outputs + cl,
+                             tree_weight, cl, False, False),
+                            dict(dtype=container.dtype)))
+        add_trees_to_attribute_pairs(
+            attr_pairs, tree_calls, n_jobs=container.n_jobs)
 
         if hasattr(op, '_baseline_prediction'):
             if isinstance(op._baseline_prediction, np.ndarray):
@@ -208,16 +229,14 @@ def convert_sklearn_random_forest_classifier(
 
         # decision_path
         tree_paths = []
-        for i, tree in enumerate(op.estimators_):
+        all_paths = map_trees(
+            _tree_path_attributes,
+            [(tree.tree_, True, container.dtype) for tree in op.estimators_],
+            n_jobs=container.n_jobs)
+        for i, (attrs, labels) in enumerate(all_paths):
 
-            attrs = get_default_tree_classifier_attribute_pairs()
             attrs['name'] = scope.get_unique_operator_name(
                 "%s_%d" % (op_type, i))
-            attrs['n_targets'] = int(op.n_outputs_)
-            add_tree_to_attribute_pairs(
-                attrs, True, tree.tree_, 0, 1., 0, False,
-                True, dtype=container.dtype)
-
             attrs['n_targets'] = 1
             attrs['post_transform'] = 'NONE'
             attrs['target_ids'] = [0 for _ in attrs['class_ids']]
@@ -234,7 +253,6 @@ def convert_sklearn_random_forest_classifier(
                 op_type.replace("Classifier", "Regressor"), input_name, dpath,
                 op_domain=op_domain, op_version=op_version, **attrs)
 
-            labels = _build_labels(tree.tree_)
             ordered = list(sorted(labels.items()))
             keys = [float(_[0]) for _ in ordered]
             values = [_[1] for _ in ordered]
@@ -321,12 +339,14 @@ def convert_sklearn_random_forest_regressor_converter(
 
     # random forest calculate the final score by averaging over all trees'
     # outcomes, so all trees' weights are identical.
+    tree_calls = []
     for tree_id in range(estimator_count):
         if hasattr(op, 'estimators_'):
             tree = op.estimators_[tree_id].tree_
-            add_tree_to_attribute_pairs(attrs, False, tree, tree_id,
-                                        tree_weight, 0, False, True,
-                                        dtype=container.dtype)
+            tree_calls.append((
+                add_tree_to_attribute_pairs,
+                (False, tree, tree_id, tree_weight, 0, False, True),
+                dict(dtype=container.dtype)))
         else:
             # HistGradientBoostingRegressor
             if len(op._predictors[tree_id]) != 1:
@@ -334,9 +354,11 @@ def convert_sklearn_random_forest_regressor_converter(
                     "The converter does not work when the number of trees "
                     "is not 1 but {}.".format(len(op._predictors[tree_id])))
             tree = op._predictors[tree_id][0]
-            add_tree_to_attribute_pairs_hist_gradient_boosting(
-                attrs, False, tree, tree_id, tree_weight, 0, False,
-                False, dtype=container.dtype)
+            tree_calls.append((
+                add_tree_to_attribute_pairs_hist_gradient_boosting,
+                (False, tree, tree_id, tree_weight, 0, False, False),
+                dict(dtype=container.dtype)))
+    add_trees_to_attribute_pairs(attrs, tree_calls, n_jobs=container.n_jobs)
 
     if hasattr(op, '_baseline_prediction'):
         if isinstance(op._baseline_prediction, np.ndarray):
@@ -366,14 +388,13 @@ def convert_sklearn_random_forest_regressor_converter(
 
     # decision_path
     tree_paths = []
-    for i, tree in enumerate(op.estimators_):
+    all_paths = map_trees(
+        _tree_path_attributes,
+        [(tree.tree_, False, container.dtype) for tree in op.estimators_],
+        n_jobs=container.n_jobs)
+    for i, (attrs, labels) in enumerate(all_paths):
 
-        attrs = get_default_tree_regressor_attribute_pairs()
         attrs['name'] = scope.get_unique_operator_name("%s_%d" % (op_type, i))
-        attrs['n_targets'] = int(op.n_outputs_)
-        add_tree_to_attribute_pairs(attrs, False, tree.tree_, 0, 1., 0, False,
-                                    True, dtype=container.dtype)
-
         attrs['n_targets'] = 1
         attrs['post_transform'] = 'NONE'
         attrs['target_ids'] = [0 for _ in attrs['target_ids']]
@@ -383,7 +404,6 @@ def convert_sklearn_random_forest_regressor_converter(
             op_type, input_name, dpath,
             op_domain=op_domain, op_version=op_version, **attrs)
 
-        labels = _build_labels(tree.tree_)
         ordered = list(sorted(labels.items()))
         keys = [float(_[0]) for _ in ordered]
         values = [_[1] for _ in ordered]
@@ -45,12 +45,12 @@ def convert_sklearn_svm_regressor(
     svm_attrs = {'name': scope.get_unique_operator_name('SVM')}
     op = operator.raw_operator
     if isinstance(op.dual_coef_, np.ndarray):
-        coef = op.dual_coef_.ravel().tolist()
+        coef = op.dual_coef_.ravel()
     else:
         coef = op.dual_coef_
     intercept = op.intercept_
     if isinstance(op.support_vectors_, np.ndarray):
-        support_vectors = op.support_vectors_.ravel().tolist()
+        support_vectors = op.support_vectors_.ravel()
     else:
         support_vectors = op.support_vectors_
 
@@ -133,14 +133,14 @@ def convert_sklearn_svm_classifier(
     svm_attrs = {'name': scope.get_unique_operator_name('SVMc')}
     op = operator.raw_operator
     if isinstance(op.dual_coef_, np.ndarray):
-        coef = op.dual_coef_.ravel().tolist()
+        coef = op.dual_coef_.ravel()
     else:
         coef = op.dual_coef_
     intercept = op.intercept_
     if isinstance(op.support_vectors_, np.ndarray):
-        support_vectors = op.support_vectors_.ravel().tolist()
+        support_vectors = op.support_vectors_.ravel()
     elif isspmatrix(op.support_vectors_):
-        support_vectors = op.support_vectors_.toarray().ravel().tolist()
+        support_vectors = op.support_vectors_.toarray().ravel()
     else:
         support_vectors = op.support_vectors_
 
@@ -153,10 +153,10 @@ def convert_sklearn_svm_classifier(
             op, (SVC, NuSVC))) and len(op.classes_) == 2:
         if isspmatrix(coef):
             coef_dense = coef.toarray().ravel()
-            svm_attrs['coefficients'] = [-v for v in coef_dense]
+            svm_attrs['coefficients'] = -coef_dense
         else:
-            svm_attrs['coefficients'] = [-v for v in coef]
-        svm_attrs['rho'] = [-v for v in intercept]
+            svm_attrs['coefficients'] = -coef
+        svm_attrs['rho'] = -intercept
     else:
         if isspmatrix(coef):
             svm_attrs['coefficients'] = coef.todense()
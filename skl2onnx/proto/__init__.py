@@ -8,6 +8,7 @@
 # we import ONNX protobuf definition here so that we can conduct quick
 # fixes by overwriting ONNX functions without changing any lines
 # elsewhere.
+import re
 from onnx import onnx_pb as onnx_proto # noqa
 from onnx import defs # noqa
 
@@ -23,10 +24,29 @@ except ImportError:
 from onnx.helper import split_complex_to_pairs
 
 
+def _parse_version(version):
+    """
+    Returns the numbers leading a version string as a tuple,
+    ``'1.14.0rc1'`` becomes ``(1, 14, 0)``.
+    """
+    numbers = []
+    for part in version.split('.'):
+        digits = re.match('[0-9]*', part).group(0)
+        if not digits:
+            break
+        numbers.append(int(digits))
+        if len(digits) < len(part):
+            break
+    return tuple(numbers)
+
+
 def _check_onnx_version():
-    import pkg_resources
-    min_required_version = pkg_resources.parse_version('1.0.1')
-    current_version = pkg_resources.get_distribution('onnx').parsed_version
+    # pkg_resources and distutils are not used, the first one takes
+    # longer to import than the rest of the package, the second one
+    # is removed in python 3.12.
+    import onnx
+    min_required_version = (1, 0, 1)
+    current_version = _parse_version(onnx.__version__)
     assert current_version >= min_required_version, (
         'ONNXMLTools requires ONNX version 1.0.1 or a newer one')
 
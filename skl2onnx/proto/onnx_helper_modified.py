@@ -125,9 +125,25 @@ def make_attribute(
     elif isinstance(value, GraphProto):
         attr.g.CopyFrom(value)
         attr.type = AttributeProto.GRAPH
+    # numpy arrays, the type is given by dtype
+    elif (isinstance(value, np.ndarray) and len(value.shape) == 1 and
+            value.shape[0] > 0 and
+            value.dtype in (np.float32, np.float64, np.int32, np.int64)):
+        if value.dtype == np.float32 or (
+                value.dtype == np.float64 and not use_float64):
+            attr.floats.extend(value.tolist())
+            attr.type = AttributeProto.FLOATS
+        elif value.dtype == np.float64:
+            attr.type = AttributeProto.TENSOR
+            attr.t.CopyFrom(
+                make_tensor(
+                    key, TensorProto.DOUBLE, (len(value), ),
+                    value.tolist()))
+        else:
+            attr.ints.extend(value.tolist())
+            attr.type = AttributeProto.INTS
     # third, iterable cases
     elif is_iterable:
-        byte_array = [_to_bytes_or_false(v) for v in value]
         if all(isinstance(v, np.float32) for v in value):
             attr.floats.extend(value)
             attr.type = AttributeProto.FLOATS
@@ -155,12 +171,19 @@ def make_attribute(
         elif all(isinstance(v, np.int64) for v in value):
             attr.ints.extend(int(v) for v in value)
             attr.type = AttributeProto.INTS
+        elif all(type(v) is int for v in value):
+            # Same as the next case without the slow check
+            # on an abstract class.
+            attr.ints.extend(value)
+            attr.type = AttributeProto.INTS
         elif all(isinstance(v, numbers.Integral) for v in value):
             # Turn np.int32/64 into Python built-in int.
             attr.ints.extend(int(v) for v in value)
             attr.type = AttributeProto.INTS
-        elif all(map(lambda bytes_or_false: bytes_or_false is not False,
-                     byte_array)):
+        elif all(_to_bytes_or_false(v) is not False for v in value):
+            # strings are converted only once every numerical type
+            # was ruled out
+            byte_array = [_to_bytes_or_false(v) for v in value]
             attr.strings.extend(cast(List[bytes], byte_array))
             attr.type = AttributeProto.STRINGS
         elif all(isinstance(v, TensorProto) for v in value):
@@ -4,78 +4,117 @@
 # license information.
 # --------------------------------------------------------------------------
 
-# To register shape calculators for scikit-learn operators,
-# import associated modules here.
-from . import array_feature_extractor
-from . import cast_op
-from . import concat
-from . import cross_decomposition
-from . import dict_vectorizer
-from . import ensemble_shapes
-from . import flatten
-from . import function_transformer
-from . import gaussian_process
-from . import grid_search_cv
-from . import identity
-from . import imputer
-from . import isolation_forest
-from . import k_bins_discretiser
-from . import k_means
-from . import label_binariser
-from . import label_encoder
-from . import linear_classifier
-from . import linear_regressor
-from . import mixture
-from . import nearest_neighbours
-from . import one_hot_encoder
-from . import ordinal_encoder
-from . import one_vs_rest_classifier
-from . import polynomial_features
-from . import power_transformer
-from . import random_projection
-from . import scaler
-from . import svd
-from . import support_vector_machines
-from . import text_vectorizer
-from . import tfidf_transformer
-from . import voting_classifier
-from . import voting_regressor
-from . import zip_map
+# To register a shape calculator for scikit-learn operators,
+# add the associated module and the aliases it registers here.
+# The module is imported the first time one of them is requested.
+from ..common._registration import _shape_calculator_pool
 
-__all__ = [
-    array_feature_extractor,
-    cast_op,
-    concat,
-    cross_decomposition,
-    dict_vectorizer,
-    ensemble_shapes,
-    flatten,
-    function_transformer,
-    gaussian_process,
-    grid_search_cv,
-    identity,
-    imputer,
-    isolation_forest,
-    k_bins_discretiser,
-    k_means,
-    label_binariser,
-    label_encoder,
-    linear_classifier,
-    linear_regressor,
-    mixture,
-    nearest_neighbours,
-    one_hot_encoder,
-    ordinal_encoder,
-    one_vs_rest_classifier,
-    polynomial_features,
-    power_transformer,
-    random_projection,
-    scaler,
-    svd,
-    support_vector_machines,
-    text_vectorizer,
-    tfidf_transformer,
-    voting_classifier,
-    voting_regressor,
-    zip_map,
-]
+_modules = {
+    'array_feature_extractor': ['SklearnArrayFeatureExtractor'],
+    'cast_op': ['SklearnCast', 'SklearnCastTransformer'],
+    'concat': [
+        'SklearnConcat',
+        'SklearnGenericUnivariateSelect',
+        'SklearnMultiply',
+        'SklearnRFE',
+        'SklearnRFECV',
+        'SklearnSelectFdr',
+        'SklearnSelectFpr',
+        'SklearnSelectFromModel',
+        'SklearnSelectFwe',
+        'SklearnSelectKBest',
+        'SklearnSelectPercentile',
+        'SklearnVarianceThreshold',
+    ],
+    'cross_decomposition': ['SklearnPLSRegression'],
+    'dict_vectorizer': ['SklearnDictVectorizer'],
+    'ensemble_shapes': [
+        'SklearnDecisionTreeRegressor',
+        'SklearnExtraTreeRegressor',
+        'SklearnExtraTreesRegressor',
+        'SklearnGradientBoostingRegressor',
+        'SklearnHistGradientBoostingRegressor',
+        'SklearnRandomForestRegressor',
+        'SklearnDecisionTreeClassifier',
+        'SklearnExtraTreeClassifier',
+        'SklearnExtraTreesClassifier',
+        'SklearnGradientBoostingClassifier',
+        'SklearnHistGradientBoostingClassifier',
+        'SklearnRandomForestClassifier',
+    ],
+    'flatten': ['SklearnFlatten'],
+    'function_transformer': ['SklearnFunctionTransformer'],
+    'gaussian_process': ['SklearnGaussianProcessRegressor'],
+    'grid_search_cv': ['SklearnGridSearchCV'],
+    'identity': ['SklearnIdentity'],
+    'imputer': ['SklearnImputer', 'SklearnSimpleImputer', 'SklearnBinarizer'],
+    'isolation_forest': ['SklearnIsolationForest'],
+    'k_bins_discretiser': ['SklearnKBinsDiscretizer'],
+    'k_means': ['SklearnKMeans', 'SklearnMiniBatchKMeans'],
+    'label_binariser': ['SklearnLabelBinarizer'],
+    'label_encoder': ['SklearnLabelEncoder'],
+    'linear_classifier': [
+        'SklearnLinearClassifier',
+        'SklearnLinearSVC',
+        'SklearnAdaBoostClassifier',
+        'SklearnBaggingClassifier',
+        'SklearnBernoulliNB',
+        'SklearnCategoricalNB',
+        'SklearnComplementNB',
+        'SklearnGaussianNB',
+        'SklearnMultinomialNB',
+        'SklearnCalibratedClassifierCV',
+        'SklearnMLPClassifier',
+        'SklearnSGDClassifier',
+        'SklearnStackingClassifier',
+    ],
+    'linear_regressor': [
+        'SklearnAdaBoostRegressor',
+        'SklearnBaggingRegressor',
+        'SklearnLinearRegressor',
+        'SklearnLinearSVR',
+        'SklearnMLPRegressor',
+        'SklearnRANSACRegressor',
+        'SklearnStackingRegressor',
+    ],
+    'mixture': ['SklearnGaussianMixture', 'SklearnBayesianGaussianMixture'],
+    'nearest_neighbours': [
+        'SklearnKNeighborsRegressor',
+        'SklearnRadiusNeighborsRegressor',
+        'SklearnKNeighborsClassifier',
+        'SklearnRadiusNeighborsClassifier',
+        'SklearnKNNImputer',
+        'SklearnKNeighborsTransformer',
+        'SklearnNearestNeighbors',
+        'SklearnNeighborhoodComponentsAnalysis',
+    ],
+    'one_hot_encoder': ['SklearnOneHotEncoder'],
+    'one_vs_rest_classifier': ['SklearnOneVsRestClassifier'],
+    'ordinal_encoder': ['SklearnOrdinalEncoder'],
+    'polynomial_features': ['SklearnPolynomialFeatures'],
+    'power_transformer': ['SklearnPowerTransformer'],
+    'random_projection': ['SklearnGaussianRandomProjection'],
+    'scaler': [
+        'SklearnRobustScaler',
+        'SklearnScaler',
+        'SklearnNormalizer',
+        'SklearnMinMaxScaler',
+        'SklearnMaxAbsScaler',
+    ],
+    'support_vector_machines': [
+        'SklearnOneClassSVM',
+        'SklearnSVC',
+        'SklearnSVR',
+    ],
+    'svd': ['SklearnIncrementalPCA', 'SklearnPCA', 'SklearnTruncatedSVD'],
+    'text_vectorizer': ['SklearnCountVectorizer', 'SklearnTfidfVectorizer'],
+    'tfidf_transformer': ['SklearnTfidfTransformer'],
+    'voting_classifier': ['SklearnVotingClassifier'],
+    'voting_regressor': ['SklearnVotingRegressor'],
+    'zip_map': ['SklearnZipMap'],
+}
+
+for _name, _aliases in _modules.items():
+    _shape_calculator_pool.declare(__name__ + '.' + _name, _aliases)
+
+__all__ = list(sorted(_modules))
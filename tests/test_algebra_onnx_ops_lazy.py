@@ -0,0 +1,78 @@
+"""
+Tests the lazy creation of the classes in onnx_ops.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import unittest
+import skl2onnx
+from skl2onnx.algebra import onnx_ops
+from skl2onnx.algebra.onnx_operator import OnnxOperator
+
+
+class TestAlgebraOnnxOpsLazy(unittest.TestCase):
+
+    def run_script(self, script):
+        env = os.environ.copy()
+        root = os.path.dirname(os.path.dirname(skl2onnx.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [root, env.get('PYTHONPATH', '')])
+        out = subprocess.check_output(
+            [sys.executable, '-c', textwrap.dedent(script)], env=env)
+        return out.decode('utf-8').strip().split('\n')
+
+    @unittest.skipIf(sys.version_info[:2] < (3, 7),
+                     reason="module __getattr__ requires python 3.7")
+    def test_lazy_classes(self):
+        from skl2onnx.algebra.onnx_ops import OnnxAbs, OnnxAbs_6
+        self.assertTrue(issubclass(OnnxAbs, OnnxOperator))
+        self.assertIs(OnnxAbs.past_version['OnnxAbs_6'], OnnxAbs_6)
+        self.assertIs(onnx_ops.OnnxAbs, OnnxAbs)
+        self.assertIn('OnnxTopK', dir(onnx_ops))
+        self.assertFalse(hasattr(onnx_ops, 'OnnxDoesNotExist'))
+        self.assertRaises(AttributeError, getattr, onnx_ops, 'Onnx')
+
+    def test_lazy_doc(self):
+        doc = onnx_ops.OnnxTopK.__dict__['__doc__']
+        self.assertTrue(doc.doc is None or 'TopK' in doc.doc)
+        self.assertTrue(onnx_ops.OnnxTopK.__doc__.startswith('**Version**'))
+        self.assertIn('TopK', doc.doc)
+        self.assertIs(onnx_ops.OnnxTopK.__doc__, doc.doc)
+
+    def test_same_classes(self):
+        classes = onnx_ops.dynamic_class_creation()
+        for name in ['OnnxAdd', 'OnnxAdd_7', 'OnnxLinearRegressor']:
+            lazy = getattr(onnx_ops, name)
+            self.assertEqual(lazy.__name__, classes[name].__name__)
+            self.assertEqual(lazy.attr_names, classes[name].attr_names)
+            self.assertEqual(lazy.__doc__, classes[name].__doc__)
+            self.assertEqual(sorted(lazy.past_version),
+                             sorted(classes[name].past_version))
+
+    @unittest.skipIf(sys.version_info[:2] < (3, 7),
+                     reason="module __getattr__ requires python 3.7")
+    def test_import_time(self):
+        # The module is imported again in a new process once
+        # every dependency is loaded to measure its own import time.
+        res = self.run_script("""
+            import importlib
+            import sys
+            from time import perf_counter
+            import skl2onnx.algebra.onnx_ops
+            del sys.modules['skl2onnx.algebra.onnx_ops']
+            begin = perf_counter()
+            mod = importlib.import_module('skl2onnx.algebra.onnx_ops')
+            import_time = perf_counter() - begin
+            print(len([k for k in vars(mod) if k.startswith('Onnx')]))
+            begin = perf_counter()
+            mod.dynamic_class_creation()
+            print(import_time, perf_counter() - begin)
+        """)
+        self.assertEqual(res[0], '0')
+        import_time, creation_time = map(float, res[1].split())
+        self.assertLess(import_time, creation_time)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests OnnxOperator.compile and OnnxTemplate.
+"""
+import unittest
+import numpy as np
+from numpy.testing import assert_almost_equal
+from onnxruntime import InferenceSession
+from sklearn.base import BaseEstimator, TransformerMixin
+from scipy.spatial.distance import cdist as scipy_cdist
+from skl2onnx import to_onnx, update_registered_converter
+from skl2onnx.algebra import complex_functions
+from skl2onnx.algebra.complex_functions import onnx_cdist
+from skl2onnx.algebra.onnx_ops import OnnxAdd, OnnxMul, OnnxIdentity
+from skl2onnx.algebra.onnx_template import OnnxTemplate
+from skl2onnx.common.data_types import FloatTensorType
+from test_utils import TARGET_OPSET
+
+
+class TwoBlocksTransformer(BaseEstimator, TransformerMixin):
+
+    def fit(self, X, y=None):
+        self.coef_ = np.array([[2, 3]], dtype=np.float32)
+        self.intercept_ = np.array([[-1, 1]], dtype=np.float32)
+        return self
+
+    def transform(self, X):
+        # second block uses the constant stored in the template
+        return ((X * self.coef_ + self.intercept_) * 5 + self.intercept_ +
+                X * 10)
+
+
+def two_blocks_shape_calculator(operator):
+    operator.outputs[0].type = FloatTensorType(
+        operator.inputs[0].type.shape)
+
+
+def two_blocks_converter(scope, operator, container):
+    op = operator.raw_operator
+    opv = container.target_opset
+    block = OnnxAdd(OnnxMul('X', 'W', op_version=opv),
+                    np.array([0], dtype=np.float32),
+                    op_version=opv, output_names=['Y'])
+    template = block.compile(
+        [('X', FloatTensorType()), ('W', FloatTensorType())],
+        outputs=[('Y', FloatTensorType())], target_opset=opv)
+    cst = template.initializers[0][0]
+    first = template.add_to(scope, container, [operator.inputs[0], op.coef_],
+                            constants={cst: op.intercept_})
+    second = template.add_to(scope, container,
+                             [first[0], np.array([5], dtype=np.float32)],
+                             constants={cst: op.intercept_})
+    third = template.add_to(scope, container, [operator.inputs[0].onnx_name,
+                                               np.array([10], np.float32)])
+    container.add_node('Add', [second[0], third[0]],
+                       operator.outputs[0].full_name,
+                       name=scope.get_unique_operator_name('Add'))
+
+
+update_registered_converter(
+    TwoBlocksTransformer, "TwoBlocksTransformer",
+    two_blocks_shape_calculator, two_blocks_converter)
+
+
+class TestOnnxTemplate(unittest.TestCase):
+
+    def test_compile(self):
+        node = OnnxAdd(OnnxMul('X', 'W', op_version=TARGET_OPSET), 'B',
+                       op_version=TARGET_OPSET, output_names=['Y'])
+        template = node.compile(
+            [('X', FloatTensorType()), ('W', FloatTensorType()),
+             ('B', FloatTensorType())],
+            outputs=[('Y', FloatTensorType())], target_opset=TARGET_OPSET)
+        self.assertIsInstance(template, OnnxTemplate)
+        self.assertEqual(template.input_names, ['X', 'W', 'B'])
+        self.assertEqual(template.output_names, ['Y'])
+        self.assertEqual([n[0] for n in template.nodes], ['Mul', 'Add'])
+        self.assertEqual(len(template.graph.node), 2)
+
+    def test_add_to(self):
+        X = np.array([[1, 2], [3, 4]], dtype=np.float32)
+        model = TwoBlocksTransformer().fit(X)
+        onx = to_onnx(model, X, target_opset=TARGET_OPSET)
+        ops = [n.op_type for n in onx.graph.node]
+        self.assertEqual(ops.count('Mul'), 3)
+        self.assertEqual(ops.count('Add'), 4)
+        names = [n.name for n in onx.graph.node]
+        self.assertEqual(len(names), len(set(names)))
+        sess = InferenceSession(onx.SerializeToString())
+        got = sess.run(None, {'X': X})[0]
+        assert_almost_equal(model.transform(X), got)
+
+    def test_add_to_errors(self):
+        node = OnnxIdentity('X', op_version=TARGET_OPSET,
+                            output_names=['Y'])
+        template = node.compile([('X', FloatTensorType())],
+                                target_opset=TARGET_OPSET)
+        self.assertRaises(RuntimeError, template.add_to, None, None, [])
+        self.assertRaises(RuntimeError, template.add_to, None, None,
+                          ['X'], outputs=['Y', 'Z'])
+        self.assertRaises(KeyError, template.add_to, None, None,
+                          ['X'], constants={'unknown': np.array([0])})
+
+    def test_cdist_cache(self):
+        complex_functions._scan_bodies.clear()
+        X = np.array([[1, 2], [3, 4], [5, 7]], dtype=np.float32)
+        graphs = []
+        for i in range(2):
+            node = onnx_cdist('X', X, dtype=np.float32, metric='manhattan',
+                              op_version=TARGET_OPSET, output_names=['Y'])
+            onx = node.to_onnx({'X': X}, dtype=np.float32,
+                               target_opset=TARGET_OPSET)
+            graphs.append(onx)
+            sess = InferenceSession(onx.SerializeToString())
+            got = sess.run(None, {'X': X})[0]
+            assert_almost_equal(scipy_cdist(X, X, metric='cityblock'), got,
+                                decimal=5)
+        self.assertEqual(len(complex_functions._scan_bodies), 1)
+        self.assertEqual(graphs[0].SerializeToString(),
+                         graphs[1].SerializeToString())
+
+    def test_cdist_cache_size(self):
+        complex_functions._scan_bodies.clear()
+        size = complex_functions.SCAN_BODIES_CACHE_SIZE
+        complex_functions.SCAN_BODIES_CACHE_SIZE = 2
+        try:
+            for dim_in in [2, 3, 2, 4]:
+                onnx_cdist('X', 'Y', dtype=np.float32, metric='manhattan',
+                           op_version=TARGET_OPSET, dim_in=dim_in)
+            self.assertEqual(
+                [key[3] for key in complex_functions._scan_bodies], [2, 4])
+        finally:
+            complex_functions.SCAN_BODIES_CACHE_SIZE = size
+            complex_functions._scan_bodies.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Tests ModelComponentContainer.
+"""
+import unittest
+import numpy as np
+from onnx import TensorProto
+from onnx.numpy_helper import from_array, to_array
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.datasets import load_iris
+from sklearn.decomposition import PCA
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from skl2onnx import to_onnx, update_registered_converter
+from skl2onnx.algebra.onnx_ops import OnnxAdd, OnnxMul
+from skl2onnx.common import _container
+from skl2onnx.common._apply_operation import apply_add
+from skl2onnx.common._container import (
+    ModelComponentContainer, RAW_DATA_MIN_SIZE)
+from skl2onnx.common._topology import Scope
+from skl2onnx.common.data_types import FloatTensorType
+from test_utils import TARGET_OPSET
+
+
+class _DoubleTransformer(BaseEstimator, TransformerMixin):
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X + X
+
+
+def _double_shape_calculator(operator):
+    operator.outputs[0].type = FloatTensorType(
+        operator.inputs[0].type.shape)
+
+
+class TestContainer(unittest.TestCase):
+
+    def test_add_node_unique_names(self):
+        container = ModelComponentContainer(TARGET_OPSET, dtype=np.float32)
+        container.add_node('Sin', 'X', 'Y1', name='Sin')
+        container.add_node('Sin', 'X', 'Y2', name='Sin')
+        container.add_node('Sin', 'X', 'Y3', name='Sin')
+        container.add_node('Sin', 'X', 'Y4')
+        names = [node.name for node in container.nodes]
+        self.assertEqual(names, ['Sin', 'Sin-N1', 'Sin-N2', 'N3'])
+        self.assertEqual(container.node_names, set(names))
+
+    def test_add_node_check_apply_operation(self):
+        self.assertFalse(_container.CHECK_APPLY_OPERATION)
+        for check in [False, True]:
+            _container.CHECK_APPLY_OPERATION = check
+            try:
+                container = ModelComponentContainer(
+                    TARGET_OPSET, dtype=np.float32, black_op={'Sin'})
+                container.add_node('Abs', 'X', 'Y')
+                self.assertRaises(RuntimeError, container.add_node,
+                                  'Sin', 'Y', 'Z')
+            finally:
+                _container.CHECK_APPLY_OPERATION = False
+        self.assertEqual(len(container.nodes), 1)
+
+    def test_check_apply_operation_callstack(self):
+
+        def direct_converter(scope, operator, container):
+            container.add_node(
+                'Add', [operator.inputs[0].full_name] * 2,
+                operator.outputs[0].full_name,
+                name=scope.get_unique_operator_name('Add'))
+
+        def apply_converter(scope, operator, container):
+            apply_add(scope, [operator.inputs[0].full_name] * 2,
+                      operator.outputs[0].full_name, container)
+
+        X = np.arange(6).reshape((3, 2)).astype(np.float32)
+        model = _DoubleTransformer()
+        self.assertFalse(_container.CHECK_APPLY_OPERATION)
+        try:
+            for check in [False, True]:
+                _container.CHECK_APPLY_OPERATION = check
+                update_registered_converter(
+                    _DoubleTransformer, "TestDoubleTransformer",
+                    _double_shape_calculator, direct_converter)
+                if check:
+                    with self.assertRaises(RuntimeError):
+                        to_onnx(model, X, target_opset=TARGET_OPSET)
+                else:
+                    to_onnx(model, X, target_opset=TARGET_OPSET)
+                update_registered_converter(
+                    _DoubleTransformer, "TestDoubleTransformer",
+                    _double_shape_calculator, apply_converter)
+                onx = to_onnx(model, X, target_opset=TARGET_OPSET)
+                self.assertEqual([n.op_type for n in onx.graph.node],
+                                 ['Add'])
+        finally:
+            _container.CHECK_APPLY_OPERATION = False
+
+    def test_check_apply_operation_package(self):
+        self.assertEqual(
+            _container._get_operation_list()['Identity'].__name__,
+            'apply_identity')
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        models = [
+            KNeighborsClassifier(),
+            make_pipeline(StandardScaler(), PCA(2), LogisticRegression()),
+            ColumnTransformer([('a', StandardScaler(), [0, 1]),
+                               ('b', MinMaxScaler(), [2, 3])])]
+        self.assertFalse(_container.CHECK_APPLY_OPERATION)
+        _container.CHECK_APPLY_OPERATION = True
+        try:
+            for model in models:
+                model.fit(X, y)
+                # the nodes added by the package, including the Identity
+                # nodes replacing duplicated initializers, are not checked
+                onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+                self.assertGreater(len(onx.graph.node), 0)
+        finally:
+            _container.CHECK_APPLY_OPERATION = False
+
+    def test_add_initializer_duplicates(self):
+        container = ModelComponentContainer(TARGET_OPSET, dtype=np.float32)
+        values = np.arange(6).astype(np.float32)
+        container.add_initializer('A', TensorProto.FLOAT, [2, 3], values)
+        # same values, different container type
+        container.add_initializer('B', TensorProto.FLOAT, [2, 3],
+                                  list(range(6)))
+        # same values, different shape
+        container.add_initializer('C', TensorProto.FLOAT, [3, 2], values)
+        # same values, different type
+        container.add_initializer('D', TensorProto.INT64, [2, 3],
+                                  values.astype(np.int64))
+        # different values
+        container.add_initializer('E', TensorProto.FLOAT, [2, 3],
+                                  values + 1)
+        # same raw data
+        container.add_initializer('F', TensorProto.FLOAT, [2, 3],
+                                  from_array(values.reshape((2, 3))))
+        container.add_initializer('G', TensorProto.FLOAT, [2, 3],
+                                  from_array(values.reshape((2, 3))))
+        # strings
+        container.add_initializer('H', TensorProto.STRING, [2],
+                                  [b'a', b'b'])
+        container.add_initializer('I', TensorProto.STRING, [2],
+                                  [b'a', b'b'])
+        names = [init.name for init in container.initializers]
+        self.assertEqual(names, ['A', 'C', 'D', 'E', 'F', 'H'])
+        identities = [(node.input[0], node.output[0])
+                      for node in container.nodes]
+        self.assertEqual(identities, [('A', 'B'), ('F', 'G'), ('H', 'I')])
+
+    def test_add_initializer_raw_data(self):
+        container = ModelComponentContainer(TARGET_OPSET, dtype=np.float32)
+        n = RAW_DATA_MIN_SIZE
+        values = np.arange(n * 2).astype(np.float64)
+        container.add_initializer('A', TensorProto.FLOAT, [n, 2], values)
+        container.add_initializer('B', TensorProto.INT64, [n, 2],
+                                  values.astype(np.int32))
+        container.add_initializer('C', TensorProto.FLOAT, [2],
+                                  values[:2])
+        container.add_initializer('D', TensorProto.BOOL, [n, 2],
+                                  values > n)
+        a, b, c, d = container.initializers
+        self.assertEqual(len(a.raw_data), n * 2 * 4)
+        self.assertEqual(len(b.raw_data), n * 2 * 8)
+        self.assertEqual(len(c.raw_data), 0)
+        self.assertEqual(list(c.float_data), [0, 1])
+        self.assertEqual(len(d.raw_data), n * 2)
+        self.assertEqual(to_array(a).dtype, np.float32)
+        self.assertEqual(to_array(a).tolist(),
+                         values.reshape((n, 2)).tolist())
+        self.assertEqual(to_array(b).dtype, np.int64)
+        self.assertEqual(to_array(b).tolist(),
+                         values.reshape((n, 2)).tolist())
+        self.assertEqual(to_array(d).tolist(),
+                         (values > n).reshape((n, 2)).tolist())
+
+    def test_add_initializer_no_deduplication(self):
+        container = ModelComponentContainer(
+            TARGET_OPSET, dtype=np.float32, deduplicate_initializers=False)
+        values = np.arange(6).astype(np.float32)
+        container.add_initializer('A', TensorProto.FLOAT, [2, 3], values)
+        container.add_initializer('B', TensorProto.FLOAT, [2, 3], values)
+        names = [init.name for init in container.initializers]
+        self.assertEqual(names, ['A', 'B'])
+        self.assertEqual(len(container.nodes), 0)
+
+    def test_convert_no_deduplication(self):
+        X = np.arange(20).reshape((10, 2)).astype(np.float32)
+        y = X.sum(axis=1)
+        model = LinearRegression().fit(X, y)
+        onx1 = to_onnx(model, X, target_opset=TARGET_OPSET)
+        onx2 = to_onnx(model, X, target_opset=TARGET_OPSET,
+                       deduplicate_initializers=False)
+        self.assertEqual(onx1.SerializeToString(),
+                         onx2.SerializeToString())
+
+    def _add_constants(self, deduplicate):
+        container = ModelComponentContainer(
+            TARGET_OPSET, dtype=np.float32,
+            deduplicate_initializers=deduplicate)
+        scope = Scope('s', target_opset=TARGET_OPSET)
+        cst = np.array([1, 2], dtype=np.float32)
+        node = OnnxAdd(
+            OnnxMul('X', cst, op_version=TARGET_OPSET),
+            OnnxAdd(cst, np.array([1, 2], dtype=np.float32),
+                    op_version=TARGET_OPSET),
+            op_version=TARGET_OPSET)
+        node = OnnxAdd(node, np.array([1, 2], dtype=np.float64),
+                       op_version=TARGET_OPSET, output_names=['Y'])
+        node.add_to(scope, container)
+        return container
+
+    def test_constant_pool(self):
+        container = self._add_constants(True)
+        self.assertEqual(len(container.initializers), 2)
+        init = container.initializers[0]
+        self.assertEqual(init.data_type, TensorProto.FLOAT)
+        self.assertEqual(to_array(init).tolist(), [1, 2])
+        self.assertEqual(container.initializers[1].data_type,
+                         TensorProto.DOUBLE)
+        self.assertEqual([n.op_type for n in container.nodes],
+                         ['Mul', 'Add', 'Add', 'Add'])
+        self.assertEqual(list(container.nodes[1].input),
+                         [init.name, init.name])
+
+    def test_constant_pool_no_deduplication(self):
+        container = self._add_constants(False)
+        self.assertEqual(len(container.initializers), 4)
+        self.assertEqual(container.constant_pool, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
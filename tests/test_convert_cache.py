@@ -0,0 +1,116 @@
+"""
+Tests the cache of converted models.
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from skl2onnx import convert_sklearn, to_onnx
+from skl2onnx.common._cache import ConversionCache
+from skl2onnx.common.data_types import FloatTensorType
+from test_utils import TARGET_OPSET
+
+
+class TestConvertCache(unittest.TestCase):
+
+    def setUp(self):
+        X, y = load_iris(return_X_y=True)
+        self.X = X.astype(np.float32)
+        self.y = y
+        self.model = make_pipeline(
+            StandardScaler(), LogisticRegression(max_iter=500)).fit(
+                self.X, y)
+
+    def test_cache_hit(self):
+        with tempfile.TemporaryDirectory() as temp:
+            cache = ConversionCache(temp)
+            onx = to_onnx(self.model, self.X[:1], cache=cache,
+                          target_opset=TARGET_OPSET)
+            self.assertEqual(len(cache), 1)
+            # the cached model is returned
+            onx2 = to_onnx(self.model, self.X[:1], cache=temp,
+                           target_opset=TARGET_OPSET)
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(onx.SerializeToString(),
+                             onx2.SerializeToString())
+            # name given to to_onnx is part of the key
+            to_onnx(self.model, self.X[:1], cache=cache, name='other',
+                    target_opset=TARGET_OPSET)
+            self.assertEqual(len(cache), 2)
+            # the cache is not used with intermediate
+            convert_sklearn(
+                self.model, 'pipe', [('X', FloatTensorType([None, 4]))],
+                target_opset=TARGET_OPSET, cache=cache, intermediate=True)
+            self.assertEqual(len(cache), 2)
+            cache.clear()
+            self.assertEqual(len(cache), 0)
+
+    def test_cache_key(self):
+        with tempfile.TemporaryDirectory() as temp:
+            cache = ConversionCache(temp)
+            types = [('X', FloatTensorType([None, 4]))]
+            key = cache.make_key(self.model, initial_types=types)
+            self.assertEqual(key, cache.make_key(
+                self.model, initial_types=types))
+            self.assertNotEqual(key, cache.make_key(
+                self.model, initial_types=[('Y', FloatTensorType([None, 4]))]))
+            self.assertNotEqual(key, cache.make_key(
+                self.model, initial_types=types, dtype=np.float64))
+
+            # refitted model
+            model = make_pipeline(
+                StandardScaler(),
+                LogisticRegression(max_iter=500, C=0.5)).fit(self.X, self.y)
+            self.assertNotEqual(key, cache.make_key(
+                model, initial_types=types))
+
+            # options given with id(...) are replaced by a location
+            key1 = cache.make_key(
+                self.model, options={id(self.model): {'zipmap': False}})
+            key2 = cache.make_key(
+                self.model, options={id(self.model.steps[1][1]):
+                                     {'zipmap': False}})
+            self.assertNotEqual(key1, key2)
+            clone = make_pipeline(
+                StandardScaler(), LogisticRegression(max_iter=500)).fit(
+                    self.X, self.y)
+            self.assertEqual(
+                key1, cache.make_key(
+                    clone, options={id(clone): {'zipmap': False}}))
+
+            # trees
+            rf1 = RandomForestClassifier(
+                n_estimators=3, random_state=0).fit(self.X, self.y)
+            rf2 = RandomForestClassifier(
+                n_estimators=3, random_state=1).fit(self.X, self.y)
+            self.assertNotEqual(cache.make_key(rf1), cache.make_key(rf2))
+
+    def test_cache_eviction(self):
+        with tempfile.TemporaryDirectory() as temp:
+            cache = ConversionCache(temp, max_entries=2)
+            for i, C in enumerate([1., 2., 3.]):
+                model = LogisticRegression(C=C, max_iter=500).fit(
+                    self.X, self.y)
+                to_onnx(model, self.X[:1], cache=cache,
+                        target_opset=TARGET_OPSET)
+                if i == 0:
+                    first = cache._entries()[0][2]
+                    os.utime(first, (0, 0))
+            # the least recently used entry was removed
+            self.assertNotIn(os.path.split(first)[-1], os.listdir(temp))
+            self.assertEqual(len(cache), 2)
+
+            size = sum(e[1] for e in cache._entries())
+            cache.max_entries = None
+            cache.max_size = size - 1
+            cache.evict()
+            self.assertEqual(len(cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
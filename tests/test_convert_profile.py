@@ -0,0 +1,97 @@
+"""
+Tests the profiling of a conversion.
+"""
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from skl2onnx import convert_sklearn
+from skl2onnx.common._profiling import ConversionProfile
+from skl2onnx.common._topology import Topology
+from skl2onnx.common.data_types import FloatTensorType
+from test_utils import TARGET_OPSET
+
+
+class TestConvertProfile(unittest.TestCase):
+
+    def setUp(self):
+        X, y = load_iris(return_X_y=True)
+        self.model = make_pipeline(
+            StandardScaler(), LogisticRegression(max_iter=500)).fit(X, y)
+        self.initial_types = [('X', FloatTensorType([None, 4]))]
+
+    def convert(self, **kwargs):
+        return convert_sklearn(
+            self.model, 'pipe', self.initial_types,
+            target_opset=TARGET_OPSET,
+            options={id(self.model): {'zipmap': False}}, **kwargs)
+
+    def test_profile(self):
+        expected = self.convert()
+        onx, profile = self.convert(profile=True)
+        self.assertIsInstance(profile, ConversionProfile)
+        self.assertEqual(expected.SerializeToString(),
+                         onx.SerializeToString())
+
+        phases = [(r['name'], r['depth']) for r in profile.records
+                  if r['category'] == 'phase']
+        self.assertEqual(phases, [
+            ('parse_sklearn_model', 0), ('compile', 0), ('_prune', 1),
+            ('_resolve_duplicates', 1), ('_fix_shapes', 1),
+            ('_infer_all_types', 1), ('_check_structure', 1),
+            ('convert_topology', 0), ('make_model', 1)])
+        starts = [r['start'] for r in profile.records]
+        self.assertEqual(starts, sorted(starts))
+
+        converters = [r for r in profile.records
+                      if r['category'] == 'converter']
+        self.assertEqual([r['model'] for r in converters],
+                         ['StandardScaler', 'LogisticRegression', None])
+        self.assertEqual([r['type'] for r in converters[:2]],
+                         ['SklearnScaler', 'SklearnLinearClassifier'])
+        self.assertEqual(sum(r['n_nodes'] for r in converters),
+                         len(onx.graph.node))
+        self.assertEqual(sum(r['n_initializers'] for r in converters),
+                         len(onx.graph.initializer))
+        for r in converters:
+            self.assertEqual(r['depth'], 1)
+            self.assertGreater(r['bytes'], 0)
+            self.assertGreaterEqual(r['duration'], 0)
+
+    def test_profile_intermediate(self):
+        res = self.convert(profile=True, intermediate=True)
+        self.assertEqual(len(res), 3)
+        self.assertIsInstance(res[1], Topology)
+        self.assertIsInstance(res[2], ConversionProfile)
+
+    def test_profile_export(self):
+        _, profile = self.convert(profile=True)
+        with tempfile.TemporaryDirectory() as temp:
+            name = os.path.join(temp, 'profile.json')
+            content = profile.to_json(name)
+            with open(name, 'r') as f:
+                self.assertEqual(f.read(), content)
+            self.assertEqual(json.loads(content)['records'],
+                             profile.records)
+
+            name = os.path.join(temp, 'trace.json')
+            content = profile.to_chrome_trace(name)
+            with open(name, 'r') as f:
+                self.assertEqual(f.read(), content)
+        events = json.loads(content)['traceEvents']
+        self.assertEqual([e['name'] for e in events],
+                         [r['name'] for r in profile.records])
+        for e, r in zip(events, profile.records):
+            self.assertEqual(e['ph'], 'X')
+            self.assertEqual(e['cat'], r['category'])
+            self.assertTrue(np.allclose(e['dur'], r['duration'] * 1e6))
+            self.assertEqual(e['args']['depth'], r['depth'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Tests initializers stored in an external file.
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+from numpy.testing import assert_almost_equal
+import onnx
+from onnx import TensorProto
+from onnx.external_data_helper import load_external_data_for_tensor
+from onnx.numpy_helper import from_array, to_array
+from onnxruntime import InferenceSession
+from sklearn.neighbors import KNeighborsRegressor
+from skl2onnx import to_onnx
+from skl2onnx.common._container import ModelComponentContainer
+from skl2onnx.common._external_data import ExternalDataWriter
+from skl2onnx.helpers.onnx_helper import (
+    get_initializer_array, load_onnx_model, save_onnx_model)
+from test_utils import TARGET_OPSET
+
+
+class TestExternalData(unittest.TestCase):
+
+    def test_container(self):
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "data.bin")
+            with ExternalDataWriter(path, size_threshold=64) as writer:
+                container = ModelComponentContainer(
+                    TARGET_OPSET, dtype=np.float32, external_data=writer)
+                big = np.arange(100).astype(np.float32)
+                container.add_initializer(
+                    'A', TensorProto.FLOAT, [10, 10], big)
+                container.add_initializer(
+                    'B', TensorProto.FLOAT, [2], np.array([1, 2]))
+                container.add_initializer(
+                    'C', TensorProto.INT64, [50], list(range(50)))
+                container.add_initializer(
+                    'D', TensorProto.FLOAT, [10, 10], big.copy())
+                container.add_initializer(
+                    'E', TensorProto.STRING, [20], [b'abc'] * 20)
+            self.assertEqual(os.path.getsize(path), 800)
+            inits = {i.name: i for i in container.initializers}
+            self.assertEqual(set(inits), {'A', 'B', 'C', 'E'})
+            self.assertEqual([n.op_type for n in container.nodes],
+                             ['Identity'])
+            self.assertEqual(inits['A'].data_location, TensorProto.EXTERNAL)
+            self.assertEqual(inits['A'].raw_data, b'')
+            self.assertEqual(inits['C'].data_location, TensorProto.EXTERNAL)
+            self.assertEqual(len(inits['C'].int64_data), 0)
+            self.assertEqual(inits['B'].data_location, TensorProto.DEFAULT)
+            self.assertEqual(inits['E'].data_location, TensorProto.DEFAULT)
+            assert_almost_equal(writer.read(inits['A']), big.reshape((10, 10)))
+            self.assertEqual(writer.read(inits['C']).tolist(),
+                             list(range(50)))
+
+    def test_write_offload(self):
+        # onnx>=1.10 rejects set_external_data on a tensor
+        # without raw_data, the writer fills the entries itself
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "data.bin")
+            values = np.arange(20).astype(np.int64)
+            with ExternalDataWriter(path, size_threshold=64) as writer:
+                tensor = TensorProto()
+                tensor.name = 'A'
+                tensor.data_type = TensorProto.FLOAT
+                tensor.dims.extend([5, 4])
+                writer.write(tensor, values.astype(np.float32))
+                tensor2 = from_array(values, name='B')
+                self.assertTrue(writer.offload(tensor2))
+            for t, offset, length in [(tensor, 0, 80), (tensor2, 80, 160)]:
+                self.assertEqual(t.data_location, TensorProto.EXTERNAL)
+                self.assertFalse(t.HasField('raw_data'))
+                self.assertEqual(
+                    [(e.key, e.value) for e in t.external_data],
+                    [('location', 'data.bin'), ('offset', str(offset)),
+                     ('length', str(length))])
+                load_external_data_for_tensor(t, temp)
+            assert_almost_equal(to_array(tensor), values.reshape((5, 4)))
+            assert_almost_equal(to_array(tensor2), values)
+
+    def test_convert(self):
+        X = np.random.randn(1000, 10).astype(np.float32)
+        y = X.sum(axis=1)
+        model = KNeighborsRegressor().fit(X, y)
+        expected = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "knn.data")
+            onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                          external_data_path=path)
+            self.assertLess(onx.ByteSize(), 10000)
+            self.assertGreater(os.path.getsize(path), X.nbytes)
+            external = [i for i in onx.graph.initializer
+                        if i.data_location == TensorProto.EXTERNAL]
+            # training set and targets
+            self.assertEqual(len(external), 2)
+            external = [i for i in external if list(i.dims) == [1000, 10]]
+            filename = os.path.join(temp, "knn.onnx")
+            save_onnx_model(onx, filename)
+            loaded = onnx.load(filename)
+            for init in loaded.graph.initializer:
+                if init.name == external[0].name:
+                    assert_almost_equal(to_array(init), X)
+            sess = InferenceSession(filename)
+            got = sess.run(None, {'X': X[:5]})[0]
+        sess = InferenceSession(expected.SerializeToString())
+        assert_almost_equal(sess.run(None, {'X': X[:5]})[0], got)
+
+    def test_lazy_loading(self):
+        X = np.random.randn(1000, 10).astype(np.float32)
+        y = X.sum(axis=1)
+        model = KNeighborsRegressor().fit(X, y)
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+        with tempfile.TemporaryDirectory() as temp:
+            filename = os.path.join(temp, "knn.onnx")
+            save_onnx_model(onx, filename)
+            lazy = load_onnx_model(filename, lazy=True)
+            self.assertLess(lazy.ByteSize(), 10000)
+            self.assertEqual(str(lazy.graph.node), str(onx.graph.node))
+            external = 0
+            for init, exp in zip(lazy.graph.initializer,
+                                 onx.graph.initializer):
+                self.assertEqual(init.name, exp.name)
+                value = get_initializer_array(init, temp)
+                if init.data_location == TensorProto.EXTERNAL:
+                    external += 1
+                    self.assertIsInstance(value, np.memmap)
+                    self.assertFalse(init.HasField('raw_data'))
+                    self.assertEqual(
+                        [e.key for e in init.external_data],
+                        ['location', 'offset', 'length'])
+                assert_almost_equal(value, to_array(exp))
+            self.assertEqual(external, 2)
+
+            # the lazy model refers to the first file
+            filename2 = os.path.join(temp, "knn2.onnx")
+            save_onnx_model(lazy, filename2)
+            self.assertLess(os.path.getsize(filename2), 10000)
+            sess = InferenceSession(filename2)
+            got = sess.run(None, {'X': X[:5]})[0]
+        assert_almost_equal(got.ravel(), model.predict(X[:5]), decimal=5)
+
+    def test_lazy_loading_external(self):
+        X = np.random.randn(1000, 10).astype(np.float32)
+        y = X.sum(axis=1)
+        model = KNeighborsRegressor().fit(X, y)
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "knn.data")
+            onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                          external_data_path=path)
+            filename = os.path.join(temp, "knn.onnx")
+            save_onnx_model(onx, filename)
+            lazy = load_onnx_model(filename, lazy=True)
+            self.assertEqual(lazy.SerializeToString(),
+                             onx.SerializeToString())
+            for init in lazy.graph.initializer:
+                if list(init.dims) == [1000, 10]:
+                    assert_almost_equal(
+                        get_initializer_array(init, temp), X)
+        with self.assertRaises(TypeError):
+            load_onnx_model(onx.SerializeToString(), lazy=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Tests the conversion reusing the nodes of a previous conversion.
+"""
+import unittest
+import numpy as np
+import onnx
+from numpy.testing import assert_almost_equal
+from onnxruntime import InferenceSession
+from sklearn.datasets import load_iris
+from sklearn.decomposition import PCA
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+from sklearn.svm import LinearSVC
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType, StringTensorType
+from test_utils import TARGET_OPSET
+
+
+class TestIncrementalConversion(unittest.TestCase):
+
+    def _reused(self, topology):
+        return {name: block.reused for name, block
+                in topology.converted_blocks.blocks.items()}
+
+    def _check(self, model, previous, initial_types, X=None,
+               identical=True):
+        onx, topology = convert_sklearn(
+            model, 'pipe', initial_types, target_opset=TARGET_OPSET,
+            intermediate=True, previous=previous)
+        expected = convert_sklearn(model, 'pipe', initial_types,
+                                   target_opset=TARGET_OPSET)
+        if identical:
+            self.assertEqual(onx.graph.SerializeToString(),
+                             expected.graph.SerializeToString())
+        else:
+            # node names may be different
+            self.assertEqual([n.op_type for n in onx.graph.node],
+                             [n.op_type for n in expected.graph.node])
+            self.assertEqual(len(onx.graph.initializer),
+                             len(expected.graph.initializer))
+        self.assertEqual(
+            sorted((o.domain, o.version) for o in onx.opset_import),
+            sorted((o.domain, o.version) for o in expected.opset_import))
+        if X is not None:
+            sess = InferenceSession(onx.SerializeToString())
+            got = sess.run(None, {'X': X})
+            assert_almost_equal(got[0], model.predict(X))
+        return onx, topology
+
+    def test_refit_last_step(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        pipe = make_pipeline(StandardScaler(), PCA(n_components=3),
+                             LogisticRegression(max_iter=500)).fit(X, y)
+        initial_types = [('X', FloatTensorType([None, 4]))]
+        onx, topology = convert_sklearn(
+            pipe, 'pipe', initial_types, target_opset=TARGET_OPSET,
+            intermediate=True)
+        self.assertEqual(set(self._reused(topology).values()), {False})
+
+        pipe.steps[-1][1].fit(pipe[:-1].transform(X)[:100], y[:100])
+        onx2, topology2 = self._check(pipe, (onx, topology),
+                                      initial_types, X)
+        self.assertEqual(self._reused(topology2), {
+            'SklearnScaler': True, 'SklearnPCA': True,
+            'SklearnLinearClassifier': False, 'SklearnZipMap': False})
+
+        # nothing changed
+        _, topology3 = self._check(pipe, (onx2, topology2),
+                                   initial_types, X)
+        self.assertEqual(set(self._reused(topology3).values()), {True})
+
+        # the first step changed, the following ones did not
+        pipe.steps[0][1].fit(X * 2)
+        _, topology4 = self._check(pipe, (onx2, topology2),
+                                   initial_types, X)
+        self.assertEqual(self._reused(topology4), {
+            'SklearnScaler': False, 'SklearnPCA': True,
+            'SklearnLinearClassifier': True, 'SklearnZipMap': True})
+
+    def test_new_final_step(self):
+        corpus = np.array([
+            "This is the first document.",
+            "This document is the second document.",
+            "And this is the third one.",
+            "Is this the first document?",
+        ] * 5).reshape((-1, 1))
+        y = np.array([0, 1, 0, 1] * 5)
+        pipe = make_pipeline(
+            TfidfVectorizer(), StandardScaler(with_mean=False),
+            LogisticRegression()).fit(corpus.ravel(), y)
+        initial_types = [('text', StringTensorType([None, 1]))]
+        previous = convert_sklearn(
+            pipe, 'pipe', initial_types, target_opset=TARGET_OPSET,
+            intermediate=True)
+
+        pipe.steps[-1] = ('linearsvc', LinearSVC(max_iter=10000).fit(
+            pipe[:-1].transform(corpus.ravel()), y))
+        _, topology = self._check(pipe, previous, initial_types,
+                                  identical=False)
+        # The converter of TfidfVectorizer declares two operators
+        # when it is called, it cannot be skipped but these two can.
+        self.assertEqual(self._reused(topology), {
+            'SklearnTfidfVectorizer': False, 'SklearnCountVectorizer': True,
+            'SklearnTfidfTransformer': True, 'SklearnScaler': True,
+            'SklearnLinearSVC': False})
+
+    def test_previous_optimize(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        pipe = make_pipeline(PCA(n_components=2),
+                             FunctionTransformer()).fit(X)
+        initial_types = [('X', FloatTensorType([None, 4]))]
+        onx, topology = convert_sklearn(
+            pipe, 'pipe', initial_types, target_opset=TARGET_OPSET,
+            intermediate=True)
+        before = onx.SerializeToString()
+        onx2 = convert_sklearn(
+            pipe, 'pipe', initial_types, target_opset=TARGET_OPSET,
+            previous=(onx, topology), optimize=True)
+        self.assertNotIn('Identity', [n.op_type for n in onx2.graph.node])
+        # the optimizations do not modify the previous model
+        self.assertEqual(onx.SerializeToString(), before)
+        onnx.checker.check_model(onx)
+        for model in [onx, onx2]:
+            sess = InferenceSession(model.SerializeToString())
+            assert_almost_equal(sess.run(None, {'X': X})[0],
+                                pipe.transform(X), decimal=5)
+
+    def test_modified_model(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        pipe = make_pipeline(StandardScaler(), LogisticRegression()).fit(X, y)
+        initial_types = [('X', FloatTensorType([None, 4]))]
+        onx, topology = convert_sklearn(
+            pipe, 'pipe', initial_types, target_opset=TARGET_OPSET,
+            intermediate=True)
+        del onx.graph.node[-1]
+        with self.assertRaises(RuntimeError):
+            convert_sklearn(pipe, 'pipe', initial_types,
+                            target_opset=TARGET_OPSET,
+                            previous=(onx, topology))
+        with self.assertRaises(NotImplementedError):
+            convert_sklearn(pipe, 'pipe', initial_types,
+                            target_opset=TARGET_OPSET,
+                            previous=(onx, topology),
+                            external_data_path="model.data")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Tests the conversion keeping only some of the outputs.
+"""
+import unittest
+import numpy as np
+from numpy.testing import assert_almost_equal
+from onnxruntime import InferenceSession
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from skl2onnx import convert_sklearn, to_onnx
+from skl2onnx.common.data_types import FloatTensorType
+from test_utils import TARGET_OPSET
+
+
+class TestKeepOutputs(unittest.TestCase):
+
+    def _run(self, onx, X):
+        return InferenceSession(onx.SerializeToString()).run(None, {'X': X})
+
+    def test_classifier(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = make_pipeline(StandardScaler(), LogisticRegression()).fit(X, y)
+
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                      keep_outputs=['output_probability'])
+        self.assertEqual([o.name for o in onx.graph.output],
+                         ['output_probability'])
+        self.assertEqual([n.op_type for n in onx.graph.node],
+                         ['Scaler', 'LinearClassifier', 'Normalizer',
+                          'ZipMap'])
+        got = self._run(onx, X)
+        self.assertEqual(len(got), 1)
+        assert_almost_equal(
+            np.array([[d[k] for k in sorted(d)] for d in got[0]]),
+            model.predict_proba(X), decimal=5)
+
+        # the converter of ZipMap is not called
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                      keep_outputs='output_label')
+        self.assertEqual([n.op_type for n in onx.graph.node],
+                         ['Scaler', 'LinearClassifier', 'Cast'])
+        assert_almost_equal(self._run(onx, X)[0], model.predict(X))
+
+    def test_label_branch(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = RandomForestClassifier(n_estimators=3, max_depth=3).fit(
+            X, np.vstack([y, (y + 1) % 3]).T)
+        options = {id(model): {'zipmap': False}}
+        expected = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                           options=options)
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                      options=options, keep_outputs=['probabilities'])
+        op_types = [n.op_type for n in onx.graph.node]
+        self.assertLess(len(op_types), len(expected.graph.node))
+        self.assertNotIn('ArgMax', op_types)
+        exp = self._run(expected, X)
+        got = self._run(onx, X)
+        self.assertEqual(len(got), 1)
+        assert_almost_equal(exp[1], got[0])
+
+    def test_errors(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = LogisticRegression().fit(X, y)
+        initial_types = [('X', FloatTensorType([None, 4]))]
+        with self.assertRaises(ValueError):
+            convert_sklearn(model, 'lr', initial_types,
+                            target_opset=TARGET_OPSET,
+                            keep_outputs=['probabilities'])
+        with self.assertRaises(ValueError):
+            convert_sklearn(model, 'lr', initial_types,
+                            target_opset=TARGET_OPSET, keep_outputs=[])
+        _, topology = convert_sklearn(
+            model, 'lr', initial_types, target_opset=TARGET_OPSET,
+            keep_outputs=['output_label'], intermediate=True)
+        self.assertIsNone(topology.converted_blocks)
+
+
+if __name__ == "__main__":
+    unittest.main()
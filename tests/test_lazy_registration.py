@@ -0,0 +1,109 @@
+"""
+Tests the lazy registration of converters and shape calculators.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import unittest
+import skl2onnx
+from skl2onnx import supported_converters
+from skl2onnx.common._registration import (
+    _converter_pool, _shape_calculator_pool, get_converter,
+    get_shape_calculator
+)
+
+
+class TestLazyRegistration(unittest.TestCase):
+
+    def run_python(self, script, *options):
+        env = os.environ.copy()
+        root = os.path.dirname(os.path.dirname(skl2onnx.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [root, env.get('PYTHONPATH', '')])
+        proc = subprocess.run(
+            [sys.executable] + list(options) +
+            ['-c', textwrap.dedent(script)],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.decode('utf-8'))
+        return (proc.stdout.decode('utf-8').strip().split('\n'),
+                proc.stderr.decode('utf-8'))
+
+    @unittest.skipIf(sys.version_info[:2] < (3, 7),
+                     reason="module __getattr__ requires python 3.7")
+    def test_importtime(self):
+        _, err = self.run_python("import skl2onnx", "-X", "importtime")
+        modules = set()
+        for line in err.split('\n'):
+            if line.startswith('import time:') and '|' in line:
+                modules.add(line.split('|')[-1].strip())
+        self.assertIn('skl2onnx.convert', modules)
+        self.assertIn('skl2onnx.operator_converters', modules)
+        self.assertNotIn('sklearn', modules)
+        self.assertNotIn('skl2onnx._parse', modules)
+        submodules = [m for m in modules if m.startswith((
+            'skl2onnx.operator_converters.',
+            'skl2onnx.shape_calculators.'))]
+        self.assertEqual(submodules, [])
+
+    def test_convert_imports_one_converter(self):
+        out, _ = self.run_python("""
+            import sys
+            import numpy as np
+            from sklearn.linear_model import LogisticRegression
+            from skl2onnx import to_onnx
+            X = np.random.randn(20, 2).astype(np.float32)
+            y = (X[:, 0] > 0).astype(np.int64)
+            to_onnx(LogisticRegression().fit(X, y), X)
+            print(" ".join(sorted(
+                m for m in sys.modules
+                if m.startswith('skl2onnx.operator_converters.'))))
+        """)
+        modules = out[-1].split()
+        self.assertIn('skl2onnx.operator_converters.linear_classifier',
+                      modules)
+        self.assertNotIn('skl2onnx.operator_converters.random_forest',
+                         modules)
+        # linear_classifier, zip_map and common
+        self.assertLess(len(modules), 4)
+
+    def test_overwrite_before_import(self):
+        out, _ = self.run_python("""
+            import numpy as np
+            from sklearn.preprocessing import Binarizer
+            from skl2onnx import to_onnx, update_registered_converter
+            from skl2onnx.operator_converters.id_op import (
+                convert_sklearn_identity)
+            from skl2onnx.shape_calculators.identity import (
+                calculate_sklearn_identity)
+            update_registered_converter(
+                Binarizer, 'SklearnBinarizer', calculate_sklearn_identity,
+                convert_sklearn_identity)
+            X = np.random.randn(20, 2).astype(np.float32)
+            onx = to_onnx(Binarizer().fit(X), X)
+            print([n.op_type for n in onx.graph.node])
+        """)
+        self.assertEqual(out[-1], "['Identity']")
+
+    def test_lazy_pool(self):
+        self.assertIn('SklearnBinarizer', _converter_pool)
+        self.assertIn('skl2onnx.operator_converters.binariser', sys.modules)
+        self.assertNotIn('SklearnBinarizer', _converter_pool.modules)
+        self.assertNotIn('SklearnUnknown', _converter_pool)
+        self.assertRaises(KeyError, lambda: _converter_pool['SklearnUnknown'])
+        self.assertIsNone(_converter_pool.get('SklearnUnknown'))
+        self.assertIsNotNone(get_converter('SklearnScaler'))
+        self.assertIsNotNone(get_shape_calculator('SklearnScaler'))
+        self.assertRaises(ValueError, get_converter, 'SklearnUnknown')
+
+    def test_supported_converters(self):
+        names = supported_converters()
+        self.assertEqual(len(names), len(_converter_pool))
+        self.assertEqual(_converter_pool.modules, {})
+        self.assertIn('SklearnLinearClassifier', names)
+        self.assertEqual(set(_converter_pool), set(_shape_calculator_pool))
+
+
+if __name__ == "__main__":
+    unittest.main()
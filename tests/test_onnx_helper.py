@@ -2,19 +2,26 @@
 Tests on functions in *onnx_helper*.
 """
 import unittest
+from types import SimpleNamespace
 from distutils.version import StrictVersion
 import numpy
 import onnx
+from onnx.helper import make_node
+from onnx.numpy_helper import from_array
 from sklearn import __version__ as sklearn_version
 from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import Binarizer, StandardScaler, OneHotEncoder
 from skl2onnx import convert_sklearn
-from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common.data_types import FloatTensorType, Int64TensorType
+from skl2onnx.common._topology import Variable
+from skl2onnx.helpers import onnx_helper
 from skl2onnx.helpers.onnx_helper import (
+    infer_outputs,
     load_onnx_model,
     save_onnx_model,
     select_model_inputs_outputs,
 )
+from test_utils import TARGET_OPSET
 
 
 def one_hot_encoder_supports_string():
@@ -99,6 +106,46 @@ class TestOnnxHelper(unittest.TestCase):
         vals = {p.key: p.value for p in new_model.metadata_props}
         assert vals == meta
 
+    def test_infer_outputs_cache(self):
+        onnx_helper._infer_outputs_cache.clear()
+        X = Variable('X', 'X', None, FloatTensorType([None, 3]))
+        shapes = infer_outputs('Abs', [X], outputs=['Y'],
+                               target_opset=TARGET_OPSET)
+        self.assertEqual(len(shapes), 1)
+        self.assertEqual(shapes[0].onnx_name, 'Y')
+        self.assertEqual(shapes[0].type.shape, [None, 3])
+        self.assertEqual(len(onnx_helper._infer_outputs_cache), 1)
+        shapes2 = infer_outputs('Abs', [X], outputs=['Y'],
+                                target_opset=TARGET_OPSET)
+        self.assertEqual(len(onnx_helper._infer_outputs_cache), 1)
+        self.assertIsNot(shapes[0], shapes2[0])
+        self.assertEqual(shapes2[0].type.shape, [None, 3])
+        # known dimensions
+        X2 = Variable('X', 'X', None, FloatTensorType([2, 3]))
+        shapes = infer_outputs('Abs', [X2], outputs=['Y'],
+                               target_opset=TARGET_OPSET)
+        self.assertEqual(shapes[0].type.shape, [2, 3])
+        self.assertEqual(len(onnx_helper._infer_outputs_cache), 2)
+        shapes = infer_outputs('ArgMax', [X], outputs=['Y'],
+                               target_opset=TARGET_OPSET, axis=1)
+        self.assertIsInstance(shapes[0].type, Int64TensorType)
+        self.assertEqual(shapes[0].type.shape, [None, 1])
+        self.assertEqual(len(onnx_helper._infer_outputs_cache), 3)
+
+    def test_infer_outputs_cache_initializer(self):
+        onnx_helper._infer_outputs_cache.clear()
+        X = Variable('X', 'X', None, FloatTensorType([None, 3]))
+        container = SimpleNamespace(
+            nodes=[make_node('Add', ['X', 'B'], ['Y'])])
+        for value in [1., 2.]:
+            init = from_array(
+                numpy.full((1, 3), value, dtype=numpy.float32), name='B')
+            shapes = infer_outputs(container, [X], initializer=[init],
+                                   target_opset=TARGET_OPSET)
+            self.assertEqual(shapes[0].type.shape, [None, 3])
+        # only the type and the dimensions of initializers matter
+        self.assertEqual(len(onnx_helper._infer_outputs_cache), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
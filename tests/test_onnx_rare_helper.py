@@ -2,12 +2,21 @@
 Tests on functions in *onnx_helper*.
 """
 import unittest
+import numpy as np
+from numpy.testing import assert_almost_equal
+from onnx import TensorProto
+from onnx.helper import (
+    make_graph, make_model, make_node, make_opsetid, make_tensor_value_info)
+from onnx.numpy_helper import to_array
+from onnxruntime import InferenceSession
 from sklearn.datasets import load_iris
 from sklearn.cluster import KMeans
 from sklearn.neighbors import NearestNeighbors
 from onnx.defs import onnx_opset_version
 from skl2onnx import convert_sklearn
 from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common._opset_index import (
+    OpsetIndex, get_opset_index, set_opset_index)
 from skl2onnx.helpers.onnx_rare_helper import upgrade_opset_number
 from test_utils import TARGET_OPSET
 
@@ -47,6 +56,67 @@ class TestOnnxRareHelper(unittest.TestCase):
         except RuntimeError as e:
             assert "was updated" in str(e)
 
+    def test_knn_upgrade_scan(self):
+        X = load_iris().data.astype(np.float32)
+        clr = NearestNeighbors(n_neighbors=3, radius=None).fit(X)
+        model_onnx = convert_sklearn(clr, "up",
+                                     [("input", FloatTensorType([None, 4]))],
+                                     target_opset=9)
+        expected = InferenceSession(model_onnx.SerializeToString()).run(
+            None, {'input': X})
+        model10 = upgrade_opset_number(model_onnx, 10)
+        topk = [n for n in model10.graph.node if n.op_type == 'TopK'][0]
+        self.assertEqual(len(topk.input), 2)
+        self.assertEqual(len(topk.attribute), 0)
+        got = InferenceSession(model10.SerializeToString()).run(
+            None, {'input': X})
+        assert_almost_equal(expected[1], got[1])
+        model9 = upgrade_opset_number(model10, 9)
+        topk = [n for n in model9.graph.node if n.op_type == 'TopK'][0]
+        self.assertEqual(len(topk.input), 1)
+        self.assertEqual(topk.attribute[0].name, 'k')
+        self.assertEqual(topk.attribute[0].i, 3)
+        got = InferenceSession(model9.SerializeToString()).run(
+            None, {'input': X})
+        assert_almost_equal(expected[1], got[1])
+        # The graph of the original model is unchanged.
+        topk = [n for n in model_onnx.graph.node if n.op_type == 'TopK'][0]
+        self.assertEqual(len(topk.input), 1)
+
+    def _reduce_model(self, opset, axes):
+        node = make_node('ReduceSum', ['X'], ['Y'], name='rs', axes=axes)
+        graph = make_graph(
+            [node], 'reduce',
+            [make_tensor_value_info('X', TensorProto.FLOAT, [None, 2])],
+            [make_tensor_value_info('Y', TensorProto.FLOAT, None)])
+        return make_model(graph, opset_imports=[make_opsetid('', opset)])
+
+    def test_reduce_sum_axes_input(self):
+        index = get_opset_index()
+        try:
+            set_opset_index(OpsetIndex({('', 'ReduceSum'): [1, 11, 13]}))
+            model = self._reduce_model(11, [1])
+            model13 = upgrade_opset_number(model, 13)
+            node = model13.graph.node[0]
+            self.assertEqual(list(node.input), ['X', 'rs_axes'])
+            self.assertEqual(len(node.attribute), 0)
+            self.assertEqual(
+                to_array(model13.graph.initializer[0]).tolist(), [1])
+            self.assertEqual(model13.opset_import[0].version, 13)
+            model11 = upgrade_opset_number(model13, 11)
+            node = model11.graph.node[0]
+            self.assertEqual(list(node.input), ['X'])
+            self.assertEqual(node.attribute[0].name, 'axes')
+            self.assertEqual(list(node.attribute[0].ints), [1])
+            model10 = upgrade_opset_number(model11, 10)
+            self.assertEqual(model10.opset_import[0].version, 10)
+            self.assertRaises(RuntimeError, upgrade_opset_number,
+                              self._reduce_model(11, [-1]), 10)
+            self.assertRaises(RuntimeError, upgrade_opset_number,
+                              model, 0)
+        finally:
+            set_opset_index(index)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+"""
+Tests the index of operator versions.
+"""
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+from onnx.defs import get_all_schemas_with_history
+from skl2onnx.common._container import ModelComponentContainer
+from skl2onnx.common._opset_index import (
+    OpsetIndex, get_opset_index, set_opset_index
+)
+from skl2onnx.algebra.onnx_ops import OnnxReduceSum, OnnxTopK
+from test_utils import TARGET_OPSET
+
+
+class TestOpsetIndex(unittest.TestCase):
+
+    def test_resolve(self):
+        index = OpsetIndex()
+        schemas = get_all_schemas_with_history()
+        for schema in schemas:
+            for target in range(1, TARGET_OPSET + 1):
+                expected = [s.since_version for s in schemas
+                            if s.name == schema.name and
+                            s.domain == schema.domain and
+                            s.since_version <= target]
+                expected = max(expected) if expected else None
+                self.assertEqual(
+                    index.resolve(schema.domain, schema.name, target),
+                    expected)
+        self.assertEqual(index.resolve('', 'TopK', 9), 1)
+        self.assertEqual(index.resolve('', 'TopK', 10), 10)
+        self.assertIsNone(index.resolve('', 'Unknown', 10))
+        self.assertIsNone(index.get_versions('', 'Unknown'))
+        self.assertIn(('', 'TopK', 10), index._resolved)
+
+    def test_serialization(self):
+        index = get_opset_index()
+        self.assertIs(index, get_opset_index())
+        index.resolve('', 'Add', 10)
+        content = index.to_json()
+        restored = OpsetIndex.from_json(content)
+        self.assertEqual(restored.versions, index.versions)
+        with tempfile.TemporaryDirectory() as temp:
+            filename = os.path.join(temp, 'index.json')
+            index.to_json(filename)
+            restored = OpsetIndex.from_json(filename=filename)
+        self.assertEqual(restored.versions, index.versions)
+        restored = pickle.loads(pickle.dumps(index))
+        self.assertEqual(restored.versions, index.versions)
+        self.assertEqual(restored._resolved, {})
+
+    def test_set_opset_index(self):
+        index = get_opset_index()
+        fake = OpsetIndex({('', 'Abs'): [1, 6], ('', 'Add'): [1, 6, 7]})
+        try:
+            set_opset_index(fake)
+            container = ModelComponentContainer(
+                TARGET_OPSET, dtype=np.float32)
+            self.assertEqual(container._get_op_version('', 'Add'), 7)
+            self.assertRaises(TypeError, set_opset_index, {})
+        finally:
+            set_opset_index(index)
+        self.assertIs(get_opset_index(), index)
+        set_opset_index(None)
+        self.assertIsNot(get_opset_index(), index)
+
+    def test_container(self):
+        container = ModelComponentContainer(9, dtype=np.float32)
+        self.assertEqual(container._get_op_version('', 'TopK'), 1)
+        container = ModelComponentContainer({'': 10}, dtype=np.float32)
+        self.assertEqual(container._get_op_version('', 'TopK'), 10)
+        with self.assertWarns(UserWarning):
+            self.assertEqual(container._get_op_version('', 'Unknown'), 1)
+
+    def test_class_factory(self):
+        node = OnnxTopK('X', 'K', op_version=10)
+        self.assertEqual(node.since_version, 10)
+        node = OnnxReduceSum('X', axes=[1], op_version=1)
+        self.assertEqual(node.since_version, 1)
+        node = OnnxTopK('X', op_version=1, k=3)
+        self.assertEqual(node.since_version, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,375 @@
+"""
+Tests the optimization of the converted graphs.
+"""
+import unittest
+import numpy as np
+from numpy.testing import assert_almost_equal, assert_array_equal
+from onnx import TensorProto
+from onnx.helper import (
+    make_graph, make_model, make_node, make_opsetid,
+    make_tensor_value_info)
+from onnx.numpy_helper import from_array, to_array
+from onnxruntime import InferenceSession
+from sklearn.compose import ColumnTransformer
+from sklearn.datasets import load_iris
+from sklearn.decomposition import PCA
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from skl2onnx import convert_sklearn, to_onnx
+from skl2onnx.common.data_types import FloatTensorType
+from skl2onnx.common._optimize import optimize_model
+from test_utils import TARGET_OPSET
+
+
+class TestOptimize(unittest.TestCase):
+
+    def _make_model(self, nodes, initializers=None, output='Y',
+                    output_type=TensorProto.FLOAT):
+        graph = make_graph(
+            nodes, 'g', [make_tensor_value_info(
+                'X', TensorProto.FLOAT, [None, 2, 3])],
+            [make_tensor_value_info(output, output_type, None)],
+            initializers or [])
+        return make_model(graph)
+
+    def _check(self, model, op_types, optimize=True):
+        opt = optimize_model(model, optimize)
+        self.assertEqual([n.op_type for n in opt.graph.node], op_types)
+        X = np.random.randn(4, 2, 3).astype(np.float32)
+        expected = InferenceSession(model.SerializeToString()).run(
+            None, {'X': X})
+        got = InferenceSession(opt.SerializeToString()).run(None, {'X': X})
+        assert_almost_equal(expected[0], got[0])
+        return opt
+
+    def test_identity(self):
+        model = self._make_model([
+            make_node('Identity', ['X'], ['X1']),
+            make_node('Add', ['X1', 'cst'], ['A']),
+            make_node('Identity', ['cst'], ['cst2']),
+            make_node('Mul', ['A', 'cst2'], ['M']),
+            make_node('Identity', ['M'], ['Y'])],
+            [from_array(np.array([2], dtype=np.float32), name='cst')])
+        opt = self._check(model, ['Add', 'Mul'])
+        self.assertEqual(opt.graph.node[1].output[0], 'Y')
+        self.assertEqual(list(opt.graph.node[1].input), ['A', 'cst'])
+
+    def test_identity_input_output(self):
+        model = self._make_model([make_node('Identity', ['X'], ['Y'])])
+        self._check(model, ['Identity'])
+
+    def test_reshape(self):
+        model = self._make_model([
+            make_node('Reshape', ['X', 's1'], ['R1']),
+            make_node('Reshape', ['R1', 's2'], ['R2']),
+            make_node('Reshape', ['R2', 's3'], ['Y'])],
+            [from_array(np.array([-1, 6], dtype=np.int64), name='s1'),
+             from_array(np.array([-1, 3, 2], dtype=np.int64), name='s2'),
+             from_array(np.array([0, 6], dtype=np.int64), name='s3')])
+        opt = self._check(model, ['Reshape', 'Reshape'])
+        self.assertEqual(list(opt.graph.node[0].input), ['X', 's2'])
+        self.assertEqual(set(i.name for i in opt.graph.initializer),
+                         {'s2', 's3'})
+
+    def test_reshape_two_consumers(self):
+        model = self._make_model([
+            make_node('Reshape', ['X', 's1'], ['R1']),
+            make_node('Reshape', ['R1', 's2'], ['R2']),
+            make_node('Reshape', ['R1', 's2'], ['R3']),
+            make_node('Add', ['R2', 'R3'], ['Y'])],
+            [from_array(np.array([-1, 6], dtype=np.int64), name='s1'),
+             from_array(np.array([-1, 3, 2], dtype=np.int64), name='s2')])
+        self._check(model, ['Reshape', 'Reshape', 'Reshape', 'Add'],
+                    optimize='reshape')
+
+    def test_cast(self):
+        model = self._make_model([
+            make_node('Cast', ['X'], ['C1'], to=TensorProto.FLOAT),
+            make_node('Cast', ['C1'], ['C2'], to=TensorProto.DOUBLE),
+            make_node('Cast', ['C2'], ['C3'], to=TensorProto.INT64),
+            make_node('Cast', ['C3'], ['Y'], to=TensorProto.DOUBLE)],
+            output_type=TensorProto.DOUBLE)
+        # float -> int64 loses information
+        opt = self._check(model, ['Cast', 'Cast'])
+        self.assertEqual([n.attribute[0].i for n in opt.graph.node],
+                         [TensorProto.INT64, TensorProto.DOUBLE])
+        self.assertEqual(list(opt.graph.node[0].input), ['X'])
+
+    def test_transpose(self):
+        model = self._make_model([
+            make_node('Transpose', ['X'], ['T1'], perm=[1, 2, 0]),
+            make_node('Transpose', ['T1'], ['T2'], perm=[2, 0, 1]),
+            make_node('Abs', ['T2'], ['A']),
+            make_node('Transpose', ['A'], ['T3'], perm=[1, 0, 2]),
+            make_node('Transpose', ['T3'], ['Y'], perm=[0, 2, 1])])
+        opt = self._check(model, ['Abs', 'Transpose'])
+        self.assertEqual(list(opt.graph.node[1].attribute[0].ints),
+                         [1, 2, 0])
+
+    def test_constant_folding(self):
+        model = self._make_model([
+            make_node('Neg', ['c1'], ['N']),
+            make_node('Transpose', ['N'], ['T'], perm=[1, 0]),
+            make_node('ReduceSum', ['i1'], ['S'], axes=[0], keepdims=0),
+            make_node('Reshape', ['S', 'shape'], ['R']),
+            make_node('Cast', ['R'], ['C'], to=TensorProto.DOUBLE),
+            make_node('Cast', ['C'], ['C2'], to=TensorProto.FLOAT),
+            make_node('Div', ['T', 'C2'], ['D']),
+            make_node('Unsqueeze', ['D'], ['U'], axes=[0]),
+            make_node('Mul', ['X', 'U'], ['Y'])],
+            [from_array(np.array([[1, 2], [3, 4], [5, 6]],
+                                 dtype=np.float32), name='c1'),
+             from_array(np.array([[1, 2], [3, 4], [5, 6]],
+                                 dtype=np.int64), name='i1'),
+             from_array(np.array([2, 1], dtype=np.int64), name='shape')])
+        opt = self._check(model, ['Mul'], optimize='constant')
+        self.assertEqual(len(opt.graph.initializer), 1)
+        value = to_array(opt.graph.initializer[0])
+        self.assertEqual(value.dtype, np.float32)
+        self.assertEqual(value.shape, (1, 2, 3))
+
+    def test_constant_folding_skipped(self):
+        model = self._make_model([
+            make_node('Div', ['i1', 'i2'], ['D']),
+            make_node('Cast', ['D'], ['C'], to=TensorProto.FLOAT),
+            make_node('Mul', ['X', 'C'], ['M']),
+            make_node('Sqrt', ['c1'], ['Q']),
+            make_node('Mul', ['M', 'Q'], ['M2']),
+            make_node('Abs', ['c1'], ['Y'])],
+            [from_array(np.array([-7, 7], dtype=np.int64), name='i1'),
+             from_array(np.array([2, 2], dtype=np.int64), name='i2'),
+             from_array(np.array([-1], dtype=np.float32), name='c1')])
+        # integer division is not folded, float Sqrt may be rounded
+        # differently by the runtime, graph outputs are not folded
+        opt = optimize_model(model, 'constant')
+        self.assertEqual([n.op_type for n in opt.graph.node],
+                         ['Div', 'Cast', 'Mul', 'Sqrt', 'Mul', 'Abs'])
+
+    def _make_gemm_model(self, nodes, initializers, opset=TARGET_OPSET,
+                         elem_type=TensorProto.FLOAT):
+        graph = make_graph(
+            nodes, 'g', [make_tensor_value_info(
+                'X', elem_type, [None, 3])],
+            [make_tensor_value_info('Y', elem_type, None)],
+            initializers)
+        return make_model(graph, opset_imports=[make_opsetid('', opset)])
+
+    def test_gemm(self):
+        W = np.array([[1, 2], [3, 4], [5, 6]], dtype=np.float32)
+        inits = [from_array(W, name='W'),
+                 from_array(W.T.copy(), name='Wt'),
+                 from_array(np.array([[1, -1]], dtype=np.float32), name='B'),
+                 from_array(np.array([1, 2, 3], dtype=np.float32), name='M')]
+        model = self._make_gemm_model([
+            make_node('Sub', ['X', 'M'], ['S']),
+            make_node('MatMul', ['S', 'W'], ['P1']),
+            make_node('Add', ['B', 'P1'], ['A1']),
+            make_node('Relu', ['A1'], ['R']),
+            make_node('Neg', ['Wt'], ['N']),
+            make_node('Transpose', ['N'], ['T2'], perm=[1, 0]),
+            make_node('MatMul', ['X', 'T2'], ['P2']),
+            make_node('Add', ['P2', 'B'], ['A2']),
+            make_node('Add', ['R', 'A2'], ['Y'])], inits)
+        opt = optimize_model(model, 'gemm')
+        # the Sub is kept, folding -M W into the bias
+        # loses precision in float32
+        self.assertEqual([n.op_type for n in opt.graph.node],
+                         ['Sub', 'Gemm', 'Relu', 'Neg', 'Gemm', 'Add'])
+        self.assertEqual(list(opt.graph.node[1].input), ['S', 'W', 'B'])
+        self.assertEqual(list(opt.graph.node[4].input), ['X', 'N', 'B'])
+        self.assertEqual(opt.graph.node[4].attribute[0].i, 1)
+        X = np.random.randn(4, 3).astype(np.float32)
+        expected = InferenceSession(model.SerializeToString()).run(
+            None, {'X': X})
+        got = InferenceSession(opt.SerializeToString()).run(None, {'X': X})
+        assert_almost_equal(expected[0], got[0], decimal=5)
+
+        # no fusion without a bias
+        model = self._make_gemm_model([
+            make_node('Sub', ['X', 'M'], ['S']),
+            make_node('MatMul', ['S', 'W'], ['Y'])], inits)
+        opt = optimize_model(model, 'gemm')
+        self.assertEqual([n.op_type for n in opt.graph.node],
+                         ['Sub', 'MatMul'])
+
+        # no fusion before opset 7 or if the rank is unknown
+        for opset in [6, TARGET_OPSET]:
+            model = self._make_gemm_model([
+                make_node('Reshape', ['X', 'shape'], ['X2']),
+                make_node('MatMul', ['X' if opset == 6 else 'X2', 'W'],
+                          ['P']),
+                make_node('Add', ['P', 'B'], ['Y'])],
+                inits + [from_array(np.array([-1], dtype=np.int64),
+                                    name='shape')], opset=opset)
+            opt = optimize_model(model, 'gemm')
+            self.assertEqual([n.op_type for n in opt.graph.node],
+                             ['Reshape', 'MatMul', 'Add'])
+
+        # onnxruntime does not implement Gemm for doubles
+        model = self._make_gemm_model([
+            make_node('MatMul', ['X', 'W'], ['P']),
+            make_node('Add', ['P', 'B'], ['Y'])],
+            [from_array(W.astype(np.float64), name='W'),
+             from_array(np.array([1, 2], dtype=np.float64), name='B')],
+            elem_type=TensorProto.DOUBLE)
+        opt = optimize_model(model, 'gemm')
+        self.assertEqual([n.op_type for n in opt.graph.node],
+                         ['MatMul', 'Add'])
+
+    def test_cse(self):
+        model = self._make_model([
+            make_node('Cast', ['X'], ['C1'], to=TensorProto.DOUBLE),
+            make_node('Cast', ['X'], ['C2'], to=TensorProto.DOUBLE),
+            make_node('Cast', ['X'], ['C3'], to=TensorProto.INT64),
+            make_node('Cast', ['C3'], ['C4'], to=TensorProto.DOUBLE),
+            make_node('Abs', ['C1'], ['A1']),
+            make_node('Abs', ['C2'], ['A2']),
+            make_node('RandomNormalLike', ['C1'], ['R1']),
+            make_node('RandomNormalLike', ['C2'], ['R2']),
+            make_node('Mul', ['R1', 'zero'], ['Z1']),
+            make_node('Mul', ['R2', 'zero'], ['Z2']),
+            make_node('Add', ['A1', 'A2'], ['S']),
+            make_node('Add', ['Z1', 'Z2'], ['Z']),
+            make_node('Add', ['S', 'C4'], ['T']),
+            make_node('Add', ['T', 'Z'], ['Y'])],
+            [from_array(np.array([0], dtype=np.float64), name='zero')],
+            output_type=TensorProto.DOUBLE)
+        # random operators are not merged
+        opt = self._check(model, [
+            'Cast', 'Cast', 'Cast', 'Abs', 'RandomNormalLike',
+            'RandomNormalLike', 'Mul', 'Mul', 'Add', 'Add', 'Add', 'Add'],
+            optimize='cse')
+        self.assertEqual(list(opt.graph.node[8].input), ['A1', 'A1'])
+        self.assertEqual(list(opt.graph.node[5].input), ['C1'])
+
+        model = self._make_model([
+            make_node('Abs', ['X'], ['A']),
+            make_node('Abs', ['X'], ['Y'])])
+        self._check(model, ['Abs', 'Abs'], optimize='cse')
+
+    def test_dead(self):
+        model = self._make_model([
+            make_node('Abs', ['X'], ['A']),
+            make_node('Neg', ['A'], ['N']),
+            make_node('Exp', ['N'], ['E']),
+            make_node('Mul', ['A', 'A'], ['Y'])])
+        self._check(model, ['Abs', 'Mul'], optimize='dead')
+
+    def test_subset(self):
+        model = self._make_model([
+            make_node('Identity', ['X'], ['X1']),
+            make_node('Cast', ['X1'], ['C'], to=TensorProto.FLOAT),
+            make_node('Abs', ['C'], ['Y'])])
+        # the type of X1 is unknown
+        self._check(model, ['Identity', 'Cast', 'Abs'], optimize=['cast'])
+        self._check(model, ['Cast', 'Abs'], optimize='identity')
+        self._check(model, ['Abs'], optimize=['identity', 'cast'])
+        self._check(model, ['Identity', 'Cast', 'Abs'], optimize='constant')
+        with self.assertRaises(ValueError):
+            optimize_model(model, ['unknown'])
+
+    def test_convert(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = make_pipeline(
+            StandardScaler(), MLPClassifier(max_iter=20)).fit(X, y)
+        expected = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+        onx, topology = convert_sklearn(
+            model, 'mlp', [('X', FloatTensorType([None, 4]))],
+            target_opset=TARGET_OPSET, optimize=True, intermediate=True)
+        self.assertIsNone(topology.converted_blocks)
+        self.assertLess(len(onx.graph.node), len(expected.graph.node))
+        self.assertNotIn('Identity', [n.op_type for n in onx.graph.node])
+        exp = InferenceSession(expected.SerializeToString()).run(
+            None, {'X': X})
+        got = InferenceSession(onx.SerializeToString()).run(None, {'X': X})
+        assert_almost_equal(exp[0], got[0])
+        assert_almost_equal(
+            np.array([[d[k] for k in sorted(d)] for d in exp[1]]),
+            np.array([[d[k] for k in sorted(d)] for d in got[1]]))
+
+    def test_convert_cast(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = ColumnTransformer([('a', StandardScaler(), [0, 1]),
+                                   ('b', MinMaxScaler(), [0, 1])]).fit(X)
+        expected = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+        self.assertIn('Cast', [n.op_type for n in expected.graph.node])
+        # the shape calculators tell the outputs of Scaler are floats
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                      optimize=['cast'])
+        self.assertNotIn('Cast', [n.op_type for n in onx.graph.node])
+        exp = InferenceSession(expected.SerializeToString()).run(
+            None, {'X': X})
+        got = InferenceSession(onx.SerializeToString()).run(None, {'X': X})
+        assert_array_equal(exp[0], got[0])
+
+    def test_convert_constant_folding(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        for model in [BernoulliNB(binarize=3.).fit(X, y),
+                      GaussianProcessRegressor().fit(X, y)]:
+            expected = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+            onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                          optimize='constant')
+            if isinstance(model, GaussianProcessRegressor):
+                self.assertLess(len(onx.graph.node),
+                                len(expected.graph.node))
+            exp = InferenceSession(expected.SerializeToString()).run(
+                None, {'X': X})
+            got = InferenceSession(onx.SerializeToString()).run(
+                None, {'X': X})
+            # float operators are only folded if numpy rounds
+            # them the same way as the runtime
+            for e, g in zip(exp, got):
+                if isinstance(e, list):
+                    e = [[d[k] for k in sorted(d)] for d in e]
+                    g = [[d[k] for k in sorted(d)] for d in g]
+                assert_array_equal(np.array(e), np.array(g))
+
+    def test_convert_gemm(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = MLPClassifier(hidden_layer_sizes=(10, 10, 10),
+                              max_iter=20).fit(X, y)
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                      optimize=True)
+        op_types = [n.op_type for n in onx.graph.node]
+        self.assertEqual(op_types.count('Gemm'), 4)
+        self.assertNotIn('MatMul', op_types)
+        got = InferenceSession(onx.SerializeToString()).run(None, {'X': X})
+        assert_almost_equal(model.predict_proba(X), np.array(
+            [[d[k] for k in sorted(d)] for d in got[1]]), decimal=5)
+
+    def test_convert_cse(self):
+        X, y = load_iris(return_X_y=True)
+        X = X.astype(np.float32)
+        model = make_pipeline(
+            ColumnTransformer([('a', StandardScaler(), [0, 1]),
+                               ('b', MinMaxScaler(), [0, 1]),
+                               ('c', PCA(n_components=1), [0, 1, 2])]),
+            LogisticRegression()).fit(X, y)
+        expected = to_onnx(model, X[:1], target_opset=TARGET_OPSET)
+        onx = to_onnx(model, X[:1], target_opset=TARGET_OPSET,
+                      optimize=True)
+        op_types = [n.op_type for n in onx.graph.node]
+        self.assertEqual(op_types.count('ArrayFeatureExtractor'), 2)
+        self.assertEqual(
+            [n.op_type for n in expected.graph.node].count(
+                'ArrayFeatureExtractor'), 3)
+        exp = InferenceSession(expected.SerializeToString()).run(
+            None, {'X': X})
+        got = InferenceSession(onx.SerializeToString()).run(None, {'X': X})
+        assert_almost_equal(exp[0], got[0])
+        assert_almost_equal(
+            np.array([[d[k] for k in sorted(d)] for d in exp[1]]),
+            np.array([[d[k] for k in sorted(d)] for d in got[1]]),
+            decimal=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Tests the topological traversal of a topology
+and the simplification of the graph.
+"""
+import unittest
+from skl2onnx.common._topology import Topology
+from skl2onnx.common.data_types import FloatTensorType
+
+
+def _create_topology():
+    topology = Topology(None, registered_models={})
+    scope = topology.declare_scope('__root__')
+    return topology, scope
+
+
+def _chain(scope, types, first=None):
+    if first is None:
+        first = scope.declare_local_variable('X', FloatTensorType())
+    last = first
+    for i, t in enumerate(types):
+        op = scope.declare_local_operator(t)
+        op.inputs.append(last)
+        last = scope.declare_local_variable('V%d' % i, FloatTensorType())
+        op.outputs.append(last)
+    return first, last
+
+
+class TestTopologyIterator(unittest.TestCase):
+
+    def test_order_chain(self):
+        topology, scope = _create_topology()
+        _chain(scope, ['A', 'B', 'C', 'D'])
+        names = [op.type for op in topology.topological_operator_iterator()]
+        self.assertEqual(names, ['A', 'B', 'C', 'D'])
+
+    def test_order_declaration(self):
+        # Operators declared before their inputs are produced
+        # are delivered in the next pass.
+        topology, scope = _create_topology()
+        X = scope.declare_local_variable('X', FloatTensorType())
+        Y = scope.declare_local_variable('Y', FloatTensorType())
+        Z = scope.declare_local_variable('Z', FloatTensorType())
+        T = scope.declare_local_variable('T', FloatTensorType())
+        U = scope.declare_local_variable('U', FloatTensorType())
+        op = scope.declare_local_operator('C')
+        op.inputs.append(Y)
+        op.outputs.append(Z)
+        op = scope.declare_local_operator('A')
+        op.inputs.append(X)
+        op.outputs.append(Y)
+        op = scope.declare_local_operator('B')
+        op.inputs.append(Y)
+        op.outputs.append(T)
+        op = scope.declare_local_operator('D')
+        op.inputs.append(X)
+        op.outputs.append(U)
+        names = [op.type for op in topology.topological_operator_iterator()]
+        self.assertEqual(names, ['A', 'B', 'D', 'C'])
+
+    def test_order_priorities(self):
+        topology, scope = _create_topology()
+        X = scope.declare_local_variable('X', FloatTensorType())
+        for t in ['tensorToProbabilityMap', 'tensorToLabel', 'A']:
+            op = scope.declare_local_operator(t)
+            op.inputs.append(X)
+            op.outputs.append(scope.declare_local_variable(
+                'Y', FloatTensorType()))
+        names = [op.type for op in topology.topological_operator_iterator()]
+        self.assertEqual(names, ['A', 'tensorToLabel',
+                                 'tensorToProbabilityMap'])
+
+    def test_operator_declared_while_iterating(self):
+        topology, scope = _create_topology()
+        X, Y = _chain(scope, ['A', 'B'])
+        names = []
+        for op in topology.topological_operator_iterator():
+            names.append(op.type)
+            if op.type == 'A':
+                _chain(scope, ['C', 'D'], first=op.outputs[0])
+                # late fed variable, not produced by any operator
+                Z = scope.declare_local_variable('Z', FloatTensorType())
+                op = scope.declare_local_operator('E')
+                op.inputs.append(Z)
+                op.outputs.append(scope.declare_local_variable(
+                    'W', FloatTensorType()))
+        self.assertEqual(names, ['A', 'B', 'C', 'D', 'E'])
+        self.assertTrue(all(op.is_evaluated
+                            for op in topology.unordered_operator_iterator()))
+
+    def test_root_names(self):
+        topology, scope = _create_topology()
+        X, Y = _chain(scope, ['A', 'B'])
+        _chain(scope, ['C'])
+        topology.root_names = [X.onnx_name]
+        names = [op.type for op in topology.topological_operator_iterator()]
+        self.assertEqual(names, ['A', 'B'])
+
+    def test_output_already_assigned(self):
+        topology, scope = _create_topology()
+        X, Y = _chain(scope, ['A'])
+        op = scope.declare_local_operator('B')
+        op.inputs.append(X)
+        op.outputs.append(Y)
+        with self.assertRaises(RuntimeError):
+            list(topology.topological_operator_iterator())
+
+
+class TestTopologyCompile(unittest.TestCase):
+
+    def test_prune(self):
+        topology, scope = _create_topology()
+        _chain(scope, ['A', 'B'])
+        # a cycle cannot be reached from the inputs
+        U = scope.declare_local_variable('U', FloatTensorType())
+        W = scope.declare_local_variable('W', FloatTensorType())
+        for t, a, b in [('C', U, W), ('D', W, U)]:
+            op = scope.declare_local_operator(t)
+            op.inputs.append(a)
+            op.outputs.append(b)
+        order = topology._prune()
+        self.assertEqual([op.type for op in order], ['A', 'B'])
+        self.assertEqual(
+            [op.type for op in topology.unordered_operator_iterator()],
+            ['A', 'B'])
+        self.assertEqual(
+            [v.raw_name for v in topology.unordered_variable_iterator()],
+            ['X', 'V0', 'V1'])
+
+    def test_prune_output_already_assigned(self):
+        topology, scope = _create_topology()
+        X, Y = _chain(scope, ['A'])
+        op = scope.declare_local_operator('B')
+        op.inputs.append(X)
+        op.outputs.append(Y)
+        self.assertRaises(RuntimeError, topology._prune)
+
+    def test_resolve_duplicates(self):
+        topology, scope = _create_topology()
+        X, _ = _chain(scope, ['identity', 'identity', 'A', 'B'])
+        # a second consumer of an identity output
+        op = scope.declare_local_operator('C')
+        op.inputs.append(scope.variables[
+            scope.variable_name_mapping['V1'][0]])
+        op.outputs.append(scope.declare_local_variable(
+            'Y', FloatTensorType()))
+        consumers = topology._build_graph_index()
+        order = topology._prune(consumers)
+        topology._resolve_duplicates(consumers, order)
+        ops = list(topology.unordered_operator_iterator())
+        self.assertEqual([op.type for op in ops], ['A', 'B', 'C'])
+        self.assertIs(ops[0].inputs[0], X)
+        self.assertIs(ops[2].inputs[0], X)
+        self.assertEqual(
+            [v.raw_name for v in topology.unordered_variable_iterator()],
+            ['X', 'V2', 'V3', 'Y'])
+
+    def test_resolve_duplicates_input_output(self):
+        # an identity between an input and an output is kept
+        topology, scope = _create_topology()
+        _chain(scope, ['identity'])
+        topology._resolve_duplicates()
+        self.assertEqual(
+            [op.type for op in topology.unordered_operator_iterator()],
+            ['identity'])
+
+
+if __name__ == "__main__":
+    unittest.main()
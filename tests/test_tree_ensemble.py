@@ -0,0 +1,154 @@
+"""
+Tests the functions building tree ensemble attributes.
+"""
+import unittest
+import numpy as np
+from sklearn.datasets import make_classification, make_regression
+from sklearn.ensemble import (
+    GradientBoostingClassifier, IsolationForest,
+    RandomForestClassifier, RandomForestRegressor)
+from skl2onnx import to_onnx
+from skl2onnx.common.tree_ensemble import (
+    add_node, add_tree_to_attribute_pairs, add_trees_to_attribute_pairs,
+    find_switch_point, find_switch_points,
+    get_default_tree_classifier_attribute_pairs,
+    get_default_tree_regressor_attribute_pairs,
+    map_trees, sklearn_threshold, sklearn_thresholds)
+from test_utils import TARGET_OPSET
+
+
+def _add_tree_node_by_node(attr_pairs, is_classifier, tree, tree_id,
+                           tree_weight, weight_id_bias,
+                           leaf_weights_are_counts,
+                           adjust_threshold_for_sklearn=False, dtype=None):
+    for i in range(tree.node_count):
+        if tree.children_left[i] > i or tree.children_right[i] > i:
+            add_node(attr_pairs, is_classifier, tree_id, tree_weight, i,
+                     tree.feature[i], 'BRANCH_LEQ', tree.threshold[i],
+                     int(tree.children_left[i]),
+                     int(tree.children_right[i]), tree.value[i],
+                     weight_id_bias, leaf_weights_are_counts,
+                     adjust_threshold_for_sklearn, dtype)
+        else:
+            add_node(attr_pairs, is_classifier, tree_id, tree_weight, i,
+                     0, 'LEAF', 0., 0, 0, tree.value[i],
+                     weight_id_bias, leaf_weights_are_counts,
+                     adjust_threshold_for_sklearn, dtype)
+
+
+class TestTreeEnsemble(unittest.TestCase):
+
+    def assertSameAttributes(self, expected, got):
+        self.assertEqual(list(expected), list(got))
+        for k, v in expected.items():
+            self.assertEqual(v, got[k], k)
+            if isinstance(v, list):
+                self.assertEqual([type(_) == str for _ in v],
+                                 [type(_) == str for _ in got[k]])
+
+    def test_sklearn_thresholds(self):
+        rnd = np.random.RandomState(0)
+        values = np.hstack([
+            rnd.randn(1000) * 10. ** rnd.randint(-6, 6, 1000),
+            rnd.randn(100).astype(np.float32), [0.]])
+        for dtype in [np.float32, np.float64]:
+            with self.subTest(dtype=dtype):
+                expected = np.array([
+                    sklearn_threshold(v, dtype, 'BRANCH_LEQ')
+                    for v in values])
+                got = sklearn_thresholds(values, dtype, 'BRANCH_LEQ')
+                self.assertEqual(got.dtype, np.float64)
+                self.assertEqual(expected.tolist(), got.tolist())
+        self.assertRaises(TypeError, sklearn_thresholds,
+                          values, np.int64, 'BRANCH_LEQ')
+        self.assertRaises(RuntimeError, sklearn_thresholds,
+                          values, np.float32, 'BRANCH_LT')
+
+    def test_find_switch_points(self):
+        fy = np.array([0.5, 1.e-3, -7.1, 3.e5], dtype=np.float32)
+        nfy = np.nextafter(fy, fy + 1, dtype=np.float32)
+        expected = [find_switch_point(a, b) for a, b in zip(fy, nfy)]
+        self.assertEqual(find_switch_points(fy, nfy).tolist(), expected)
+        self.assertEqual(find_switch_points(fy, fy).tolist(),
+                         fy.astype(np.float64).tolist())
+
+    def test_add_tree_classifier(self):
+        for n_classes in [2, 3]:
+            X, y = make_classification(
+                300, n_classes=n_classes, n_informative=4, random_state=0)
+            model = RandomForestClassifier(
+                n_estimators=3, max_depth=6, random_state=0).fit(X, y)
+            for tree_id, est in enumerate(model.estimators_):
+                for dtype in [None, np.float32, np.float64]:
+                    args = (True, est.tree_, tree_id, 1. / 3, 0, True,
+                            dtype is not None)
+                    expected = get_default_tree_classifier_attribute_pairs()
+                    _add_tree_node_by_node(expected, *args, dtype=dtype)
+                    got = get_default_tree_classifier_attribute_pairs()
+                    add_tree_to_attribute_pairs(got, *args, dtype=dtype)
+                    self.assertSameAttributes(expected, got)
+
+    def test_add_tree_regressor(self):
+        X, y = make_regression(300, n_targets=2, random_state=0)
+        model = RandomForestRegressor(
+            n_estimators=3, max_depth=6, random_state=0).fit(X, y)
+        for tree_id, est in enumerate(model.estimators_):
+            args = (False, est.tree_, tree_id, 0.5, 1, False)
+            expected = get_default_tree_regressor_attribute_pairs()
+            _add_tree_node_by_node(expected, *args)
+            got = get_default_tree_regressor_attribute_pairs()
+            add_tree_to_attribute_pairs(got, *args)
+            self.assertSameAttributes(expected, got)
+
+    def test_map_trees(self):
+        args = [(i, i + 1) for i in range(20)]
+        expected = [a * b for a, b in args]
+        for n_jobs in [None, 1, 3, -1]:
+            with self.subTest(n_jobs=n_jobs):
+                self.assertEqual(
+                    map_trees(lambda a, b: a * b, args, n_jobs=n_jobs),
+                    expected)
+
+    def test_add_trees_n_jobs(self):
+        X, y = make_classification(
+            300, n_classes=3, n_informative=4, random_state=0)
+        model = RandomForestClassifier(
+            n_estimators=8, max_depth=6, random_state=0).fit(X, y)
+        tree_calls = [
+            (add_tree_to_attribute_pairs,
+             (True, est.tree_, i, 1. / 8, 0, True, True),
+             dict(dtype=np.float32))
+            for i, est in enumerate(model.estimators_)]
+        expected = get_default_tree_classifier_attribute_pairs()
+        add_trees_to_attribute_pairs(expected, tree_calls)
+        got = get_default_tree_classifier_attribute_pairs()
+        add_trees_to_attribute_pairs(got, tree_calls, n_jobs=4)
+        self.assertSameAttributes(expected, got)
+
+    def test_convert_n_jobs(self):
+        X, y = make_classification(
+            300, n_classes=3, n_informative=4, random_state=0)
+        X = X.astype(np.float32)
+        models = [
+            (RandomForestClassifier(n_estimators=5, max_depth=5,
+                                    random_state=0).fit(X, y),
+             {'decision_path': True}),
+            (RandomForestRegressor(n_estimators=5, max_depth=5,
+                                   random_state=0).fit(X, y),
+             {'decision_path': True}),
+            (GradientBoostingClassifier(n_estimators=5, max_depth=3,
+                                        random_state=0).fit(X, y), None),
+            (IsolationForest(n_estimators=5, random_state=0).fit(X), None)]
+        for model, options in models:
+            options = {id(model): options} if options else None
+            with self.subTest(model=model.__class__.__name__):
+                expected = to_onnx(model, X[:1], options=options,
+                                   target_opset=TARGET_OPSET)
+                got = to_onnx(model, X[:1], options=options,
+                              target_opset=TARGET_OPSET, n_jobs=3)
+                self.assertEqual(expected.SerializeToString(),
+                                 got.SerializeToString())
+
+
+if __name__ == "__main__":
+    unittest.main()